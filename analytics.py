@@ -0,0 +1,192 @@
+# analytics.py — spending trends and forecasts computed over columnar NumPy arrays
+import calendar, os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, List
+
+from scheduler import next_occurrence
+
+# -------------------------
+# Configuration
+# -------------------------
+MOVING_AVERAGE_DAYS = int(os.environ.get("ANALYTICS_MOVING_AVERAGE_DAYS", "7"))
+BURN_WINDOW_DAYS = int(os.environ.get("ANALYTICS_BURN_WINDOW_DAYS", "30"))
+TREND_DAYS = 30
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# numpy is imported inside the functions that use it, so importing this module (and app.py)
+# stays cheap; the first dashboard view pays for it once per process.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+@dataclass
+class ExpenseFrame:
+    # One entry per (day, category) with spending; built from the day rollups
+    days: "np.ndarray"      # int32, days since 1970-01-01
+    amounts: "np.ndarray"   # float64, total spent that day in that category
+    counts: "np.ndarray"    # int32, number of expenses behind the total
+    codes: "np.ndarray"     # int32, index into categories
+    categories: List[str]
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+
+def day_number(d):
+    return d.toordinal() - _EPOCH
+
+def from_day_number(n):
+    return date.fromordinal(int(n) + _EPOCH)
+
+
+# -------------------------
+# Loading (one bulk fetch)
+# -------------------------
+def load(conn, user_id, since=None):
+    """Fetch a user's per-day, per-category spending (optionally from `since` on) into columnar arrays.
+
+    Reads the trigger-maintained day rollups, so the fetch grows with the days and
+    categories a user has rather than with their number of expenses."""
+    import numpy as np
+    sql = """SELECT CAST(julianday(bucket) - 2440587.5 AS INTEGER), total, count, category
+             FROM expense_rollups
+             WHERE user_id=? AND period='day' AND count > 0 AND julianday(bucket) IS NOT NULL"""
+    params = [user_id]
+    if since is not None:
+        sql += " AND bucket >= ?"
+        params.append(since.isoformat())
+    cur = conn.cursor()
+    cur.row_factory = None  # plain tuples; no sqlite3.Row per entry
+    rows = cur.execute(sql, params).fetchall()
+    n = len(rows)
+    if not n:
+        empty = np.empty(0, dtype=np.int32)
+        return ExpenseFrame(empty, np.empty(0), empty, empty, [])
+    days, amounts, counts, cats = zip(*rows)
+    index = {}
+    codes = np.fromiter((index.setdefault(c, len(index)) for c in cats), dtype=np.int32, count=n)
+    return ExpenseFrame(np.array(days, dtype=np.int32), np.array(amounts, dtype=np.float64),
+                        np.array(counts, dtype=np.int32), codes, list(index))
+
+def recurring_spent(conn, user_id, today, window=BURN_WINDOW_DAYS):
+    # Scheduler-posted charges inside the burn window, by category; they are forecast from
+    # recurring_expenses instead, so they are taken out of the discretionary burn rate
+    since = today - timedelta(days=window - 1)
+    rows = conn.execute("""SELECT COALESCE(category, 'Other') AS category, SUM(amount) AS total FROM expenses
+                           WHERE user_id=? AND date BETWEEN ? AND ? AND description LIKE '%(Recurring)%'
+                           GROUP BY 1""", (user_id, since.isoformat(), today.isoformat())).fetchall()
+    return {r["category"]: r["total"] or 0.0 for r in rows}
+
+
+# -------------------------
+# Vectorized measures
+# -------------------------
+def daily_totals(frame, start, end):
+    """Spend per day for the inclusive day-number range [start, end]."""
+    import numpy as np
+    sel = (frame.days >= start) & (frame.days <= end)
+    return np.bincount(frame.days[sel] - start, weights=frame.amounts[sel], minlength=end - start + 1)
+
+def moving_average(series, window=MOVING_AVERAGE_DAYS):
+    # Trailing mean; the first window-1 points average over what is available
+    import numpy as np
+    csum = np.cumsum(np.concatenate(([0.0], series)))
+    idx = np.arange(1, len(series) + 1)
+    lo = np.maximum(idx - window, 0)
+    return (csum[idx] - csum[lo]) / (idx - lo)
+
+def burn_rates(frame, today, window=BURN_WINDOW_DAYS, recurring=None):
+    """Average spend per day by category over the last `window` days, less `recurring` charges."""
+    import numpy as np
+    end = day_number(today)
+    sel = (frame.days > end - window) & (frame.days <= end)
+    sums = np.bincount(frame.codes[sel], weights=frame.amounts[sel], minlength=len(frame.categories))
+    recurring = recurring or {}
+    rates = {c: max(0.0, float(s) - recurring.get(c, 0.0)) / window for c, s in zip(frame.categories, sums)}
+    return {c: r for c, r in rates.items() if r}
+
+def weekday_pattern(frame):
+    # 1970-01-01 was a Thursday, so (day + 3) % 7 puts Monday at 0
+    import numpy as np
+    if not len(frame):
+        return {d: {"total": 0.0, "average": 0.0} for d in WEEKDAYS}
+    weekday = (frame.days + 3) % 7
+    totals = np.bincount(weekday, weights=frame.amounts, minlength=7)
+    # how many of each weekday the history spans, so busy weeks don't skew the average
+    span = np.arange(frame.days.min(), frame.days.max() + 1)
+    occurrences = np.bincount((span + 3) % 7, minlength=7)
+    averages = np.divide(totals, occurrences, out=np.zeros(7), where=occurrences > 0)
+    return {d: {"total": float(t), "average": float(a)} for d, t, a in zip(WEEKDAYS, totals, averages)}
+
+
+# -------------------------
+# Month-end outlook
+# -------------------------
+def days_left(today):
+    # Including today
+    return calendar.monthrange(today.year, today.month)[1] - today.day + 1
+
+def upcoming_commitments(conn, user_id, today=None):
+    """Recurring charges not yet posted that fall due on or before the last day of this month."""
+    today = today or date.today()
+    month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    rows = conn.execute("""SELECT amount, frequency, next_date, anchor_day FROM recurring_expenses
+                           WHERE user_id=? AND status='active' AND next_date <= ?""",
+                        (user_id, month_end.isoformat())).fetchall()
+    total = 0.0
+    for r in rows:
+        d = datetime.strptime(r["next_date"], "%Y-%m-%d").date()
+        while d <= month_end:
+            total += r["amount"]
+            d = next_occurrence(d, r["frequency"], r["anchor_day"])
+    return total
+
+def safe_limit(balance, commitments, today=None):
+    """What can be spent per day for the rest of the month once recurring charges are covered."""
+    today = today or date.today()
+    return max(0.0, (balance - commitments) / days_left(today))
+
+def projected_month_end(frame, balance, commitments, today=None, recurring=None, window=BURN_WINDOW_DAYS):
+    # Balance after committed recurring charges and the recent discretionary burn rate for the days after today
+    today = today or date.today()
+    rate = sum(burn_rates(frame, today, window, recurring).values())
+    return balance - commitments - rate * (days_left(today) - 1)
+
+def outlook(conn, user_id, balance, today=None):
+    """safe_limit and projected month-end balance; only the burn window is fetched."""
+    today = today or date.today()
+    commitments = upcoming_commitments(conn, user_id, today)
+    frame = load(conn, user_id, since=today - timedelta(days=BURN_WINDOW_DAYS - 1))
+    return {"commitments": commitments,
+            "days_left": days_left(today),
+            "safe_limit": safe_limit(balance, commitments, today),
+            "projected_month_end": projected_month_end(frame, balance, commitments, today,
+                                                       recurring_spent(conn, user_id, today))}
+
+
+def report(conn, user_id, balance, today=None, trend_days=TREND_DAYS):
+    """Everything above for one user from a single bulk fetch of their history."""
+    today = today or date.today()
+    frame = load(conn, user_id)
+    end = day_number(today)
+    start = end - trend_days + 1
+    # the moving average is warmed up on the days before the visible window
+    series = daily_totals(frame, start - MOVING_AVERAGE_DAYS + 1, end)
+    averaged = moving_average(series)[MOVING_AVERAGE_DAYS - 1:]
+    commitments = upcoming_commitments(conn, user_id, today)
+    recurring = recurring_spent(conn, user_id, today)
+    return {
+        "expenses": len(frame),
+        "days": [from_day_number(d).isoformat() for d in range(start, end + 1)],
+        "daily_totals": series[MOVING_AVERAGE_DAYS - 1:].round(2).tolist(),
+        "moving_average": averaged.round(2).tolist(),
+        "burn_rates": {c: round(v, 2) for c, v in burn_rates(frame, today, recurring=recurring).items()},
+        "weekdays": weekday_pattern(frame),
+        "commitments": commitments,
+        "days_left": days_left(today),
+        "safe_limit": round(safe_limit(balance, commitments, today), 2),
+        "projected_month_end": round(projected_month_end(frame, balance, commitments, today, recurring), 2),
+    }
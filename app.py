@@ -1,23 +1,58 @@
 # app.py — Clean, professional, and fully integrated with your database.py schema
-from flask import Flask, render_template, request, redirect, session, flash, url_for
-from database import get_db, init_db
-from datetime import datetime, timedelta
-import os, re, uuid
-import easyocr
-from flask_bcrypt import Bcrypt
-from werkzeug.utils import secure_filename
+from flask import Flask, render_template, request, redirect, session, flash, url_for, jsonify, Response
+from database import get_db, init_db, init_app as init_db_app, db_stats, insert_expenses, InsufficientBalance
+from datetime import datetime
+import os
+import ocr_engine, ocr_jobs, upload_store, summary, scheduler, rollups, analytics, page_cache
+import expenses as expenses_list
+import limits as limit_engine
+import importer, exporter, classifier, metrics, session_store, auth_hashing
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # -------------------------
 # Configuration
 # -------------------------
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET", "supersecret123")
-bcrypt = Bcrypt(app)
+# Proxies in front of the app: 1 on Heroku (its router), 0 when clients connect directly.
+# Login throttling needs the client's real address, so with PROXY_HOPS unset and not on
+# Heroku every client might share the proxy's bucket and per-IP throttling stays off.
+PROXY_HOPS = os.environ.get("PROXY_HOPS", "1" if "DYNO" in os.environ else "")
+THROTTLE_BY_IP = PROXY_HOPS != ""
+if not THROTTLE_BY_IP:
+    app.logger.warning("PROXY_HOPS is not set: per-IP login throttling is off. "
+                       "Set it to the number of proxies in front of the app (0 for none).")
+elif int(PROXY_HOPS):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(PROXY_HOPS))
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "static", "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 ALLOWED_EXT = {"png", "jpg", "jpeg", "bmp", "tiff"}
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "50"))
+# Whole request body limit; Werkzeug answers 413 before the upload is read
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", "16")) * 1024 * 1024
+
+# ensure DB exists / initialized (idempotent; also creates tables added since first deploy)
+init_db()
+init_db_app(app)
+session_store.init_app(app)  # the cookie holds only a session id
+app.context_processor(lambda: {"categories": classifier.CATEGORIES})
+metrics.init_app(app)
+metrics.add_gauges("db_pool", db_stats)
+metrics.add_gauges("ocr_pool", ocr_engine.stats)
+metrics.add_gauges("page_cache", page_cache.stats)
+metrics.add_gauges("auth", auth_hashing.stats)
+# Pick the bcrypt cost now, so unknown emails wait as long as real logins from the first request
+auth_hashing.current_cost()
+
+# Recurring expenses are posted by scheduler.py; by default each worker also runs it on a
+# background thread. Set RECURRING_SCHEDULER=off when cron runs `python scheduler.py --once`.
+if os.environ.get("RECURRING_SCHEDULER", "thread") == "thread":
+    scheduler.start_background()
+# OCR jobs orphaned by a restart or a recycled worker are resubmitted by every worker
+if os.environ.get("OCR_JOB_RECOVERY", "thread") == "thread":
+    ocr_jobs.start_recovery()
 
 # -------------------------
 # Helpers
@@ -25,69 +60,69 @@ ALLOWED_EXT = {"png", "jpg", "jpeg", "bmp", "tiff"}
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
-def parse_items_from_text(text):
-    items = []
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    line_re = re.compile(r'(.+?)[\:\-\—\s]{1,}\s*([0-9]{1,3}(?:[,\s][0-9]{3})*(?:\.[0-9]{2})?)')
-    for ln in lines:
-        m = line_re.search(ln)
-        if m:
-            try:
-                items.append({"name": m.group(1).strip(), "amount": float(m.group(2).replace(',', ''))})
-            except:
-                pass
-    return items
-
-def guess_category(text):
-    text = (text or "").lower()
-    mapping = {
-        "Food": ["pizza", "burger", "chips", "juice", "milk", "meal", "dosa", "idli", "kfc"],
-        "Books": ["book", "pen", "notebook"],
-        "Transport": ["bus", "uber", "ola", "fuel", "taxi"],
-        "Shopping": ["cloth", "amazon", "flipkart", "shopping"],
-        "Medical": ["tablet", "medicine", "clinic", "doctor"],
-        "Personal Care": ["hair", "salon", "shampoo"],
-        "Electronics": ["charger", "earphone", "laptop", "mobile"],
-    }
-    for cat, keys in mapping.items():
-        if any(k in text for k in keys):
-            return cat
-    return "Other"
-
-def apply_recurring(user_id):
-    conn = get_db()
-    cursor = conn.cursor()
-
-    today = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute("SELECT * FROM recurring_expenses WHERE user_id=?", (user_id,))
-    recs = cursor.fetchall()
+def save_upload(file):
+    # Identical bills share one content-addressed file (and its cached OCR result)
+    return upload_store.store(file.stream)
 
-    for r in recs:
+def personalise(items, user_id):
+    # OCR runs without knowing the user; apply the categories they taught us before review
+    overrides = classifier.load_overrides(get_db(), user_id)
+    for it in items:
+        it["category"] = classifier.classify(it["name"], overrides) if overrides else it["category"]
+        it["suggested"] = it["category"]
+    return items
 
-        # Skip paused recurring items
-        if r["status"] == "paused":
+def throttled(template):
+    # Per-IP limit on sign-in/sign-up posts, checked before any hashing is queued
+    if not THROTTLE_BY_IP:
+        return None
+    allowed, retry_after = auth_hashing.allow_attempt(request.remote_addr)
+    if allowed:
+        return None
+    flash(f"Too many attempts. Try again in {retry_after:.0f} seconds.", "error")
+    return render_template(template), 429, {"Retry-After": str(max(1, round(retry_after)))}
+
+def start_scan(user_id, uploads):
+    # Serve bills we've already read from the cache; queue an OCR job for the rest.
+    # Either way the user's invoice draft is replaced (see session_store.py).
+    # Returns the job id, or None when every item came from the cache.
+    cached = [upload_store.lookup(digest) for digest, _ in uploads]
+    if all(c is not None for c in cached):
+        session_store.start_draft(get_db(), user_id, items=personalise([it for items in cached for it in items], user_id))
+        return None
+    job_id = ocr_jobs.enqueue(user_id, [path for _, path in uploads])
+    session_store.start_draft(get_db(), user_id, job_id=job_id)
+    return job_id
+
+def edited_items(items, form):
+    # Apply the review form to the draft's items; fields missing from the form keep their value,
+    # so a partial save only has to send what changed. removeN drops item N.
+    edited = []
+    for i, it in enumerate(items, 1):
+        if form.get(f"remove{i}"):
             continue
-
-        # Corrected here (NO `.get()`)
-        if r["next_date"] == today:
-
-            cursor.execute("""
-                INSERT INTO expenses (user_id, category, amount, description, date)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, r["category"], r["amount"], r["title"] + " (Recurring)", today))
-
-            # Compute next deduction date
-            if r["frequency"] == "daily":
-                next_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-            elif r["frequency"] == "weekly":
-                next_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-            else:  # monthly
-                next_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-
-            cursor.execute("UPDATE recurring_expenses SET next_date=? WHERE id=?", (next_date, r["id"]))
-
-    conn.commit()
-
+        it = dict(it)
+        it["name"] = form.get(f"name{i}") or it["name"]
+        try:
+            it["amount"] = float(form.get(f"amount{i}", it["amount"]))
+        except (TypeError, ValueError):
+            pass
+        it["category"] = form.get(f"category{i}", it["category"])
+        edited.append(it)
+    return edited
+
+def scan_response(job_id, count=1):
+    wants_json = request.accept_mimetypes.best == "application/json"
+    if job_id is None:
+        if wants_json:
+            draft = session_store.get_draft(get_db(), session["user_id"])
+            return jsonify({"status": "done", "items": draft["items"], "revision": draft["revision"]})
+        flash("Bill scanned! Review and add items below.", "info")
+        return redirect(url_for("review_invoice"))
+    if wants_json:
+        return jsonify({"job_id": job_id, "status": "queued", "files": count}), 202
+    flash("Bill uploaded! Scanning it now..." if count == 1 else f"{count} bills uploaded! Scanning them now...", "info")
+    return redirect(url_for("review_invoice", job=job_id))
 
 # -------------------------
 # Public Routes: Home / Auth
@@ -99,17 +134,22 @@ def home():
 @app.route("/signup", methods=["GET", "POST"])
 def signup():
     if request.method == "POST":
+        limited = throttled("signup.html")
+        if limited: return limited
         name = request.form.get("name","").strip()
         email = request.form.get("email","").strip().lower()
         password = request.form.get("password","")
         if not (name and email and password):
             flash("All fields required.", "error")
             return redirect("/signup")
-        hashed = bcrypt.generate_password_hash(password).decode("utf-8")
         conn = get_db(); cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email=?", (email,))
+        cursor.execute("SELECT id FROM users WHERE email=?", (email,))
         if cursor.fetchone():
             flash("Email already exists!", "error"); return redirect("/signup")
+        try:
+            hashed = auth_hashing.hash_password(password)
+        except auth_hashing.HashingBusy as e:
+            flash(str(e), "error"); return render_template("signup.html"), 503
         cursor.execute("INSERT INTO users (name,email,password) VALUES (?, ?, ?)", (name, email, hashed))
         conn.commit()
         flash("Account created! Please login.", "success"); return redirect("/login")
@@ -118,12 +158,20 @@ def signup():
 @app.route("/login", methods=["GET","POST"])
 def login():
     if request.method == "POST":
+        limited = throttled("login.html")
+        if limited: return limited
         email = request.form.get("email","").strip().lower()
         password = request.form.get("password","")
         conn = get_db(); cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE email=?", (email,))
         user = cursor.fetchone()
-        if user and bcrypt.check_password_hash(user["password"], password):
+        try:
+            # unknown emails wait as long as a real check would, so response time doesn't reveal accounts
+            ok = auth_hashing.verify(password, user["password"]) if user else auth_hashing.dummy_verify()
+        except auth_hashing.HashingBusy as e:
+            flash(str(e), "error"); return render_template("login.html"), 503
+        if ok:
+            auth_hashing.rehash_if_needed(user["id"], password, user["password"])
             session["user_id"]=user["id"]; session["username"]=user["name"]
             flash("Logged in successfully!", "success"); return redirect("/home2")
         flash("Invalid email or password!", "error")
@@ -142,9 +190,6 @@ def home2():
         return redirect("/login")
     user_id = session["user_id"]
 
-    # apply recurring deductions first
-    apply_recurring(user_id)
-
     conn = get_db(); cursor = conn.cursor()
 
     # Add allowance from dashboard form
@@ -160,40 +205,20 @@ def home2():
             flash("Allowance added!", "success")
         return redirect("/home2")
 
-    # totals
-    # Total allowances EVER added
-    # TOTAL ALLOWANCES EVER ADDED
-    cursor.execute("SELECT SUM(amount) AS t FROM allowances WHERE user_id=?", (user_id,))
-    total_allow = cursor.fetchone()["t"] or 0
-
-# TOTAL EXPENSES (manual + recurring)
-    cursor.execute("SELECT SUM(amount) AS t FROM expenses WHERE user_id=?", (user_id,))
-    total_exp = cursor.fetchone()["t"] or 0
-
-# TOTAL GOAL SAVINGS
-    cursor.execute("SELECT SUM(saved_amount) AS t FROM goals WHERE user_id=?", (user_id,))
-    total_saved = cursor.fetchone()["t"] or 0
+    return render_template("home2.html", **page_cache.cached(conn, user_id, "home2", lambda: home2_context(conn, user_id)))
 
-# FINAL BALANCE
-    balance = total_allow - total_exp - total_saved
+def home2_context(conn, user_id):
+    # totals (allowances ever added, expenses incl. recurring, goal savings) + previews, one query
+    page = summary.load(conn, user_id, "recurring", "limits", "goals", recurring_limit=5)
+    totals = page.totals
 
-
-    # previews
-    cursor.execute("SELECT * FROM recurring_expenses WHERE user_id=? ORDER BY id DESC LIMIT 5", (user_id,))
-    recurring_preview = cursor.fetchall()
-    cursor.execute("SELECT * FROM category_limits WHERE user_id=?", (user_id,))
-    limits = cursor.fetchall()
-    cursor.execute("SELECT * FROM goals WHERE user_id=?", (user_id,))
-    goals = cursor.fetchall()
-
-    return render_template("home2.html",
-                       total_allow=round(total_allow,2),
-                       total_expenses=round(total_exp,2),
-                       total_saved_in_goals=round(total_saved,2),
-                       balance=round(balance,2),
-                       recurring_preview=recurring_preview,
-                       limits=limits,
-                       goals=goals)
+    return dict(total_allow=round(totals.total_allowance,2),
+                total_expenses=round(totals.total_expenses,2),
+                total_saved_in_goals=round(totals.total_saved,2),
+                balance=round(totals.balance,2),
+                recurring_preview=page.recurring,
+                limits=page.limits,
+                goals=page.goals)
 
 
 
@@ -205,7 +230,6 @@ def log_expense():
     if "user_id" not in session:
         return redirect("/login")
     user_id = session["user_id"]
-    apply_recurring(user_id)
     conn = get_db(); cursor = conn.cursor()
 
     if request.method=="POST" and "expense_amount" in request.form:
@@ -213,60 +237,93 @@ def log_expense():
             amount = float(request.form.get("expense_amount",0))
         except:
             flash("Invalid amount.", "error"); return redirect("/log_expense")
-        # compute displayed allowance
-        cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM allowances WHERE user_id=?", (user_id,))
-        total_allow_raw = cursor.fetchone()["t"] or 0.0
-        cursor.execute("SELECT COALESCE(SUM(saved_amount),0) as t FROM goals WHERE user_id=?", (user_id,))
-        total_saved = cursor.fetchone()["t"] or 0.0
-        displayed_allow = total_allow_raw - total_saved
-        cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM expenses WHERE user_id=?", (user_id,))
-        total_exp = cursor.fetchone()["t"] or 0.0
-        remaining_balance = displayed_allow - total_exp
-        if amount > remaining_balance:
+        category = request.form.get("category","Other")
+        breaches = limit_engine.check(conn, user_id, [(category, amount)])
+        if breaches and limit_engine.POLICY == "reject":
+            flash(f"Expense not added ({limit_engine.describe(breaches)}).", "error"); return redirect("/log_expense")
+        # insert expense; remaining balance (allowances - goal savings - expenses) is checked under the write lock
+        try:
+            insert_expenses(conn, [(user_id, category, amount, request.form.get("description",""), datetime.now().strftime("%Y-%m-%d"))])
+        except InsufficientBalance:
             flash("Insufficient balance.", "error"); return redirect("/log_expense")
-        # insert expense
-        cursor.execute("""
-            INSERT INTO expenses (user_id, category, amount, description, date)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, request.form.get("category","Other"), amount, request.form.get("description",""), datetime.now().strftime("%Y-%m-%d")))
-        conn.commit()
+        if breaches:
+            flash(f"Expense added over limit ({limit_engine.describe(breaches)}).", "warning"); return redirect("/log_expense")
         flash("Expense added!", "success"); return redirect("/log_expense")
 
     # fetch data for page
-    # Allowances
-    cursor.execute("SELECT SUM(amount) AS t FROM allowances WHERE user_id=?", (user_id,))
-    total_allowance = cursor.fetchone()["t"] or 0
-
-# Expenses
-    cursor.execute("SELECT SUM(amount) AS t FROM expenses WHERE user_id=?", (user_id,))
-    total_expenses = cursor.fetchone()["t"] or 0
-
-# Goal Savings
-    cursor.execute("SELECT SUM(saved_amount) AS t FROM goals WHERE user_id=?", (user_id,))
-    total_goal_savings = cursor.fetchone()["t"] or 0
-
-# Correct Balance
-    balance = total_allowance - total_expenses - total_goal_savings
+    page = summary.load(conn, user_id, "recurring")
+    total_allowance = page.totals.total_allowance
+    total_expenses = page.totals.total_expenses
+    balance = page.totals.balance
 
     spent_percentage = (total_expenses/total_allowance*100) if total_allowance else 0
-    safe_limit = balance/30 if balance>0 else 0
-    cursor.execute("SELECT id, category, amount, description, date FROM expenses WHERE user_id=? ORDER BY id DESC", (user_id,))
-    expenses = cursor.fetchall()
-    cursor.execute("SELECT * FROM recurring_expenses WHERE user_id=?", (user_id,))
-    recurring = cursor.fetchall()
+    # spread what is left after this month's recurring charges over the days remaining
+    safe_limit = analytics.safe_limit(balance, analytics.upcoming_commitments(conn, user_id))
+    # first page only; the template pulls further pages from /api/expenses
+    filters = expenses_list.filters_from(request.args)
+    expenses, next_cursor = expenses_list.list_page(conn, user_id, limit=expenses_list.page_size(request.args.get("limit")),
+                                                    **filters)
+    recurring = page.recurring
 
-    invoice_items = session.get("invoice_items")
     show_invoice = request.args.get("show_invoice")
+    draft = session_store.get_draft(conn, user_id) if show_invoice else None
+    invoice_items = draft["items"] if draft and draft["status"] == "ready" else None
     return render_template("log_expense.html",
                            total_allowance=round(total_allowance,2),
                            balance=round(balance,2),
                            spent_percentage=round(spent_percentage,2),
                            safe_limit=round(safe_limit,2),
                            expenses=expenses,
+                           next_cursor=next_cursor,
+                           filters=filters,
                            recurring=recurring,
                            invoice_items=invoice_items,
+                           invoice_revision=draft["revision"] if draft else None,
                            show_invoice=show_invoice)
 
+@app.route("/api/expenses")
+def api_expenses():
+    if "user_id" not in session: return jsonify({"error": "login required"}), 401
+    rows, next_cursor = expenses_list.list_page(get_db(), session["user_id"],
+                                                cursor=request.args.get("cursor", type=int),
+                                                limit=expenses_list.page_size(request.args.get("limit")),
+                                                **expenses_list.filters_from(request.args))
+    return jsonify({"items": [dict(r) for r in rows], "next_cursor": next_cursor})
+
+# -------------------------
+# Statement import (CSV / OFX) and export (CSV / NDJSON)
+# -------------------------
+@app.route("/import_expenses", methods=["POST"])
+def import_expenses():
+    if "user_id" not in session: return redirect("/login")
+    file = request.files.get("statement")
+    if not file or file.filename == "":
+        flash("No file uploaded.", "error"); return redirect("/log_expense")
+    try:
+        # werkzeug has already spooled the upload to disk; it is parsed and written batch by batch
+        result = importer.import_file(get_db(), session["user_id"], file.stream, file.filename,
+                                      importer.parse_mapping(request.form.get("mapping")),
+                                      signs=request.form.get("signs") or "auto")
+    except importer.ImportFailed as e:
+        flash(str(e), "error"); return redirect("/log_expense")
+    flash(f"Statement imported: {result.summary()}.", "success" if not result.invalid else "warning")
+    return redirect("/log_expense")
+
+@app.route("/export")
+def export():
+    if "user_id" not in session: return redirect("/login")
+    fmt = request.args.get("format", "csv")
+    tables = exporter.parse_tables(request.args.get("table"))
+    compressed = request.args.get("gzip") == "1"
+    try:
+        # rows are streamed from their own cursor as the client reads; nothing is buffered here
+        chunks = exporter.stream(session["user_id"], fmt, tables, compressed)
+    except exporter.ExportError as e:
+        flash(str(e), "error"); return redirect("/log_expense")
+    name = exporter.filename(fmt, tables, compressed, datetime.now().strftime("%Y-%m-%d"))
+    return Response(chunks, mimetype="application/gzip" if compressed else exporter.FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
 # -------------------------
 # Category Limits
 # -------------------------
@@ -282,14 +339,15 @@ def limits():
     if request.method=="POST":
         category = request.form.get("category","").strip()
         amount = float(request.form.get("amount",0))
+        period = limit_engine.period_or_default(request.form.get("period"))
         if request.form.get("edit_id"):
-            cursor.execute("UPDATE category_limits SET limit_amount=? WHERE id=? AND user_id=?", (amount, request.form.get("edit_id"), user_id))
+            cursor.execute("UPDATE category_limits SET limit_amount=?, period=? WHERE id=? AND user_id=?", (amount, period, request.form.get("edit_id"), user_id))
         else:
-            cursor.execute("INSERT INTO category_limits (user_id, category, limit_amount) VALUES (?, ?, ?)", (user_id, category, amount))
+            cursor.execute("INSERT INTO category_limits (user_id, category, limit_amount, period) VALUES (?, ?, ?, ?)", (user_id, category, amount, period))
         conn.commit(); return redirect("/limits")
-    cursor.execute("SELECT * FROM category_limits WHERE user_id=?", (user_id,))
-    limits = cursor.fetchall()
-    return render_template("limits.html", limits=limits, edit_limit=edit_limit)
+    # each limit with what has been spent in its current period
+    limits = limit_engine.headroom(conn, user_id)
+    return render_template("limits.html", limits=limits, edit_limit=edit_limit, periods=limit_engine.PERIODS)
 
 # -------------------------
 # Goals: add / edit / delete / edit-mode
@@ -376,14 +434,7 @@ def add_to_goal(goal_id):
         flash(f"You can only add up to ₹{allowed_to_add}", "danger"); return redirect(f"/goals?edit={goal_id}")
 
     # compute displayed available balance
-    cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM allowances WHERE user_id=?", (user_id,))
-    total_allow_raw = cursor.fetchone()["t"] or 0.0
-    cursor.execute("SELECT COALESCE(SUM(saved_amount),0) as t FROM goals WHERE user_id=?", (user_id,))
-    total_saved = cursor.fetchone()["t"] or 0.0
-    cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM expenses WHERE user_id=?", (user_id,))
-    total_exp = cursor.fetchone()["t"] or 0.0
-    displayed_allow = total_allow_raw - total_saved
-    remaining_balance = displayed_allow - total_exp
+    remaining_balance = summary.totals(conn, user_id).balance
 
     if amount > remaining_balance:
         flash("Not enough available balance to add this amount!", "danger"); return redirect(f"/goals?edit={goal_id}")
@@ -412,51 +463,50 @@ def delete_goal(id):
 def insights():
     if "user_id" not in session:
         return redirect("/login")
-    user_id = session["user_id"]; conn = get_db(); cursor = conn.cursor()
+    user_id = session["user_id"]; conn = get_db()
+    range_key = request.args.get("range", rollups.DEFAULT_RANGE)
+    range_key = range_key if range_key in rollups.RANGES else rollups.DEFAULT_RANGE
+    return render_template("insights.html", **page_cache.cached(conn, user_id, "insights",
+                                                                lambda: insights_context(conn, user_id, range_key), range_key))
 
+def insights_context(conn, user_id, range_key):
     # totals & displayed allowance
-    cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM allowances WHERE user_id=?", (user_id,))
-    total_allow_raw = cursor.fetchone()["t"] or 0.0
-    cursor.execute("SELECT COALESCE(SUM(saved_amount),0) as t FROM goals WHERE user_id=?", (user_id,))
-    total_saved = cursor.fetchone()["t"] or 0.0
-    cursor.execute("SELECT COALESCE(SUM(amount),0) as t FROM expenses WHERE user_id=?", (user_id,))
-    total_exp = cursor.fetchone()["t"] or 0.0
-    displayed_allow = total_allow_raw - total_saved
-    balance = displayed_allow - total_exp
-
-    # category expenses
-    cursor.execute("SELECT category, COALESCE(SUM(amount),0) as t FROM expenses WHERE user_id=? GROUP BY category", (user_id,))
-    cat_rows = cursor.fetchall()
-    categories = [r["category"] for r in cat_rows]
-    totals = [r["t"] for r in cat_rows]
+    totals = summary.totals(conn, user_id)
+    total_allow_raw = totals.total_allowance
+    total_saved = totals.total_saved
+    total_exp = totals.total_expenses
+    displayed_allow = totals.displayed_allowance
+    balance = totals.balance
+
+    # category pie + trend chart for the chosen range, both from the rollup tables
+    charts = rollups.load(conn, user_id, range_key)
+    categories = charts["categories"]
+    totals = charts["totals"]
 
     # include a single 'Savings' slice if there are savings
     if total_saved > 0:
         categories.append("Savings")
         totals.append(total_saved)
 
-    # daily totals for last 7 days
-    cursor.execute("SELECT date(date) as d, COALESCE(SUM(amount),0) as t FROM expenses WHERE user_id=? AND date >= date('now','-6 days') GROUP BY d ORDER BY d", (user_id,))
-    daily = cursor.fetchall()
-    from datetime import datetime, timedelta
-    days = []
-    daily_totals_map = {r["d"]: r["t"] for r in daily}
-    daily_totals = []
-    for i in range(6, -1, -1):
-        d = (datetime.now() - timedelta(days=i)).date().isoformat()
-        days.append(d)
-        daily_totals.append(daily_totals_map.get(d, 0))
-
-    return render_template("insights.html",
-                           categories=categories,
-                           totals=totals,
-                           days=days,
-                           daily_totals=daily_totals,
-                           total_allow=round(displayed_allow,2),
-                           total_allow_raw=round(total_allow_raw,2),
-                           total_saved_in_goals=round(total_saved,2),
-                           total_exp=round(total_exp,2),
-                           balance=round(balance,2))
+    return dict(categories=categories,
+                totals=totals,
+                days=charts["buckets"],
+                daily_totals=charts["bucket_totals"],
+                range=charts["range"],
+                range_label=charts["range_label"],
+                ranges=charts["ranges"],
+                total_allow=round(displayed_allow,2),
+                total_allow_raw=round(total_allow_raw,2),
+                total_saved_in_goals=round(total_saved,2),
+                total_exp=round(total_exp,2),
+                balance=round(balance,2))
+
+@app.route("/api/analytics")
+def api_analytics():
+    # Moving averages, burn rates, weekday pattern and month-end projection
+    if "user_id" not in session: return jsonify({"error": "login required"}), 401
+    user_id = session["user_id"]; conn = get_db()
+    return jsonify(analytics.report(conn, user_id, summary.totals(conn, user_id).balance))
 
 # -------------------------
 # OCR upload / invoice flow
@@ -469,53 +519,117 @@ def upload_invoice():
     file = request.files["invoice"]
     if file.filename == "" or not allowed_file(file.filename):
         flash("Invalid file.", "error"); return redirect("/log_expense")
-    filename = secure_filename(file.filename)
-    unique_name = f"{uuid.uuid4().hex}_{filename}"
-    saved_path = os.path.join(app.config["UPLOAD_FOLDER"], unique_name)
-    file.save(saved_path)
+    # OCR runs in the background job pool; the request only saves and enqueues
     try:
-        reader = easyocr.Reader(['en'], gpu=False)
-        result = reader.readtext(saved_path, detail=0)
-        text = "\n".join(result)
-    except:
-        flash("OCR failed. Try a clearer image.", "error"); return redirect("/log_expense")
-    items = parse_items_from_text(text)
-    added_items = []
-    for it in items:
-        cat = guess_category(it['name']) or "Shopping"
-        added_items.append({"name": it['name'], "amount": it['amount'], "category": cat})
-    session["invoice_items"] = added_items
-    flash("Bill scanned! Review and add items below.", "info")
-    return redirect("/log_expense?show_invoice=1")
+        uploads = [save_upload(file)]
+    except upload_store.InvalidImage as e:
+        flash(str(e), "error"); return redirect("/log_expense")
+    job_id = start_scan(session["user_id"], uploads)
+    return scan_response(job_id)
+
+@app.route("/upload_invoices", methods=["POST"])
+def upload_invoices():
+    # Statement bundles: many images (or a multi-page TIFF) scanned as one batched job
+    if "user_id" not in session:
+        flash("Please login first.", "error"); return redirect("/login")
+    files = [f for f in request.files.getlist("invoices") if f.filename]
+    if not files: flash("No files uploaded.", "error"); return redirect("/log_expense")
+    if len(files) > MAX_BATCH_FILES:
+        flash(f"Upload at most {MAX_BATCH_FILES} images at once.", "error"); return redirect("/log_expense")
+    if not all(allowed_file(f.filename) for f in files):
+        flash("Invalid file.", "error"); return redirect("/log_expense")
+    try:
+        uploads = [save_upload(f) for f in files]
+    except upload_store.InvalidImage as e:
+        flash(str(e), "error"); return redirect("/log_expense")
+    job_id = start_scan(session["user_id"], uploads)
+    return scan_response(job_id, len(files))
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    flash(f"Upload too large (max {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB).", "error")
+    return redirect("/log_expense")
+
+@app.route("/ocr_jobs/<job_id>")
+def ocr_job_status(job_id):
+    if "user_id" not in session: return jsonify({"error": "login required"}), 401
+    job = ocr_jobs.get_job(job_id, session["user_id"])
+    if not job: return jsonify({"error": "not found"}), 404
+    return jsonify(job)
 
 @app.route("/add_invoice_items", methods=["POST"])
 def add_invoice_items():
     if "user_id" not in session: return redirect("/login")
-    if "invoice_items" not in session: flash("No invoice data found.", "error"); return redirect("/log_expense")
-    items = session["invoice_items"]; final_items=[]
-    for i in range(1, len(items)+1):
-        final_items.append({
-            "name": request.form.get(f"name{i}"),
-            "amount": float(request.form.get(f"amount{i}")),
-            "category": request.form.get(f"category{i}")
-        })
-    conn = get_db(); cursor = conn.cursor(); today = datetime.now().strftime("%Y-%m-%d")
-    for it in final_items:
-        cursor.execute("INSERT INTO expenses (user_id, category, amount, description, date) VALUES (?, ?, ?, ?, ?)",
-                       (session["user_id"], it["category"], it["amount"], it["name"], today))
-    conn.commit(); session.pop("invoice_items", None)
+    user_id = session["user_id"]; conn = get_db()
+    draft = session_store.get_draft(conn, user_id)
+    if not draft or draft["status"] != "ready": flash("No invoice data found.", "error"); return redirect("/log_expense")
+    items = draft["items"]; final_items = edited_items(items, request.form)
+    today = datetime.now().strftime("%Y-%m-%d")
+    # the whole bill is checked at once, summed per category
+    breaches = limit_engine.check(conn, user_id, [(it["category"], it["amount"]) for it in final_items])
+    if breaches and limit_engine.POLICY == "reject":
+        flash(f"Bill not added ({limit_engine.describe(breaches)}).", "error"); return redirect("/review_invoice")
+    # the draft is removed in the same transaction as the inserts, so a double submit adds the bill once
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        session_store.take_draft(conn, user_id, request.form.get("revision", draft["revision"], type=int))
+        insert_expenses(conn, [(user_id, it["category"], it["amount"], it["name"], today) for it in final_items])
+        conn.commit()
+    except session_store.StaleDraft as e:
+        conn.rollback(); flash(str(e), "error"); return redirect("/review_invoice")
+    except InsufficientBalance as e:
+        conn.rollback(); flash(f"Bill not added: {e}", "error"); return redirect("/review_invoice")
+    # learn from the categories the user changed during review
+    classifier.learn(conn, user_id, [(it["name"], it["category"]) for it in final_items
+                                     if it["category"] != it.get("suggested", it["category"])])
+    if breaches:
+        flash(f"Invoice items added over limit ({limit_engine.describe(breaches)}).", "warning"); return redirect("/log_expense")
     flash("Invoice items added successfully!", "success"); return redirect("/log_expense")
 
+@app.route("/save_invoice_draft", methods=["POST"])
+def save_invoice_draft():
+    # Keep edits without adding the bill; the draft can be finished later or on another device
+    if "user_id" not in session: return redirect("/login")
+    user_id = session["user_id"]; conn = get_db()
+    wants_json = request.accept_mimetypes.best == "application/json"
+    draft = session_store.get_draft(conn, user_id)
+    if not draft or draft["status"] != "ready":
+        if wants_json: return jsonify({"error": "no draft"}), 404
+        flash("No invoice data found.", "error"); return redirect("/log_expense")
+    items = edited_items(draft["items"], request.form)
+    try:
+        revision = session_store.update_draft(conn, user_id, items, request.form.get("revision", draft["revision"], type=int))
+    except session_store.StaleDraft as e:
+        if wants_json: return jsonify({"error": str(e)}), 409
+        flash(str(e), "error"); return redirect("/review_invoice")
+    if wants_json: return jsonify({"items": items, "revision": revision})
+    flash("Draft saved. You can finish it later, from any device.", "info"); return redirect("/review_invoice")
+
 @app.route("/cancel_invoice", methods=["POST"])
 def cancel_invoice():
-    session.pop("invoice_items", None); flash("Bill cancelled.", "info"); return redirect("/log_expense")
+    if "user_id" in session: session_store.discard_draft(get_db(), session["user_id"])
+    flash("Bill cancelled.", "info"); return redirect("/log_expense")
 
 @app.route("/review_invoice")
 def review_invoice():
     if "user_id" not in session: return redirect("/login")
-    if "invoice_items" not in session:
+    user_id = session["user_id"]; conn = get_db()
+    draft = session_store.get_draft(conn, user_id)
+    job_id = request.args.get("job") or (draft["job_id"] if draft and draft["status"] == "scanning" else None)
+    # a draft already filled from this job keeps its edits when the page is reloaded
+    if job_id and not (draft and draft["job_id"] == job_id and draft["status"] == "ready"):
+        job = ocr_jobs.get_job(job_id, user_id)
+        if not job:
+            flash("Scan not found. Please upload the bill again.", "error"); return redirect("/log_expense")
+        if job["status"] == "failed":
+            if draft and draft["job_id"] == job_id: session_store.discard_draft(conn, user_id)
+            flash("OCR failed. Try a clearer image.", "error"); return redirect("/log_expense")
+        if job["status"] != "done":
+            return render_template("review_invoice.html", pending_job=job_id)
+        draft = session_store.start_draft(conn, user_id, job_id=job_id, items=personalise(job["items"], user_id))
+    if not draft or draft["status"] != "ready":
         flash("No invoice data found. Please upload a bill again.", "error"); return redirect("/log_expense")
-    return render_template("review_invoice.html")
+    return render_template("review_invoice.html", pending_job=None, items=draft["items"], revision=draft["revision"])
 
 # -------------------------
 # Recurring Controls (Pause / Resume / Add)
@@ -546,15 +660,9 @@ def resume_recurring(id):
         return redirect("/login")
 
     conn = get_db()
-    cursor = conn.cursor()
 
-    cursor.execute("""
-        UPDATE recurring_expenses
-        SET status='active'
-        WHERE id=? AND user_id=?
-    """, (id, session["user_id"]))
-
-    conn.commit()
+    # Picks up from the next date on/after today; the paused period is not charged
+    scheduler.resume(conn, id, session["user_id"])
     flash("Recurring resumed.", "success")
     return redirect("/home2")
 
@@ -578,16 +686,18 @@ def recurring_page():
         category = request.form["category"]
         frequency = request.form["frequency"]
 
-        # First next_date should be TODAY so it deducts from tomorrow
-        next_date = datetime.now().strftime("%Y-%m-%d")
+        # First next_date is TODAY, so the first charge is posted right away
+        now = datetime.now()
+        next_date = now.strftime("%Y-%m-%d")
 
         cursor.execute("""
             INSERT INTO recurring_expenses 
-            (user_id, title, amount, category, frequency, next_date, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'active')
-        """, (user_id, title, amount, category, frequency, next_date))
+            (user_id, title, amount, category, frequency, next_date, status, anchor_day)
+            VALUES (?, ?, ?, ?, ?, ?, 'active', ?)
+        """, (user_id, title, amount, category, frequency, next_date, now.day))
 
         conn.commit()
+        scheduler.run_due(conn, user_id=user_id)
         flash("Recurring expense added!", "success")
         return redirect("/home2")
 
@@ -635,79 +745,56 @@ def dashboard():
 
     user_id = session["user_id"]
     conn = get_db()
-    cursor = conn.cursor()
-
-    # 🔥 Apply today's recurring if needed
-    apply_recurring(user_id)
+    return render_template("dashboard.html", **page_cache.cached(conn, user_id, "dashboard",
+                                                                 lambda: dashboard_context(conn, user_id)))
 
+def dashboard_context(conn, user_id):
     # ----------------------------------------
-    # TOTAL ALLOWANCE (ever added)
-    # ----------------------------------------
-    cursor.execute("SELECT SUM(amount) AS t FROM allowances WHERE user_id=?", (user_id,))
-    allowance = cursor.fetchone()["t"] or 0
-
-    # ----------------------------------------
-    # TOTAL EXPENSES (manual + recurring)
-    # ----------------------------------------
-    cursor.execute("SELECT SUM(amount) AS t FROM expenses WHERE user_id=?", (user_id,))
-    expenses = cursor.fetchone()["t"] or 0
-
+    # TOTALS, THIS MONTH'S RECURRING AND GOALS (one query)
     # ----------------------------------------
-    # TOTAL SAVINGS (goals saved_amount)
-    # ----------------------------------------
-    cursor.execute("SELECT SUM(saved_amount) AS t FROM goals WHERE user_id=?", (user_id,))
-    savings = cursor.fetchone()["t"] or 0
-
-    # ----------------------------------------
-    # RECURRING EXPENSES OF THIS MONTH ONLY
-    # ----------------------------------------
-    current_month = datetime.now().strftime("%Y-%m")
-    cursor.execute("""
-        SELECT SUM(amount) AS t 
-        FROM expenses
-        WHERE user_id=? 
-        AND description LIKE '%(Recurring)%'
-        AND date LIKE ?
-    """, (user_id, f"{current_month}-%"))
-    recurring_this_month = cursor.fetchone()["t"] or 0
-
-    # ----------------------------------------
-    # FINAL BALANCE CALCULATION
-    # ----------------------------------------
-    balance = allowance - expenses - savings
-
-    # Daily safe spending limit
-    safe_limit = balance / 30 if balance > 0 else 0
-
-    # ----------------------------------------
-    # GOALS LIST
-    # ----------------------------------------
-    cursor.execute("SELECT * FROM goals WHERE user_id=?", (user_id,))
-    goals = cursor.fetchall()
-
-    return render_template(
-        "dashboard.html",
+    page = summary.load(conn, user_id, "recurring_this_month", "goals")
+    allowance = page.totals.total_allowance
+    expenses = page.totals.total_expenses
+    savings = page.totals.total_saved
+    recurring_this_month = page.recurring_this_month
+    balance = page.totals.balance
+
+    # Daily safe spending limit and where the month is heading
+    outlook = analytics.outlook(conn, user_id, balance)
+    safe_limit = outlook["safe_limit"]
+    goals = page.goals
+
+    return dict(
         allowance=round(allowance, 2),
         expenses=round(expenses, 2),
         savings=round(savings, 2),
         recurring_month=round(recurring_this_month, 2),
         balance=round(balance, 2),
         safe_limit=round(safe_limit, 2),
+        projected_month_end=round(outlook["projected_month_end"], 2),
         goals=goals
     )
 
 
 
+# -------------------------
+# Operational stats
+# -------------------------
+@app.route("/stats")
+def stats():
+    return jsonify({"db": db_stats(), "ocr": ocr_engine.stats(), "ocr_jobs": ocr_jobs.stats(), "upload_store": upload_store.stats(),
+                    "page_cache": page_cache.stats(), "auth": auth_hashing.stats()})
+
+@app.route("/metrics")
+def metrics_endpoint():
+    # Prometheus text format; counts are for this worker process only
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # -------------------------
 # Run app
 # -------------------------
 if __name__ == "__main__":
-    # ensure DB exists / initialized
-    try:
-        init_db()
-    except Exception:
-        pass
-
     print("\n🔍 Registered routes:")
     for rule in app.url_map.iter_rules():
         print("➡", rule)
@@ -0,0 +1,317 @@
+# auth_hashing.py — bcrypt off the request threads: a bounded process pool, a calibrated cost,
+# rehash on login, constant-ish timing for unknown emails and per-IP attempt throttling
+#
+# Hashing and verifying run in a small process pool per web worker (AUTH_HASH_WORKERS), so a
+# burst of logins uses at most that many cores. A sign-in still holds its request thread
+# while it waits, so at most AUTH_HASH_QUEUE of them (default: half the gunicorn threads)
+# may be running or waiting at once; past that HashingBusy is raised and the page asks the
+# user to retry, leaving the other threads free for everything else.
+#
+# The cost (bcrypt's log2 work factor) is AUTH_HASH_COST, or calibrated on first use to the
+# highest cost that hashes within AUTH_HASH_TARGET_MS on this machine. A stored hash with a
+# lower cost is replaced after the next successful login; hashes are never downgraded, so
+# workers that calibrate a step apart don't rehash each other's users back and forth.
+#
+# Throttling counts attempts per client IP in this process (a token bucket); with several
+# gunicorn workers each keeps its own buckets. Behind a proxy set PROXY_HOPS (app.py) so
+# the client's address, not the proxy's, is used; with it unset the throttle is not applied.
+import logging, multiprocessing, os, threading, time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import bcrypt
+
+# -------------------------
+# Configuration
+# -------------------------
+WORKERS = int(os.environ.get("AUTH_HASH_WORKERS", "2"))  # 0 = hash on the request thread
+QUEUE = int(os.environ.get("AUTH_HASH_QUEUE", str(max(1, int(os.environ.get("GUNICORN_THREADS", "4")) // 2))))
+TIMEOUT = float(os.environ.get("AUTH_HASH_TIMEOUT", "10"))
+START_METHOD = os.environ.get("AUTH_HASH_START_METHOD", "spawn")
+COST = os.environ.get("AUTH_HASH_COST", "")  # empty = calibrate
+TARGET_MS = float(os.environ.get("AUTH_HASH_TARGET_MS", "250"))
+MIN_COST, MAX_COST = 10, 15
+ATTEMPTS_PER_MINUTE = float(os.environ.get("AUTH_ATTEMPTS_PER_MINUTE", "10"))
+ATTEMPT_BURST = int(os.environ.get("AUTH_ATTEMPT_BURST", "10"))
+MAX_PASSWORD_BYTES = 72  # bcrypt ignores the rest; bcrypt>=5 raises instead, so cut it here
+
+log = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool already has AUTH_HASH_QUEUE calls running or waiting,
+    a call takes longer than AUTH_HASH_TIMEOUT, or a pool process died."""
+
+BUSY_MESSAGE = "Too many sign-ins are being processed right now. Please try again in a moment."
+
+
+# -------------------------
+# Work done in the pool processes (module level so spawn can pickle them)
+# -------------------------
+def _secret(password):
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+def _hash(password, cost):
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(cost)).decode("utf-8")
+
+def _verify(password, hashed):
+    try:
+        return bcrypt.checkpw(_secret(password), hashed.encode("utf-8"))
+    except ValueError:
+        return False  # not a bcrypt hash
+
+
+# -------------------------
+# Cost
+# -------------------------
+_cost = None
+_cost_lock = threading.Lock()
+
+def calibrate(target_ms=TARGET_MS):
+    """(cost, estimated ms) for the highest cost within target_ms; each step doubles the work,
+    so a cheap cost is timed and scaled up."""
+    sample = min(_timed_hash(8) for _ in range(3)) / 2 ** 8
+    cost = MIN_COST
+    while cost < MAX_COST and sample * 2 ** (cost + 1) * 1000 <= target_ms:
+        cost += 1
+    return cost, sample * 2 ** cost * 1000
+
+def _timed_hash(cost):
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(cost))
+    return time.perf_counter() - start
+
+def current_cost():
+    """The cost new hashes use. The first call also seeds the verify() time estimate that
+    dummy_verify() sleeps for, so app.py calls it at startup, before any login."""
+    global _cost
+    if _cost is None:
+        with _cost_lock:
+            if _cost is None:
+                if COST:
+                    cost, estimate = int(COST), _timed_hash(int(COST)) * 1000
+                    log.info("bcrypt cost %d from AUTH_HASH_COST (~%.0f ms per hash)", cost, estimate)
+                else:
+                    cost, estimate = calibrate()
+                    log.info("bcrypt cost %d (~%.0f ms per hash, target %.0f ms)", cost, estimate, TARGET_MS)
+                with _stats_lock:
+                    _stats["verify_ms"] = _stats["verify_ms"] or estimate
+                _cost = cost
+    return _cost
+
+def cost_of(hashed):
+    # "$2b$12$<salt+hash>" -> 12; None for anything that is not a bcrypt hash
+    parts = (hashed or "").split("$")
+    return int(parts[2]) if len(parts) == 4 and parts[2].isdigit() else None
+
+def needs_rehash(hashed):
+    stored = cost_of(hashed)
+    return stored is None or stored < current_cost()
+
+
+# -------------------------
+# Pool
+# -------------------------
+class HashPool:
+    def __init__(self, workers=WORKERS, queue=QUEUE):
+        self.workers = max(0, workers)
+        self.queue = max(1, queue)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.queue)
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            self._reset()  # forked: the parent's pool processes are not ours
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    ctx = multiprocessing.get_context(START_METHOD)
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+        return self._executor
+
+    def _discard(self, executor):
+        # A pool process died (OOM kill, segfault): every pending call fails, so start a new pool
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        _count("pool_restarts")
+        log.warning("hashing pool broke; starting a new one")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            _count("busy")
+            raise HashingBusy(BUSY_MESSAGE)
+
+    @contextmanager
+    def slot(self):
+        # Hold a place in the queue without running anything in the pool (see dummy_verify)
+        self._acquire()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def submit(self, fn, *args):
+        self._acquire()
+        if self.workers == 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+            return future
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # broke since the last call finished; one retry on a fresh pool
+                self._discard(executor)
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            raise HashingBusy(BUSY_MESSAGE)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._done(executor, f))
+        return future
+
+    def _done(self, executor, future):
+        self._slots.release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard(executor)
+
+    def run(self, fn, *args, timeout=TIMEOUT):
+        """fn(*args) in the pool; HashingBusy if the queue is full, it times out or the pool broke."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # the call keeps its queue slot until it really finishes
+            _count("timeouts")
+            raise HashingBusy(BUSY_MESSAGE)
+        except BrokenProcessPool:
+            raise HashingBusy(BUSY_MESSAGE)
+
+    def in_flight(self):
+        return self.queue - self._slots._value
+
+
+_pool = HashPool()
+_stats = {"hashes": 0, "verifies": 0, "dummy_verifies": 0, "rehashes": 0, "busy": 0, "timeouts": 0,
+          "pool_restarts": 0, "throttled": 0, "verify_ms": 0.0}
+_stats_lock = threading.Lock()
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def hash_password(password):
+    """A bcrypt hash of password at the current cost, computed in the pool."""
+    _count("hashes")
+    return _pool.run(_hash, password, current_cost())
+
+def verify(password, hashed):
+    start = time.perf_counter()
+    ok = _pool.run(_verify, password, hashed)
+    elapsed = (time.perf_counter() - start) * 1000
+    with _stats_lock:
+        _stats["verifies"] += 1
+        # moving average of what a real check costs, for dummy_verify()
+        _stats["verify_ms"] = elapsed if not _stats["verify_ms"] else _stats["verify_ms"] * 0.9 + elapsed * 0.1
+    return ok
+
+def dummy_verify():
+    """Take about as long as verify() for an email with no account, without spending a core on it.
+    It queues like a real check too, so a busy pool answers unknown and known emails alike."""
+    current_cost()  # seeds the estimate if app.py's startup call has not
+    with _pool.slot():
+        _count("dummy_verifies")
+        time.sleep(_stats["verify_ms"] / 1000)
+    return False
+
+def rehash_if_needed(user_id, password, hashed):
+    # After a successful login: store a hash at the current cost; runs in the background
+    if not needs_rehash(hashed):
+        return None
+    try:
+        future = _pool.submit(_hash, password, current_cost())
+    except HashingBusy:
+        return None  # next login will do it
+    future.add_done_callback(lambda f: _store_rehash(user_id, hashed, f))
+    return future
+
+def _store_rehash(user_id, old, future):
+    from database import connect
+    try:
+        conn = connect()
+        try:
+            # only if the password was not changed meanwhile
+            conn.execute("UPDATE users SET password=? WHERE id=? AND password=?", (future.result(), user_id, old))
+            conn.commit()
+        finally:
+            conn.close()
+        _count("rehashes")
+    except Exception as e:
+        log.warning("rehash for user %s failed: %s", user_id, e)
+
+
+# -------------------------
+# Throttling
+# -------------------------
+class Throttle:
+    # Token bucket per key: `burst` attempts at once, refilled at `per_minute`
+    def __init__(self, per_minute=ATTEMPTS_PER_MINUTE, burst=ATTEMPT_BURST, max_keys=10000):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def allow(self, key, now=None):
+        """(allowed, seconds until the next attempt would be allowed)."""
+        now = now or time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False, (1 - tokens) / self.rate if self.rate else 60.0
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return True, 0.0
+
+    def _prune(self, now):
+        # drop buckets that have refilled; they would start full anyway
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.burst:
+                del self._buckets[key]
+
+
+_throttle = Throttle()
+
+def allow_attempt(ip):
+    allowed, retry_after = _throttle.allow(ip or "unknown")
+    if not allowed:
+        _count("throttled")
+    return allowed, retry_after
+
+
+def stats():
+    with _stats_lock:
+        s = dict(_stats)
+    s.update(workers=_pool.workers, queue=_pool.queue, in_flight=_pool.in_flight(), cost=_cost)
+    return s
@@ -0,0 +1,122 @@
+# benchmarks/bench_analytics.py — analytics.report() vs the same measures as a pure-Python loop
+#
+#   python benchmarks/bench_analytics.py [--expenses 100000] [--runs 20]
+#
+# "loop" fetches every expense row and walks it with dicts; "numpy" is analytics.report(),
+# which fetches the day rollups into arrays. The vectorized measures alone are timed too.
+import argparse, os, random, statistics, sys, tempfile, time
+from collections import defaultdict
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analytics
+import database
+
+TODAY = date(2025, 6, 15)
+
+
+def seed(conn, n):
+    rng = random.Random(42)
+    conn.execute("INSERT INTO users (id, name, email, password) VALUES (1, 'u', 'u@x', 'x')")
+    conn.execute("INSERT INTO allowances (user_id, amount, date) VALUES (1, 1e9, '2020-01-01')")
+    start = TODAY - timedelta(days=5 * 365)
+    conn.executemany("INSERT INTO expenses (user_id, category, amount, description, date) VALUES (1, ?, ?, ?, ?)",
+                     [(rng.choice(["Food", "Books", "Transport", "Fun", "Other"]), round(rng.uniform(5, 300), 2),
+                       rng.choice(["item", "Rent (Recurring)"]), (start + timedelta(days=rng.randint(0, 5 * 365))).isoformat())
+                      for _ in range(n)])
+    conn.executemany("""INSERT INTO recurring_expenses (user_id, title, amount, category, frequency, next_date, status)
+                        VALUES (1, ?, 99, 'Other', ?, ?, 'active')""",
+                     [("rent", "monthly", "2025-06-20"), ("gym", "weekly", "2025-06-16")])
+    conn.commit()
+
+
+def loop_report(rows, balance, commitments, today):
+    # rows: (day_number, amount, category, is_recurring)
+    end = analytics.day_number(today)
+    warm = analytics.MOVING_AVERAGE_DAYS
+    start = end - analytics.TREND_DAYS + 1
+    daily = defaultdict(float)
+    burn = defaultdict(float)
+    weekday = [0.0] * 7
+    lo, hi = None, None
+    for day, amount, category, recurring in rows:
+        if start - warm + 1 <= day <= end:
+            daily[day] += amount
+        if end - analytics.BURN_WINDOW_DAYS < day <= end and not recurring:
+            burn[category] += amount
+        weekday[(day + 3) % 7] += amount
+        lo = day if lo is None or day < lo else lo
+        hi = day if hi is None or day > hi else hi
+    series = [daily[d] for d in range(start - warm + 1, end + 1)]
+    averaged = []
+    for i in range(warm - 1, len(series)):
+        window = series[max(0, i - warm + 1):i + 1]
+        averaged.append(sum(window) / len(window))
+    counts = [0] * 7
+    for d in range(lo, hi + 1):
+        counts[(d + 3) % 7] += 1
+    rate = sum(burn.values()) / analytics.BURN_WINDOW_DAYS
+    return {"moving_average": averaged,
+            "weekdays": [t / c if c else 0.0 for t, c in zip(weekday, counts)],
+            "projected_month_end": balance - commitments - rate * (analytics.days_left(today) - 1)}
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--expenses", type=int, default=100000)
+    ap.add_argument("--runs", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        conn = database.connect()
+        seed(conn, args.expenses)
+
+        commitments = analytics.upcoming_commitments(conn, 1, TODAY)
+        cur = conn.cursor()
+        cur.row_factory = None
+
+        def fetch_rows():
+            return cur.execute("""SELECT CAST(julianday(date) - 2440587.5 AS INTEGER), amount, category,
+                                         description LIKE '%(Recurring)%' FROM expenses WHERE user_id=1""").fetchall()
+        rows = fetch_rows()
+        frame = analytics.load(conn, 1)
+
+        expected = loop_report(rows, 0.0, commitments, TODAY)
+        got = analytics.report(conn, 1, 0.0, TODAY)
+        assert abs(expected["projected_month_end"] - got["projected_month_end"]) < 0.01
+        assert all(abs(a - b) < 0.01 for a, b in zip(expected["moving_average"], got["moving_average"]))
+
+        loop_ms = timed(lambda: loop_report(rows, 0.0, commitments, TODAY), args.runs)
+        loop_total_ms = timed(lambda: loop_report(fetch_rows(), 0.0, commitments, TODAY), args.runs)
+        load_ms = timed(lambda: analytics.load(conn, 1), args.runs)
+
+        def vectorized():
+            end = analytics.day_number(TODAY)
+            series = analytics.daily_totals(frame, end - analytics.TREND_DAYS - analytics.MOVING_AVERAGE_DAYS + 2, end)
+            analytics.moving_average(series)
+            analytics.burn_rates(frame, TODAY)
+            analytics.weekday_pattern(frame)
+        numpy_ms = timed(vectorized, args.runs)
+        report_ms = timed(lambda: analytics.report(conn, 1, 0.0, TODAY), args.runs)
+        conn.close()
+
+    print(f"expenses:                    {args.expenses}  ({len(frame.days)} day/category entries)")
+    print(f"pure-Python loop        p50: {loop_ms:8.2f} ms  ({loop_total_ms:.2f} ms with the row fetch)")
+    print(f"numpy measures          p50: {numpy_ms:8.2f} ms  ({loop_ms / numpy_ms:.1f}x)")
+    print(f"rollup fetch + arrays   p50: {load_ms:8.2f} ms")
+    print(f"analytics.report()      p50: {report_ms:8.2f} ms  ({loop_total_ms / report_ms:.1f}x end to end)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_classifier.py — classifier.classify_many() vs the old per-keyword substring scans
+#
+#   python benchmarks/bench_classifier.py [--texts 10000] [--runs 5]
+#
+# The "old" functions are copied from ocr_utils as they were before classifier.py replaced them.
+import argparse, os, random, statistics, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classifier
+
+CATEGORY_KEYWORDS = {
+    "Food": ["food", "burger", "pizza", "hotel", "restaurant", "meal"],
+    "Transport": ["uber", "ola", "bus", "train", "auto", "ride"],
+    "Shopping": ["mall", "shopping", "fashion", "clothes", "shirt"],
+    "Stationary": ["pen", "pencil", "notebook", "book"],
+    "Entertainment": ["movie", "cinema", "ticket", "theatre"],
+}
+
+def old_guess_category(text):
+    text = (text or "").lower()
+    mapping = {
+        "Food": ["pizza", "burger", "chips", "juice", "milk", "meal", "dosa", "idli", "kfc"],
+        "Books": ["book", "pen", "notebook"],
+        "Transport": ["bus", "uber", "ola", "fuel", "taxi"],
+        "Shopping": ["cloth", "amazon", "flipkart", "shopping"],
+        "Medical": ["tablet", "medicine", "clinic", "doctor"],
+        "Personal Care": ["hair", "salon", "shampoo"],
+        "Electronics": ["charger", "earphone", "laptop", "mobile"],
+    }
+    for cat, keys in mapping.items():
+        if any(k in text for k in keys):
+            return cat
+    return "Other"
+
+def old_detect_category(text):
+    text = text.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(word in text for word in keywords):
+            return category
+    return "Other"
+
+
+WORDS = ["paneer", "masala", "veg", "combo", "large", "small", "extra", "cheese", "plain", "family", "pack",
+         "total", "qty", "gst", "item", "special", "fresh", "classic", "spicy", "order", "no", "ref"]
+KEYWORDS = [w for ws in classifier.KEYWORDS.values() for w in ws]
+
+def descriptions(n):
+    rng = random.Random(7)
+    out = []
+    for i in range(n):
+        words = rng.sample(WORDS, rng.randint(2, 6))
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORDS))
+        out.append(" ".join(words).upper() if i % 3 == 0 else " ".join(words))
+    return out
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=10000)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    texts = descriptions(args.texts)
+
+    # Both old functions ran on the same text: one for bill lines, one for the whole bill
+    old_ms = timed(lambda: [(old_guess_category(t), old_detect_category(t)) for t in texts], args.runs)
+    guess_ms = timed(lambda: [old_guess_category(t) for t in texts], args.runs)
+    new_ms = timed(lambda: classifier.classify_many(texts), args.runs)
+    overrides = {classifier.description_key(t): "Food" for t in texts[::10]}
+    override_ms = timed(lambda: classifier.classify_many(texts, overrides), args.runs)
+
+    new = classifier.classify_many(texts)
+    known = [(old_guess_category(t), c) for t, c in zip(texts, new) if old_guess_category(t) != "Other"]
+    agree = sum(o == c for o, c in known)
+    print(f"texts:                          {args.texts}")
+    print(f"old guess + detect         p50: {old_ms:8.2f} ms")
+    print(f"old guess_category only    p50: {guess_ms:8.2f} ms")
+    print(f"classify_many              p50: {new_ms:8.2f} ms  ({guess_ms / new_ms:.1f}x vs guess_category, "
+          f"{args.texts / new_ms * 1000:,.0f} texts/sec)")
+    print(f"classify_many + overrides  p50: {override_ms:8.2f} ms  ({len(overrides)} overrides)")
+    print(f"same category where guess_category found one: {agree / len(known):.1%} of {len(known)}")
+
+
+if __name__ == "__main__":
+    main()
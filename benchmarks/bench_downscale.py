@@ -0,0 +1,52 @@
+# benchmarks/bench_downscale.py — latency and peak RSS: full-resolution OCR input vs early downscale
+#
+#   python benchmarks/bench_downscale.py                 # decode + OCR (needs easyocr)
+#   python benchmarks/bench_downscale.py --decode-only   # decode stage only
+#
+# Each variant runs in a fresh subprocess so ru_maxrss is that variant's own peak.
+import os, resource, subprocess, sys, tempfile, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_photo(path, width=4000, height=3000):
+    # Synthetic 12MP "phone photo" of a bill: noisy paper with receipt lines on it
+    import cv2, numpy as np
+    img = np.random.default_rng(0).integers(200, 255, (height, width, 3), dtype=np.uint8)
+    for i, line in enumerate(["CAMPUS CAFE", "Masala Dosa 60.00", "Cold Coffee 45.00",
+                              "Veg Sandwich 55.00", "TOTAL 160.00"]):
+        cv2.putText(img, line, (300, 500 + i * 400), cv2.FONT_HERSHEY_SIMPLEX, 6, (20, 20, 20), 12)
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+
+def run_variant(variant, path, decode_only):
+    import cv2
+    start = time.perf_counter()
+    if variant == "full":
+        img = cv2.imread(path)
+        if not decode_only:
+            import ocr_engine
+            ocr_engine.readtext(img, detail=0)
+    else:
+        from ocr_utils import load_pages
+        img = load_pages(path)[0]
+        if not decode_only:
+            import ocr_engine
+            ocr_engine.readtext(img, detail=0)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{variant:10s} {img.shape[1]}x{img.shape[0]:<6d} {elapsed * 1000:9.1f} ms  peak RSS {peak_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        run_variant(sys.argv[2], sys.argv[3], sys.argv[4] == "1")
+        sys.exit()
+    decode_only = "--decode-only" in sys.argv
+    with tempfile.TemporaryDirectory() as tmp:
+        photo = os.path.join(tmp, "bill.jpg")
+        make_photo(photo)
+        print(f"input: 4000x3000 JPEG, {os.path.getsize(photo) / 1e6:.1f} MB on disk"
+              f"{' (decode only)' if decode_only else ''}")
+        for variant in ("full", "downscale"):
+            subprocess.run([sys.executable, __file__, "--child", variant, photo, "1" if decode_only else "0"],
+                           check=True)
@@ -0,0 +1,111 @@
+# benchmarks/bench_helpers.py — ops/sec, p50 and p99 for the helpers every page or bill goes through
+#
+#   python benchmarks/seed.py --db /tmp/bench.db --scale 100k
+#   python benchmarks/bench_helpers.py --db /tmp/bench.db [--runs 2000] [--save] [--compare [FILE]]
+#
+# Text helpers run on the receipt fixtures; the database helpers run against a seeded
+# database (benchmarks/seed.py), cycling through its users. apply_recurring works on a
+# copy of that database so the original stays as seeded. --save writes the numbers to
+# benchmarks/results/helpers-*.json; --compare prints the change against the latest (or
+# given) saved run. The same helpers, plus rollups and statement imports, also run under
+# pytest-benchmark: python -m pytest tests/benchmarks --benchmark-only
+import argparse, os, shutil, statistics, sys, tempfile, time
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database, classifier, limits, ocr_utils, receipt_parser, scheduler, summary
+import results
+from bench_receipts import load_fixtures
+
+
+def timed(fn, runs):
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {"ops_per_sec": runs / sum(samples),
+            "p50_ms": statistics.median(samples) * 1000,
+            "p99_ms": samples[max(0, int(len(samples) * 0.99) - 1)] * 1000}
+
+
+def text_benchmarks(runs):
+    texts = [data for _, kind, data, _ in load_fixtures() if kind == "text"]
+    names = [it["name"] for t in texts for it in receipt_parser.parse_text(t).items]
+    return {
+        "parse_items_from_text": timed(lambda i: ocr_utils.parse_items_from_text(texts[i % len(texts)]), runs),
+        "parse_text": timed(lambda i: receipt_parser.parse_text(texts[i % len(texts)]), runs),
+        "classify": timed(lambda i: classifier.classify(names[i % len(names)]), runs * 10),
+        "items_from_text": timed(lambda i: ocr_utils.items_from_text(texts[i % len(texts)]), runs),
+    }
+
+
+def db_benchmarks(db, runs):
+    database.DB_NAME = db
+    conn = database.connect()
+    users = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+    if not users:
+        sys.exit(f"{db} has no users; run benchmarks/seed.py first")
+    pick = lambda i: users[i % len(users)]
+    out = {
+        "summary.totals": timed(lambda i: summary.totals(conn, pick(i)), runs),
+        "summary.load(home2)": timed(lambda i: summary.load(conn, pick(i), "recurring", "limits", "goals",
+                                                            recurring_limit=5), runs),
+        "limits.headroom": timed(lambda i: limits.headroom(conn, pick(i)), runs),
+        "limits.check": timed(lambda i: limits.check(conn, pick(i), [("Food", 150.0), ("Transport", 40.0)]), runs),
+    }
+    conn.close()
+    return out
+
+
+def recurring_benchmark(db, runs):
+    # Each run rewinds every active item by a month and posts what fell due, like a missed scheduler
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, "recurring.db")
+        shutil.copy(db, copy)
+        database.DB_NAME = copy
+        conn = database.connect()
+        back = (date.today() - timedelta(days=30)).isoformat()
+        posted, samples = 0, []
+        for _ in range(max(1, runs // 100)):
+            conn.execute("UPDATE recurring_expenses SET next_date=? WHERE status='active'", (back,))
+            conn.commit()
+            start = time.perf_counter()
+            posted += scheduler.run_due(conn)
+            samples.append(time.perf_counter() - start)
+        conn.close()
+    total = sum(samples)
+    return {"apply_recurring": {"ops_per_sec": len(samples) / total, "rows_per_sec": posted / total,
+                                "p50_ms": statistics.median(samples) * 1000, "p99_ms": max(samples) * 1000}}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", help="seeded database (benchmarks/seed.py); text helpers only without it")
+    ap.add_argument("--runs", type=int, default=2000)
+    ap.add_argument("--save", action="store_true", help="write benchmarks/results/helpers-*.json")
+    ap.add_argument("--compare", nargs="?", const="latest", help="a saved run to compare with (default: latest)")
+    args = ap.parse_args()
+
+    baseline = results.latest("helpers") if args.compare == "latest" else args.compare
+    out = text_benchmarks(args.runs)
+    if args.db:
+        out.update(db_benchmarks(args.db, args.runs))
+        out.update(recurring_benchmark(args.db, args.runs))
+
+    print(f"{'helper':28s} {'ops/sec':>12s} {'p50 ms':>9s} {'p99 ms':>9s}")
+    for name, r in out.items():
+        print(f"{name:28s} {r['ops_per_sec']:12,.0f} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f}")
+    if args.compare:
+        if baseline:
+            print()
+            results.compare(results.load(baseline), {"results": out})
+        else:
+            print("\nno saved helpers run to compare with")
+    if args.save:
+        results.save("helpers", out, vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_insert.py — rows/sec for the old per-row INSERT loop vs database.insert_expenses()
+#
+#   python benchmarks/bench_insert.py [--rows 10000]
+#
+# "loop" is what add_invoice_items did (one execute per row, one commit);
+# "loop + commit" is one commit per row; "batch" is insert_expenses() with the balance check.
+# Each variant runs on a fresh migrated database, so the balance/rollup triggers fire in all three.
+import argparse, os, random, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def make_rows(n):
+    rng = random.Random(42)
+    return [(1, rng.choice(["Food", "Books", "Transport"]), round(rng.uniform(5, 300), 2), f"item {i}",
+             f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}") for i in range(n)]
+
+
+def fresh(tmp, name):
+    database.DB_NAME = os.path.join(tmp, name + ".db")
+    database.init_db()
+    conn = database.connect()
+    conn.execute("INSERT INTO users (id, name, email, password) VALUES (1, 'u', 'u@x', 'x')")
+    conn.execute("INSERT INTO allowances (user_id, amount, date) VALUES (1, 1e12, '2024-01-01')")
+    conn.commit()
+    return conn
+
+
+def loop(conn, rows):
+    cur = conn.cursor()
+    for r in rows:
+        cur.execute("INSERT INTO expenses (user_id, category, amount, description, date) VALUES (?, ?, ?, ?, ?)", r)
+    conn.commit()
+
+def loop_commit(conn, rows):
+    cur = conn.cursor()
+    for r in rows:
+        cur.execute("INSERT INTO expenses (user_id, category, amount, description, date) VALUES (?, ?, ?, ?, ?)", r)
+        conn.commit()
+
+def batch(conn, rows):
+    ids = database.insert_expenses(conn, rows)
+    assert len(ids) == len(rows)
+    got = conn.execute("SELECT MIN(id), MAX(id), COUNT(*) FROM expenses").fetchone()
+    assert (got[0], got[1], got[2]) == (ids[0], ids[-1], len(rows))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+    rows = make_rows(args.rows)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in (("loop", loop), ("loop + commit", loop_commit), ("batch", batch)):
+            conn = fresh(tmp, name.replace(" + ", "_"))
+            start = time.perf_counter()
+            fn(conn, rows)
+            results[name] = time.perf_counter() - start
+            conn.close()
+
+    print(f"rows: {args.rows}")
+    for name, seconds in results.items():
+        print(f"{name:14s} {seconds * 1000:9.1f} ms  {args.rows / seconds:10.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_login_flood.py — page latency while a flood of sign-ins hits the server
+#
+#   python benchmarks/seed.py --db /tmp/bench.db --scale 10k
+#   python benchmarks/bench_login_flood.py --db /tmp/bench.db [--flood 24] [--clients 4] [--duration 12]
+#
+# Starts gunicorn on a copy of the database (like load.py), logs --clients users in, then
+# runs --flood threads posting wrong passwords to /login while those users load /home2.
+# Each flood thread claims its own X-Forwarded-For address (PROXY_HOPS=1) and the per-IP
+# limit is raised, so what is measured is the hashing pool, not the throttle.
+import argparse, os, shutil, statistics, sys, tempfile, threading, time
+import urllib.error, urllib.parse, urllib.request
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True, help="seeded database (benchmarks/seed.py)")
+    ap.add_argument("--flood", type=int, default=24, help="threads posting bad logins")
+    ap.add_argument("--clients", type=int, default=4, help="logged-in users loading /home2")
+    ap.add_argument("--duration", type=float, default=12)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(args.db, os.path.join(tmp, "database.db"))
+        users = load.seeded_users(os.path.join(tmp, "database.db"))
+        proc, base = load.start_server(tmp, load.free_port(), {"RECURRING_SCHEDULER": "off", "GUNICORN_MAX_REQUESTS": "0",
+                                                               "PROXY_HOPS": "1", "AUTH_ATTEMPT_BURST": "100000"})
+        try:
+            openers = [load.client() for _ in range(args.clients)]
+            for n, opener in enumerate(openers):
+                load.login(opener, base, users[n % len(users)])
+            stop = time.time() + args.duration
+            latencies, statuses = [], {}
+            lock = threading.Lock()
+
+            def flood(n):
+                opener = load.client()
+                body = urllib.parse.urlencode({"email": f"user{users[n % len(users)]}@seed.local",
+                                               "password": "wrong"}).encode()
+                while time.time() < stop:
+                    req = urllib.request.Request(base + "/login", data=body,
+                                                 headers={"X-Forwarded-For": f"10.0.{n // 250}.{n % 250 + 1}"})
+                    try:
+                        with opener.open(req, timeout=60) as resp:
+                            resp.read()
+                            status = resp.status
+                    except urllib.error.HTTPError as e:
+                        status = e.code
+                    except OSError:
+                        status = 599
+                    with lock:
+                        statuses[status] = statuses.get(status, 0) + 1
+
+            def browse(opener):
+                while time.time() < stop:
+                    start = time.perf_counter()
+                    load.request(opener, base, "GET", "/home2")
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+
+            threads = [threading.Thread(target=flood, args=(n,)) for n in range(args.flood)]
+            threads += [threading.Thread(target=browse, args=(o,)) for o in openers]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            proc.terminate()
+            proc.wait(30)
+
+    latencies.sort()
+    print(f"{args.flood} flood threads, {args.clients} users on /home2, {args.duration:g}s")
+    print(f"/home2: {len(latencies)} requests, p50 {statistics.median(latencies) * 1000:.0f} ms, "
+          f"p99 {latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000:.0f} ms")
+    print("/login responses: " + ", ".join(f"{code}: {n}" for code, n in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
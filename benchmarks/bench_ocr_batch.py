@@ -0,0 +1,42 @@
+# benchmarks/bench_ocr_batch.py — images/sec: one-by-one upload path vs batched bundle path
+#
+#   python benchmarks/bench_ocr_batch.py static/uploads/*.png
+#
+# Both paths OCR the same decoded, downscaled pages from ocr_utils.load_pages, so the
+# speed-up is batching alone; decoding is timed once, separately.
+import os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_engine
+from ocr_utils import OCR_BATCH_SIZE, _pad_to_common, load_pages, read_page
+
+
+def one_by_one(pages):
+    start = time.perf_counter()
+    for page in pages:
+        read_page(ocr_engine.readtext(page, detail=1))
+    return time.perf_counter() - start
+
+def batched(pages, batch_size=OCR_BATCH_SIZE):
+    start = time.perf_counter()
+    for i in range(0, len(pages), batch_size):
+        for boxes in ocr_engine.readtext_batched(_pad_to_common(pages[i:i + batch_size]), detail=1):
+            read_page(boxes)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    if not paths:
+        sys.exit("usage: bench_ocr_batch.py IMAGE [IMAGE ...]")
+    start = time.perf_counter()
+    pages = [page for path in paths for page in load_pages(path)]
+    t_decode = time.perf_counter() - start
+    ocr_engine.get_pool().warm()  # keep model load out of both timings
+    t_single = one_by_one(pages)
+    t_batch = batched(pages)
+    n = len(pages)
+    print(f"pages:       {n} from {len(paths)} file(s), decoded in {t_decode:.2f}s (not in the timings below)")
+    print(f"one-by-one:  {t_single:.2f}s  ({n / t_single:.2f} img/s)")
+    print(f"batched:     {t_batch:.2f}s  ({n / t_batch:.2f} img/s)")
+    print(f"speedup:     {t_single / t_batch:.2f}x")
@@ -0,0 +1,107 @@
+# benchmarks/bench_receipts.py — receipt_parser accuracy on the fixture bills, and lines/sec vs the old parser
+#
+#   python benchmarks/bench_receipts.py [--lines 100000] [--runs 5]
+#
+# Fixtures live in benchmarks/fixtures/receipts: NAME.txt (bill text) or NAME.boxes.json
+# (easyocr detail=1 output), each with a NAME.expected.json holding the items and totals.
+# The "old" parser is ocr_utils.parse_items_from_text as it was before receipt_parser.py.
+import argparse, glob, json, os, re, statistics, sys, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import receipt_parser
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "receipts")
+
+
+def old_parse_items_from_text(text):
+    items = []
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    line_re = re.compile(r'(.+?)[\:\-\—\s]{1,}\s*([0-9]{1,3}(?:[,\s][0-9]{3})*(?:\.[0-9]{2})?)')
+    for ln in lines:
+        m = line_re.search(ln)
+        if m:
+            try:
+                items.append({"name": m.group(1).strip(), "amount": float(m.group(2).replace(',', ''))})
+            except:
+                pass
+    return items
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.expected.json"))):
+        name = os.path.basename(path)[:-len(".expected.json")]
+        with open(path) as f:
+            expected = json.load(f)
+        text_path = os.path.join(FIXTURES, name + ".txt")
+        if os.path.exists(text_path):
+            with open(text_path, encoding="utf-8") as f:
+                fixtures.append((name, "text", f.read(), expected))
+        else:
+            with open(os.path.join(FIXTURES, name + ".boxes.json")) as f:
+                fixtures.append((name, "boxes", json.load(f), expected))
+    return fixtures
+
+def parse(kind, data):
+    if kind == "boxes":
+        return receipt_parser.read_boxes(data)
+    return data, receipt_parser.parse_text(data)
+
+def check(receipt, expected):
+    # Names of the fields that differ from the fixture's expectations
+    wrong = []
+    if [(it["name"], it["amount"]) for it in receipt.items] != [tuple(it) for it in expected["items"]]:
+        wrong.append("items")
+    for key in ("subtotal", "tax", "total", "balanced"):
+        if getattr(receipt, key) != expected[key]:
+            wrong.append(key)
+    return wrong
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=100000)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    fixtures = load_fixtures()
+    print(f"{'fixture':18s} {'items':>5s} {'old':>5s}  total     result")
+    for name, kind, data, expected in fixtures:
+        text, receipt = parse(kind, data)
+        wrong = check(receipt, expected)
+        old = old_parse_items_from_text(text)
+        print(f"{name:18s} {len(receipt.items):5d} {len(old):5d}  {receipt.total!s:8s}  "
+              f"{'ok' if not wrong else 'WRONG: ' + ', '.join(wrong)}")
+
+    # Throughput: the text fixtures' lines repeated up to --lines
+    corpus = [ln for _, kind, data, _ in fixtures if kind == "text" for ln in data.splitlines()]
+    lines = (corpus * (args.lines // len(corpus) + 1))[:args.lines]
+    text = "\n".join(lines)
+    old_s = timed(lambda: old_parse_items_from_text(text), args.runs)
+    new_s = timed(lambda: receipt_parser.parse_lines(lines), args.runs)
+
+    boxes = [data for _, kind, data, _ in fixtures if kind == "boxes"]
+    box_lines = sum(len(receipt_parser.group_lines(b)) for b in boxes)
+    reps = max(1, args.lines // max(box_lines, 1) // 10)
+    box_s = timed(lambda: [receipt_parser.read_boxes(b) for _ in range(reps) for b in boxes], args.runs)
+
+    print(f"\nlines: {len(lines)}")
+    print(f"old parse_items_from_text  {old_s * 1000:8.1f} ms  {len(lines) / old_s:10,.0f} lines/sec")
+    print(f"receipt_parser.parse_lines {new_s * 1000:8.1f} ms  {len(lines) / new_s:10,.0f} lines/sec")
+    if boxes:
+        print(f"receipt_parser.read_boxes  {box_s * 1000:8.1f} ms  {box_lines * reps / box_s:10,.0f} lines/sec "
+              f"(grouping detail=1 boxes, {box_lines * reps} lines)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_startup.py — what `import app` costs a fresh worker, from `python -X importtime`
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--top 15] [-o benchmarks/startup_report.txt]
+#
+# Each run imports the app in a new interpreter (temp directory, so a throwaway database)
+# and parses the importtime table from stderr. The report lists the slowest imports by
+# cumulative time and whether any of the heavy OCR / numeric stack came along.
+import argparse, os, statistics, subprocess, sys, tempfile, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a page view should never need to import
+HEAVY = ["torch", "easyocr", "cv2", "numpy", "scipy", "PIL"]
+
+
+def import_once(module, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT, RECURRING_SCHEDULER="off", PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode:
+        sys.exit(proc.stderr[-2000:])
+    # "import time: self [us] | cumulative | imported package"
+    rows = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows[name.strip()] = (int(self_us), int(cumulative_us), len(name) - len(name.lstrip()) - 1)
+    return wall, rows
+
+
+def report(module, runs, top):
+    walls, tables = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            wall, rows = import_once(module, tmp)
+            walls.append(wall)
+            tables.append(rows)
+    rows = tables[-1]
+    median_cum = {name: statistics.median(t[name][1] for t in tables if name in t) for name in rows}
+    lines = [f"python -X importtime -c 'import {module}'  ({runs} runs, {sys.version.split()[0]})",
+             f"interpreter start + import, wall:  median {statistics.median(walls) * 1000:7.1f} ms  "
+             f"(min {min(walls) * 1000:.1f})",
+             f"import {module}, cumulative:       median {median_cum.get(module, 0) / 1000:7.1f} ms",
+             "",
+             f"{'cumulative ms':>13s}  {'self ms':>8s}  module"]
+    for name in sorted(rows, key=lambda n: -median_cum[n])[:top]:
+        self_us, _, depth = rows[name]
+        lines.append(f"{median_cum[name] / 1000:13.1f}  {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+    lines.append("")
+    for name in HEAVY:
+        loaded = name in rows
+        lines.append(f"{name:8s} {'imported (%.1f ms)' % (median_cum[name] / 1000) if loaded else 'not imported'}")
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--module", default="app")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("-o", "--output", help="also write the report to this file")
+    args = ap.parse_args()
+    text = report(args.module, args.runs, args.top)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
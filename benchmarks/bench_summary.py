@@ -0,0 +1,76 @@
+# benchmarks/bench_summary.py — queries per request and p50/p99 for the home2 totals block
+#
+#   python benchmarks/bench_summary.py [--users 50] [--expenses 2000] [--runs 2000]
+#
+# "before" replays the queries home2 used to issue (three SUM scans plus three previews);
+# "after" is summary.load(). Both run against the same seeded, migrated database.
+import argparse, os, random, statistics, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import summary
+
+
+def seed(conn, users, expenses):
+    rng = random.Random(42)
+    cur = conn.cursor()
+    for u in range(1, users + 1):
+        cur.execute("INSERT INTO users (id, name, email, password) VALUES (?, ?, ?, 'x')", (u, f"u{u}", f"u{u}@x"))
+        cur.executemany("INSERT INTO allowances (user_id, amount, date) VALUES (?, ?, '2024-01-01')",
+                        [(u, 5000.0)] * 6)
+        cur.executemany("INSERT INTO expenses (user_id, category, amount, description, date) VALUES (?, ?, ?, ?, ?)",
+                        [(u, rng.choice(["Food", "Books", "Transport"]), round(rng.uniform(5, 300), 2), "item",
+                          f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}") for _ in range(expenses)])
+        cur.executemany("INSERT INTO goals (user_id, title, target_amount, saved_amount) VALUES (?, ?, 1000, 100)",
+                        [(u, f"goal {i}") for i in range(3)])
+        cur.executemany("""INSERT INTO recurring_expenses (user_id, title, amount, category, frequency, next_date, status)
+                           VALUES (?, ?, 99, 'Other', 'monthly', '2024-01-01', 'active')""",
+                        [(u, f"sub {i}") for i in range(8)])
+        cur.executemany("INSERT INTO category_limits (user_id, category, limit_amount) VALUES (?, ?, 500)",
+                        [(u, c) for c in ("Food", "Books")])
+    conn.commit()
+
+
+def before(conn, user_id):
+    cur = conn.cursor()
+    cur.execute("SELECT SUM(amount) AS t FROM allowances WHERE user_id=?", (user_id,)); cur.fetchone()
+    cur.execute("SELECT SUM(amount) AS t FROM expenses WHERE user_id=?", (user_id,)); cur.fetchone()
+    cur.execute("SELECT SUM(saved_amount) AS t FROM goals WHERE user_id=?", (user_id,)); cur.fetchone()
+    cur.execute("SELECT * FROM recurring_expenses WHERE user_id=? ORDER BY id DESC LIMIT 5", (user_id,)); cur.fetchall()
+    cur.execute("SELECT * FROM category_limits WHERE user_id=?", (user_id,)); cur.fetchall()
+    cur.execute("SELECT * FROM goals WHERE user_id=?", (user_id,)); cur.fetchall()
+
+def after(conn, user_id):
+    summary.load(conn, user_id, "recurring", "limits", "goals", recurring_limit=5)
+
+
+def measure(conn, fn, users, runs):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    fn(conn, 1)
+    conn.set_trace_callback(None)
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        fn(conn, i % users + 1)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return len(statements), statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--expenses", type=int, default=2000)
+    ap.add_argument("--runs", type=int, default=2000)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "bench.db")
+        database.init_db()
+        conn = database.connect()
+        seed(conn, args.users, args.expenses)
+        print(f"{args.users} users x {args.expenses} expenses, {args.runs} requests each")
+        for name, fn in (("before", before), ("after", after)):
+            queries, p50, p99 = measure(conn, fn, args.users, args.runs)
+            print(f"{name:7s} queries/request={queries}  p50={p50:.3f} ms  p99={p99:.3f} ms")
+        conn.close()
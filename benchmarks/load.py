@@ -0,0 +1,249 @@
+# benchmarks/load.py — drive every page with logged-in clients and report throughput and p50/p99 per route
+#
+#   python benchmarks/load.py --scale 100k --clients 16 --duration 30 [--save] [--compare [FILE]]
+#   python benchmarks/load.py --db /tmp/bench.db ...        # copy of an already seeded database
+#   python benchmarks/load.py --url http://127.0.0.1:8000 --users 100 ...   # a server you started
+#
+# Without --url this starts `gunicorn -c gunicorn.conf.py app:app` in a temporary directory
+# holding the seeded database.db (gunicorn must be installed), so nothing touches your own
+# database and everything runs offline. Each client is a thread with its own cookie jar,
+# logged in as one of the seeded users (benchmarks/seed.py), picking routes by ROUTES'
+# weights. Redirects are not followed; any status below 400 counts as a success.
+# Bill uploads are not in the mix: OCR needs the easyocr models (see bench_ocr_batch.py).
+import argparse, os, random, shutil, socket, subprocess, sys, tempfile, threading, time
+import urllib.error, urllib.parse, urllib.request
+from http.cookiejar import CookieJar
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import results
+import seed
+
+# (label, method, path, weight); POST bodies come from form_for()
+ROUTES = [
+    ("GET /home2", "GET", "/home2", 15),
+    ("GET /log_expense", "GET", "/log_expense", 15),
+    ("GET /api/expenses", "GET", "/api/expenses?limit=50", 12),
+    ("GET /api/expenses?category", "GET", "/api/expenses?category=Food&limit=50", 5),
+    ("GET /dashboard", "GET", "/dashboard", 10),
+    ("GET /insights", "GET", "/insights", 8),
+    ("GET /insights?range=year", "GET", "/insights?range=year", 3),
+    ("GET /api/analytics", "GET", "/api/analytics", 5),
+    ("GET /limits", "GET", "/limits", 5),
+    ("GET /goals", "GET", "/goals", 5),
+    ("GET /recurring", "GET", "/recurring", 5),
+    ("GET /export", "GET", "/export?format=csv", 1),
+    ("GET /stats", "GET", "/stats", 1),
+    ("GET /metrics", "GET", "/metrics", 1),
+    ("POST /log_expense", "POST", "/log_expense", 8),
+]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+def client():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), NoRedirect())
+
+def request(opener, base, method, path, form=None):
+    data = urllib.parse.urlencode(form).encode() if form is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    try:
+        with opener.open(req, timeout=60) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+def form_for(rng):
+    cat = rng.choice(list(seed.CATEGORIES))
+    median, _, names = seed.CATEGORIES[cat]
+    return {"expense_amount": str(round(median * rng.uniform(0.3, 1.5), 2)), "category": cat,
+            "description": rng.choice(names)}
+
+def login(opener, base, user_id, attempts=50):
+    for _ in range(attempts):
+        status = request(opener, base, "POST", "/login",
+                         {"email": f"user{user_id}@seed.local", "password": seed.PASSWORD})
+        if status not in (429, 503):  # throttled or hashing pool full: back off like a person would
+            break
+        time.sleep(random.uniform(0.2, 0.6))
+    # A good login redirects to /home2; a bad one re-renders the form with 200
+    if status != 302:
+        raise RuntimeError(f"login as user{user_id}@seed.local failed (HTTP {status}); is the database seeded?")
+
+
+# -------------------------
+# Load
+# -------------------------
+def run_load(base, users, clients, duration, warmup, seed_value):
+    samples = {label: [] for label, *_ in ROUTES}
+    errors = {label: 0 for label, *_ in ROUTES}
+    lock = threading.Lock()
+    window = {}
+    failures = []
+
+    def logged_in():
+        # the clock starts once every client has logged in (bcrypt is slow on purpose)
+        window["start"] = time.perf_counter() + warmup
+        window["stop"] = window["start"] + duration
+
+    ready = threading.Barrier(clients, action=logged_in)
+
+    def worker(n):
+        rng = random.Random(seed_value + n)
+        opener = client()
+        try:
+            login(opener, base, users[n % len(users)])
+        except Exception as e:
+            failures.append(str(e))
+        ready.wait()
+        if failures:
+            return
+        start_at, stop_at = window["start"], window["stop"]
+        weights = [w for *_, w in ROUTES]
+        while True:
+            label, method, path, _ = rng.choices(ROUTES, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                status = request(opener, base, method, path, form_for(rng) if method == "POST" else None)
+            except OSError:
+                status = 599
+            t1 = time.perf_counter()
+            if t1 >= stop_at:
+                return
+            if t0 >= start_at:  # requests started during warmup are not counted
+                with lock:
+                    samples[label].append(t1 - t0)
+                    errors[label] += status >= 400
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if failures:
+        sys.exit(failures[0])
+    return summarise(samples, errors, duration)
+
+def summarise(samples, errors, duration):
+    out = {}
+    everything = []
+    for label, times in samples.items():
+        if not times:
+            continue
+        times.sort()
+        everything.extend(times)
+        out[label] = {"requests": len(times), "rps": len(times) / duration, "errors": errors[label],
+                      "p50_ms": times[len(times) // 2] * 1000,
+                      "p99_ms": times[max(0, int(len(times) * 0.99) - 1)] * 1000}
+    everything.sort()
+    if everything:
+        out["ALL"] = {"requests": len(everything), "rps": len(everything) / duration, "errors": sum(errors.values()),
+                      "p50_ms": everything[len(everything) // 2] * 1000,
+                      "p99_ms": everything[max(0, int(len(everything) * 0.99) - 1)] * 1000}
+    return out
+
+
+# -------------------------
+# Server
+# -------------------------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workdir, port, extra_env):
+    env = dict(os.environ, PORT=str(port), **extra_env)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT, os.environ.get("PYTHONPATH")) if p)
+    log = open(os.path.join(workdir, "gunicorn.log"), "w")
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"), "app:app"],
+                            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            log.close()
+            with open(log.name) as f:
+                sys.exit("gunicorn exited:\n" + f.read()[-3000:])
+        try:
+            urllib.request.urlopen(base + "/login", timeout=2).read()
+            return proc, base
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    sys.exit("gunicorn did not start within 60s")
+
+def seeded_users(db):
+    import sqlite3
+    conn = sqlite3.connect(db)
+    try:
+        return [r[0] for r in conn.execute("SELECT id FROM users WHERE email LIKE 'user%@seed.local' ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def print_table(out):
+    print(f"{'route':30s} {'requests':>9s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+    for label, r in out.items():
+        print(f"{label:30s} {r['requests']:9d} {r['rps']:8.1f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} {r['errors']:7d}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", help="load an already running server instead of starting gunicorn")
+    ap.add_argument("--db", help="seeded database to copy for the server (default: seed a new one)")
+    ap.add_argument("--scale", choices=list(seed.SCALES), default="10k", help="size to seed when --db is not given")
+    ap.add_argument("--users", type=int, help="with --url: log in as user1..userN@seed.local")
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30, help="seconds measured, after --warmup")
+    ap.add_argument("--warmup", type=float, default=3)
+    ap.add_argument("--workers", type=int, default=2, help="gunicorn workers (WEB_CONCURRENCY)")
+    ap.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--save", action="store_true", help="write benchmarks/results/load-*.json")
+    ap.add_argument("--compare", nargs="?", const="latest", help="a saved run to compare with (default: latest)")
+    args = ap.parse_args()
+
+    baseline = results.latest("load") if args.compare == "latest" else args.compare
+    proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            base, users = args.url.rstrip("/"), list(range(1, (args.users or 100) + 1))
+        else:
+            db = os.path.join(tmp, "database.db")
+            if args.db:
+                shutil.copy(args.db, db)
+            else:
+                rows = seed.SCALES[args.scale]
+                seed.seed(db, rows, seed.default_users(rows), seed_value=args.seed)
+            users = seeded_users(db)
+            proc, base = start_server(tmp, free_port(), {"WEB_CONCURRENCY": str(args.workers),
+                                                         "GUNICORN_THREADS": str(args.threads),
+                                                         "GUNICORN_MAX_REQUESTS": "0",
+                                                         "RECURRING_SCHEDULER": "off",
+                                                         # every client logs in from 127.0.0.1
+                                                         "PROXY_HOPS": "0", "AUTH_ATTEMPT_BURST": "100000"})
+        try:
+            print(f"{args.clients} clients against {base} for {args.duration:g}s (+{args.warmup:g}s warmup)")
+            out = run_load(base, users, args.clients, args.duration, args.warmup, args.seed)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(30)
+
+    print_table(out)
+    if args.compare:
+        if baseline:
+            print()
+            results.compare(results.load(baseline), {"results": out})
+        else:
+            print("\nno saved load run to compare with")
+    if args.save:
+        results.save("load", out, vars(args))
+
+
+if __name__ == "__main__":
+    main()
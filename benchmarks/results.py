@@ -0,0 +1,99 @@
+# benchmarks/results.py — store benchmark runs as JSON and compare a run with an earlier one
+#
+#   python benchmarks/results.py                          # list stored runs
+#   python benchmarks/results.py OLD.json NEW.json        # % change per metric
+#
+# bench_helpers.py and load.py call save() with --save and compare() with --compare.
+# Each file holds {"kind", "meta": {commit, python, platform, cpu, cpus, memory_gb, args, time},
+# "results": {name: {metric: value}}}. Runs only compare on the same machine and Python, so
+# results/ is not checked in (see .gitignore); compare() warns when the two runs' setups differ.
+import argparse, glob, json, os, platform, subprocess, sys, time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Metrics where a bigger number is better; everything else (latencies, errors) should go down
+HIGHER_IS_BETTER = {"ops_per_sec", "rows_per_sec", "rps", "requests"}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def _cpu():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def _memory_gb():
+    try:
+        return round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 30, 1)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def machine():
+    # What the numbers depend on besides the code
+    return {"python": sys.version.split()[0], "platform": platform.platform(), "cpu": _cpu(),
+            "cpus": os.cpu_count(), "memory_gb": _memory_gb()}
+
+def save(kind, results, args=None):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    data = {"kind": kind,
+            "meta": dict(machine(), commit=_commit(), time=time.strftime("%Y-%m-%dT%H:%M:%S"), args=args or {}),
+            "results": results}
+    path = os.path.join(RESULTS_DIR, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f"saved {path}")
+    return path
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def latest(kind):
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, f"{kind}-*.json")))
+    return paths[-1] if paths else None
+
+
+def compare(old, new):
+    # old/new: result dicts as saved (one without meta is taken to be from this machine);
+    # prints one line per metric both runs have
+    before_meta, after_meta = old.get("meta", {}), new.get("meta") or machine()
+    for key in ("python", "cpu", "cpus"):
+        if before_meta.get(key) != after_meta.get(key):
+            print(f"warning: {key} differs ({before_meta.get(key)} vs {after_meta.get(key)}); the runs are not comparable")
+    print(f"{'':28s} {'metric':12s} {'before':>12s} {'after':>12s}  change")
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        before, after = old["results"][name], new["results"][name]
+        for metric in sorted(set(before) & set(after)):
+            a, b = before[metric], after[metric]
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                continue
+            change = (b - a) / a * 100 if a else 0.0
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            flag = "" if abs(change) < 5 else ("  better" if better else "  WORSE")
+            print(f"{name:28s} {metric:12s} {a:12,.3f} {b:12,.3f}  {change:+6.1f}%{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("files", nargs="*", help="two result files to compare")
+    args = ap.parse_args()
+    if len(args.files) == 2:
+        compare(load(args.files[0]), load(args.files[1]))
+        return
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json"))):
+        meta = load(path)["meta"]
+        print(f"{os.path.relpath(path, ROOT):60s} {meta['commit'] or '-':10s} {meta['time']}")
+
+
+if __name__ == "__main__":
+    main()
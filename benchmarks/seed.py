@@ -0,0 +1,139 @@
+# benchmarks/seed.py — fill a database with realistic users, expenses, allowances, goals, recurring items and limits
+#
+#   python benchmarks/seed.py --db /tmp/bench.db --scale 100k          # ~100k expenses over 100 users
+#   python benchmarks/seed.py --db /tmp/bench.db --rows 2500000 --users 5000
+#
+# Every user's password is "password" and their email is user<N>@seed.local, so the load
+# driver (benchmarks/load.py) can log in as any of them. Expenses go through
+# database.insert_expenses(), so balances and rollups are maintained by the same triggers
+# as in production. Output is deterministic for a given --seed.
+import argparse, math, os, random, sys, time
+from datetime import date, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+PASSWORD = "password"
+BATCH = 5000
+
+# category -> (median amount in rupees, spread, descriptions); spread is the lognormal sigma
+CATEGORIES = {
+    "Food": (120, 0.6, ["Swiggy order", "Zomato dinner", "Canteen lunch", "Masala dosa", "Pizza", "Cafe coffee",
+                        "Milk and bread", "Juice", "Burger", "Tea and snacks"]),
+    "Transport": (60, 0.7, ["Uber ride", "Ola auto", "Bus pass", "Metro card recharge", "Rapido bike", "Train ticket",
+                            "Petrol"]),
+    "Books": (250, 0.7, ["Notebook", "Textbook", "Pens and pencils", "Xerox notes", "Stationery"]),
+    "Shopping": (900, 0.8, ["Amazon order", "Flipkart order", "Clothes", "Myntra shirt", "Mall shopping"]),
+    "Medical": (300, 0.8, ["Pharmacy", "Clinic visit", "Medicine", "Doctor consultation"]),
+    "Personal Care": (200, 0.6, ["Haircut", "Salon", "Shampoo", "Soap and toiletries"]),
+    "Electronics": (1500, 0.9, ["Phone charger", "Earphones", "Laptop bag", "USB cable"]),
+    "Phone/Internet": (300, 0.3, ["Jio recharge", "Airtel recharge", "Wifi bill"]),
+    "Entertainment": (250, 0.6, ["Movie ticket", "Netflix", "Spotify", "Bowling"]),
+    "Other": (150, 0.9, ["Gift", "Donation", "Laundry", "Printing"]),
+}
+# Relative frequency of each category in a student's spending
+WEIGHTS = [40, 18, 6, 8, 3, 4, 2, 4, 8, 7]
+RECURRING = [("Netflix", 199, "Entertainment", "monthly"), ("Jio recharge", 299, "Phone/Internet", "monthly"),
+             ("Bus pass", 150, "Transport", "weekly"), ("Gym", 800, "Personal Care", "monthly"),
+             ("Milk", 30, "Food", "daily")]
+GOALS = [("New laptop", 45000), ("Trip to Goa", 12000), ("Emergency fund", 10000), ("Bike", 60000)]
+
+
+def password_hash():
+    # One bcrypt hash at the app's cost, shared by every seeded user; hashing per user would dominate
+    import auth_hashing
+    return auth_hashing._hash(PASSWORD, auth_hashing.current_cost())
+
+def user_rows(rng, user_id, n, today, days):
+    cats = list(CATEGORIES)
+    for _ in range(n):
+        cat = rng.choices(cats, WEIGHTS)[0]
+        median, sigma, names = CATEGORIES[cat]
+        d = today - timedelta(days=int(rng.random() ** 1.3 * days))  # a little denser towards today
+        if d.weekday() >= 5 and cat in ("Food", "Entertainment") and rng.random() < 0.3:
+            median *= 1.5  # weekends out
+        amount = round(median * math.exp(rng.gauss(0, sigma)), 2)
+        yield user_id, cat, max(amount, 1.0), rng.choice(names), d.isoformat()
+
+def seed(db, rows, users, days=365, seed_value=42, progress=True):
+    database.DB_NAME = db
+    database.init_db()
+    rng = random.Random(seed_value)
+    today = date.today()
+    conn = database.connect()
+    start = time.perf_counter()
+    hashed = password_hash()
+    first = (conn.execute("SELECT MAX(id) FROM users").fetchone()[0] or 0) + 1
+    per_user, extra = divmod(rows, users)
+    months = days // 30 + 1
+    batch, written = [], 0
+
+    def flush():
+        nonlocal written
+        written += len(database.insert_expenses(conn, batch, check_balance=False))
+        conn.commit()
+        batch.clear()
+        if progress:
+            rate = written / (time.perf_counter() - start)
+            print(f"\r{written:,} / {rows:,} expenses ({rate:,.0f} rows/sec)", end="", flush=True)
+
+    for i, uid in enumerate(range(first, first + users)):
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        spends = list(user_rows(rng, uid, per_user + (1 if i < extra else 0), today, days))
+        conn.execute("INSERT INTO users (id, name, email, password) VALUES (?, ?, ?, ?)",
+                     (uid, f"Student {uid}", f"user{uid}@seed.local", hashed))
+        # A monthly allowance a little above what this user spends, so balances stay positive
+        monthly = max(1000, round(sum(r[2] for r in spends) / months * rng.uniform(1.05, 1.3), -2))
+        conn.executemany("INSERT INTO allowances (user_id, amount, date) VALUES (?, ?, ?)",
+                         [(uid, monthly, (today - timedelta(days=30 * m)).isoformat()) for m in range(months)])
+        for title, target in rng.sample(GOALS, rng.randint(0, 3)):
+            conn.execute("INSERT INTO goals (user_id, title, target_amount, saved_amount, due_date) VALUES (?, ?, ?, ?, ?)",
+                         (uid, title, target, round(target * rng.random() * 0.2),
+                          (today + timedelta(days=rng.randint(30, 365))).isoformat()))
+        for title, amount, cat, freq in rng.sample(RECURRING, rng.randint(1, 3)):
+            nxt = today + timedelta(days=rng.randint(1, 28))
+            conn.execute("""INSERT INTO recurring_expenses (user_id, title, amount, category, frequency, next_date, status, anchor_day)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                         (uid, title, amount, cat, freq, nxt.isoformat(), "paused" if rng.random() < 0.1 else "active", nxt.day))
+        for cat in rng.sample(["Food", "Transport", "Shopping", "Entertainment"], rng.randint(1, 3)):
+            conn.execute("INSERT INTO category_limits (user_id, category, limit_amount, period) VALUES (?, ?, ?, ?)",
+                         (uid, cat, rng.choice([500, 1000, 2000, 3000, 5000]), rng.choice(["week", "month", "month"])))
+        batch.extend(spends)
+        if len(batch) >= BATCH:
+            flush()
+    if batch or conn.in_transaction:
+        flush()
+    conn.close()
+    elapsed = time.perf_counter() - start
+    if progress:
+        print(f"\r{written:,} expenses for {users:,} users in {elapsed:.1f}s ({written / elapsed:,.0f} rows/sec)")
+    return {"users": users, "first_user": first, "expenses": written, "seconds": elapsed}
+
+def default_users(rows):
+    # ~1000 expenses per user (three a day for a year), at least one user
+    return max(1, min(100_000, rows // 1000))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Seed a database with realistic student budget data.")
+    ap.add_argument("--db", default=database.DB_NAME, help="database file (default: the app's database.db)")
+    ap.add_argument("--scale", choices=list(SCALES), default="10k", help="number of expenses")
+    ap.add_argument("--rows", type=int, help="exact number of expenses (overrides --scale)")
+    ap.add_argument("--users", type=int, help="default: one per 1000 expenses")
+    ap.add_argument("--days", type=int, default=365, help="history length")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--reset", action="store_true", help="delete the database file first")
+    args = ap.parse_args()
+
+    rows = args.rows if args.rows is not None else SCALES[args.scale]
+    if args.reset:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    seed(args.db, rows, args.users or default_users(rows), args.days, args.seed)
+
+
+if __name__ == "__main__":
+    main()
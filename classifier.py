@@ -0,0 +1,103 @@
+# classifier.py — expense categories from one keyword index (a dict lookup per word), plus per-user overrides
+#
+# Replaces ocr_utils.guess_category / detect_category, which kept two different keyword
+# tables and ran one substring test per keyword per call.
+import re
+from typing import Dict, Iterable, List
+
+DEFAULT_CATEGORY = "Other"
+# Every category a user can pick or filter by (templates get it as `categories`)
+CATEGORIES = ["Food", "Books", "Transport", "Shopping", "Medical", "Phone/Internet", "Health",
+              "Personal Care", "Electronics", "Entertainment", "Accommodation", "Tuition", DEFAULT_CATEGORY]
+_WORD = re.compile(r"[a-z]+")
+
+# Category -> keywords; earlier categories win when a text matches several.
+# Keywords match whole words, with an optional plural "s"/"es" ("book" matches "books", not "facebook").
+KEYWORDS = {
+    "Food": ["pizza", "burger", "chips", "juice", "milk", "meal", "dosa", "idli", "kfc", "food",
+             "hotel", "restaurant", "swiggy", "zomato", "cafe", "canteen", "tea", "coffee", "snack"],
+    "Books": ["book", "notebook", "pen", "pencil", "stationery", "stationary", "xerox"],
+    "Transport": ["bus", "uber", "ola", "rapido", "fuel", "petrol", "taxi", "train", "metro", "auto", "ride"],
+    "Shopping": ["cloth", "clothes", "clothing", "amazon", "flipkart", "myntra", "shopping", "mall", "fashion", "shirt"],
+    "Medical": ["tablet", "medicine", "clinic", "doctor", "pharmacy", "hospital"],
+    "Personal Care": ["hair", "haircut", "salon", "shampoo", "soap"],
+    "Electronics": ["charger", "earphone", "laptop", "mobile", "headphone", "cable"],
+    "Phone/Internet": ["recharge", "broadband", "wifi", "jio", "airtel"],
+    "Entertainment": ["movie", "cinema", "ticket", "theatre", "netflix", "spotify"],
+}
+
+
+class Classifier:
+    def __init__(self, keywords=KEYWORDS, default=DEFAULT_CATEGORY):
+        self.default = default
+        self._category = {}   # keyword -> category
+        self._rank = {}       # category -> priority (lower wins)
+        for rank, (category, words) in enumerate(keywords.items()):
+            self._rank[category] = rank
+            for word in words:
+                self._category.setdefault(word.lower(), category)
+
+    def lookup(self, word):
+        # Exact keyword, or its plural ("books", "buses")
+        category = self._category.get(word)
+        if category is None and word.endswith("s"):
+            category = self._category.get(word[:-1])
+            if category is None and word.endswith("es"):
+                category = self._category.get(word[:-2])
+        return category
+
+    def match(self, text):
+        # One pass over the words with a dict lookup each; the highest-priority category wins
+        best, best_rank = None, None
+        for word in _WORD.findall((text or "").lower()):
+            category = self.lookup(word)
+            if category is not None and (best is None or self._rank[category] < best_rank):
+                best, best_rank = category, self._rank[category]
+                if best_rank == 0:
+                    break
+        return best
+
+    def classify(self, text, overrides=None):
+        if overrides:
+            category = overrides.get(description_key(text))
+            if category:
+                return category
+        return self.match(text) or self.default
+
+    def classify_many(self, texts: Iterable[str], overrides: Dict[str, str] = None) -> List[str]:
+        return [self.classify(t, overrides) for t in texts]
+
+
+# -------------------------
+# Per-user overrides (category_overrides table)
+# -------------------------
+_KEY_JUNK = re.compile(r"[^a-z]+")
+
+def description_key(text):
+    # "UPI-SWIGGY-88213 " and "upi swiggy 10442" share a key: letters only, single spaces
+    return _KEY_JUNK.sub(" ", (text or "").lower()).strip()
+
+def load_overrides(conn, user_id):
+    return {r["description_key"]: r["category"]
+            for r in conn.execute("SELECT description_key, category FROM category_overrides WHERE user_id=?", (user_id,))}
+
+def learn(conn, user_id, corrections):
+    """Remember (description, category) pairs the user chose over our suggestion."""
+    rows = [(user_id, description_key(d), c) for d, c in corrections if c and description_key(d)]
+    if rows:
+        conn.executemany("""
+            INSERT INTO category_overrides (user_id, description_key, category) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, description_key) DO UPDATE
+            SET category=excluded.category, updated_at=datetime('now')
+        """, rows)
+        conn.commit()
+    return len(rows)
+
+
+_default = Classifier()
+
+def classify(text, overrides=None):
+    return _default.classify(text, overrides)
+
+def classify_many(texts, overrides=None):
+    return _default.classify_many(texts, overrides)
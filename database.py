@@ -1,16 +1,145 @@
-import sqlite3
+import hashlib, logging, os, sqlite3, threading, time
+from queue import Queue, Empty
+from flask import g, has_app_context
+import metrics
+
+log = logging.getLogger(__name__)
 
 DB_NAME = "database.db"  # Must match the file name!
 
-def get_db():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", "30"))
+
+# Applied to every connection we open
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={int(os.environ.get('DB_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+    f"PRAGMA cache_size=-{int(os.environ.get('DB_CACHE_KB', '20000'))}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolExhausted(Exception):
+    """Raised when no pooled connection frees up within DB_POOL_TIMEOUT."""
+
+
+def connect():
+    # metrics.TimedConnection times every statement for /metrics (plain sqlite3.Connection with METRICS=0)
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, timeout=BUSY_TIMEOUT, factory=metrics.connection_factory())
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+class ConnectionPool:
+    # Bounded per-process pool; a connection is lent to one request at a time
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "closed": 0, "borrowed": 0, "waits": 0,
+                      "wait_seconds_total": 0.0, "timeouts": 0, "in_use": 0}
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def borrow(self):
+        if self._pid != os.getpid():
+            # Forked (e.g. gunicorn preload): never share the parent's sqlite handles
+            self._reset()
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            conn = None
+        if conn is None:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                self.count("opened")
+            else:
+                start = time.perf_counter()
+                self.count("waits")
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    self.count("timeouts")
+                    raise PoolExhausted("No database connection available.")
+                finally:
+                    self.count("wait_seconds_total", time.perf_counter() - start)
+        with self._lock:
+            self.stats["borrowed"] += 1
+            self.stats["in_use"] += 1
+        return conn
+
+    def give_back(self, conn):
+        with self._lock:
+            self.stats["in_use"] -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+                self.stats["closed"] += 1
+            return
+        self._idle.put(conn)
+
+    def snapshot(self):
+        with self._lock:
+            s = dict(self.stats)
+        s["size"] = self.size
+        s["idle"] = self._idle.qsize()
+        return s
+
+
+_pool = ConnectionPool()
+
+
+def get_db():
+    # Inside a request: one pooled connection per request, returned on teardown.
+    # Outside (scripts, job processes): a private connection the caller closes.
+    if has_app_context():
+        if "db" not in g:
+            g.db = _pool.borrow()
+        return g.db
+    return connect()
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is not None:
+        _pool.give_back(conn)
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+
+def db_stats():
+    return _pool.snapshot()
+
+
 def init_db():
-    conn = get_db()
+    conn = connect()
     cursor = conn.cursor()
+    # One write transaction for the whole bootstrap so parallel workers queue up behind it
+    cursor.execute("BEGIN IMMEDIATE")
 
     
 
@@ -114,30 +243,424 @@ def init_db():
         FOREIGN KEY(user_id) REFERENCES users(id)
     );
     """)
-    
+
+    # ------------------------------------------------------------
+    # OCR JOBS (background invoice scanning, see ocr_jobs.py)
+    # ------------------------------------------------------------
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_jobs (
+        id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        paths TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        result TEXT,
+        error TEXT,
+        created_at TEXT DEFAULT (datetime('now')),
+        updated_at TEXT DEFAULT (datetime('now')),
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    """)
+
+    # ------------------------------------------------------------
+    # OCR CACHE (content-addressed uploads, see upload_store.py)
+    # ------------------------------------------------------------
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        digest TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        bytes INTEGER NOT NULL,
+        text TEXT,
+        items TEXT,
+        hits INTEGER DEFAULT 0,
+        created_at TEXT DEFAULT (datetime('now')),
+        last_used TEXT DEFAULT (datetime('now'))
+    );
+    """)
 
     conn.commit()
+    migrate(conn)
     conn.close()
 
 
-def alter_table():
-    conn = get_db()
+# ------------------------------------------------------------
+# MIGRATIONS (tracked with PRAGMA user_version)
+# ------------------------------------------------------------
+def _add_recurring_status(cursor):
+    # Replaces the old one-off alter_table(): databases created before 'status' existed
+    cols = [r[1] for r in cursor.execute("PRAGMA table_info(recurring_expenses)")]
+    if "status" not in cols:
+        cursor.execute("ALTER TABLE recurring_expenses ADD COLUMN status TEXT DEFAULT 'active'")
+
+# Running per-user totals: (source table, amount column, user_balances column)
+BALANCE_SOURCES = (
+    ("allowances", "amount", "total_allowance"),
+    ("expenses", "amount", "total_expenses"),
+    ("goals", "saved_amount", "total_saved"),
+)
+
+def _balance_delta(user, value, field):
+    return f"""
+        INSERT INTO user_balances (user_id, {field}) VALUES ({user}, COALESCE({value}, 0))
+        ON CONFLICT(user_id) DO UPDATE SET {field} = {field} + excluded.{field};"""
+
+def _balance_triggers():
+    # Keep user_balances in the same transaction as every write to the source tables
+    sql = []
+    for table, col, field in BALANCE_SOURCES:
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_balance_ins")
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_balance_del")
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_balance_upd")
+        sql.append(f"""CREATE TRIGGER trg_{table}_balance_ins AFTER INSERT ON {table} BEGIN
+            {_balance_delta("NEW.user_id", f"NEW.{col}", field)}
+        END""")
+        sql.append(f"""CREATE TRIGGER trg_{table}_balance_del AFTER DELETE ON {table} BEGIN
+            {_balance_delta("OLD.user_id", f"-OLD.{col}", field)}
+        END""")
+        sql.append(f"""CREATE TRIGGER trg_{table}_balance_upd AFTER UPDATE OF {col}, user_id ON {table} BEGIN
+            {_balance_delta("OLD.user_id", f"-OLD.{col}", field)}
+            {_balance_delta("NEW.user_id", f"NEW.{col}", field)}
+        END""")
+    return sql
+
+# Recomputes every user's totals straight from the raw tables
+BALANCES_FROM_RAW = """
+    SELECT user_id,
+           SUM(total_allowance) AS total_allowance,
+           SUM(total_expenses) AS total_expenses,
+           SUM(total_saved) AS total_saved
+    FROM (
+        SELECT user_id, COALESCE(amount,0) AS total_allowance, 0 AS total_expenses, 0 AS total_saved FROM allowances
+        UNION ALL
+        SELECT user_id, 0, COALESCE(amount,0), 0 FROM expenses
+        UNION ALL
+        SELECT user_id, 0, 0, COALESCE(saved_amount,0) FROM goals
+    )
+    WHERE user_id IS NOT NULL
+    GROUP BY user_id
+"""
+
+def _backfill_balances(cursor):
+    cursor.execute("DELETE FROM user_balances")
+    cursor.execute("INSERT INTO user_balances (user_id, total_allowance, total_expenses, total_saved) " + BALANCES_FROM_RAW)
+
+# Expense rollups per (user, category, period bucket); bucket expressions over a date column
+ROLLUP_PERIODS = (
+    ("day", "date({d})"),
+    ("week", "date({d}, '-6 days', 'weekday 1')"),  # Monday on/before the date
+    ("month", "strftime('%Y-%m', {d})"),
+    ("all", "''"),
+)
+
+def _rollup_delta(row, sign):
+    return "".join(f"""
+        INSERT INTO expense_rollups (user_id, category, period, bucket, total, count)
+        VALUES ({row}.user_id, COALESCE({row}.category, 'Other'), '{period}', {expr.format(d=row + ".date")},
+                {sign}COALESCE({row}.amount, 0), {sign}1)
+        ON CONFLICT(user_id, period, bucket, category) DO UPDATE
+        SET total = total + excluded.total, count = count + excluded.count;"""
+        for period, expr in ROLLUP_PERIODS)
+
+def _rollup_triggers():
+    return [
+        "DROP TRIGGER IF EXISTS trg_expenses_rollup_ins",
+        "DROP TRIGGER IF EXISTS trg_expenses_rollup_del",
+        "DROP TRIGGER IF EXISTS trg_expenses_rollup_upd",
+        f"CREATE TRIGGER trg_expenses_rollup_ins AFTER INSERT ON expenses BEGIN {_rollup_delta('NEW', '')} END",
+        f"CREATE TRIGGER trg_expenses_rollup_del AFTER DELETE ON expenses BEGIN {_rollup_delta('OLD', '-')} END",
+        f"""CREATE TRIGGER trg_expenses_rollup_upd AFTER UPDATE OF user_id, category, amount, date ON expenses BEGIN
+            {_rollup_delta('OLD', '-')} {_rollup_delta('NEW', '')} END""",
+    ]
+
+def _backfill_rollups(cursor):
+    cursor.execute("DELETE FROM expense_rollups")
+    for period, expr in ROLLUP_PERIODS:
+        cursor.execute(f"""
+            INSERT INTO expense_rollups (user_id, category, period, bucket, total, count)
+            SELECT user_id, COALESCE(category, 'Other'), '{period}', {expr.format(d="date")},
+                   SUM(COALESCE(amount, 0)), COUNT(*)
+            FROM expenses WHERE user_id IS NOT NULL
+            GROUP BY 1, 2, 4
+        """)
+
+# Per-user data version for page_cache.py; any write to these tables bumps it
+VERSIONED_TABLES = ("allowances", "expenses", "goals", "category_limits", "recurring_expenses")
+
+def _version_bump(user):
+    return f"""
+        INSERT INTO user_versions (user_id, version) VALUES ({user}, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;"""
+
+def _version_triggers():
+    sql = []
+    for table in VERSIONED_TABLES:
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_version_ins")
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_version_del")
+        sql.append(f"DROP TRIGGER IF EXISTS trg_{table}_version_upd")
+        sql.append(f"CREATE TRIGGER trg_{table}_version_ins AFTER INSERT ON {table} BEGIN {_version_bump('NEW.user_id')} END")
+        sql.append(f"CREATE TRIGGER trg_{table}_version_del AFTER DELETE ON {table} BEGIN {_version_bump('OLD.user_id')} END")
+        sql.append(f"""CREATE TRIGGER trg_{table}_version_upd AFTER UPDATE ON {table} BEGIN
+            {_version_bump('OLD.user_id')} {_version_bump('NEW.user_id')} END""")
+    return sql
+
+def expense_hash(date, amount, description):
+    # Same day, same amount (to the paisa), same description ignoring case and spacing
+    key = f"{date}|{float(amount or 0):.2f}|{' '.join((description or '').lower().split())}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def _backfill_dedupe_hashes(cursor):
+    rows = cursor.execute("SELECT id, date, amount, description FROM expenses WHERE dedupe_hash IS NULL").fetchall()
+    cursor.executemany("UPDATE expenses SET dedupe_hash=? WHERE id=?",
+                       [(expense_hash(r[1], r[2], r[3]), r[0]) for r in rows])
+
+# Append only: each entry is (version, [SQL strings or callables taking a cursor])
+MIGRATIONS = [
+    (1, [_add_recurring_status]),
+    (2, [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_category ON expenses(user_id, category)",
+        "CREATE INDEX IF NOT EXISTS idx_allowances_user ON allowances(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_goals_user ON goals(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_recurring_user ON recurring_expenses(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_limits_user_category ON category_limits(user_id, category)",
+        "CREATE INDEX IF NOT EXISTS idx_ocr_jobs_status ON ocr_jobs(status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache(last_used)",
+    ]),
+    (3, [
+        """CREATE TABLE IF NOT EXISTS user_balances (
+            user_id INTEGER PRIMARY KEY,
+            total_allowance REAL NOT NULL DEFAULT 0,
+            total_expenses REAL NOT NULL DEFAULT 0,
+            total_saved REAL NOT NULL DEFAULT 0
+        )""",
+        *_balance_triggers(),
+        _backfill_balances,
+    ]),
+    (4, [
+        # Scheduler scans due items across all users; anchor_day keeps monthly items on their day
+        "CREATE INDEX IF NOT EXISTS idx_recurring_status_next ON recurring_expenses(status, next_date)",
+        "ALTER TABLE recurring_expenses ADD COLUMN anchor_day INTEGER",
+        "UPDATE recurring_expenses SET anchor_day = CAST(strftime('%d', next_date) AS INTEGER)",
+    ]),
+    (5, [
+        # Newest-first keyset pagination of the expense list (see expenses.py)
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_id ON expenses(user_id, id)",
+    ]),
+    (6, [
+        """CREATE TABLE IF NOT EXISTS expense_rollups (
+            user_id INTEGER NOT NULL,
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, period, bucket, category)
+        ) WITHOUT ROWID""",
+        *_rollup_triggers(),
+        _backfill_rollups,
+    ]),
+    (7, [
+        """CREATE TABLE IF NOT EXISTS user_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )""",
+        *_version_triggers(),
+    ]),
+    (8, [
+        # Which expense_rollups period a limit applies to (see limits.py)
+        "ALTER TABLE category_limits ADD COLUMN period TEXT NOT NULL DEFAULT 'month'",
+    ]),
+    (9, [
+        # Duplicate detection for statement imports (see importer.py); filled by insert_expenses()
+        "ALTER TABLE expenses ADD COLUMN dedupe_hash TEXT",
+        _backfill_dedupe_hashes,
+        "CREATE INDEX IF NOT EXISTS idx_expenses_user_dedupe ON expenses(user_id, dedupe_hash)",
+    ]),
+    (10, [
+        # Categories a user picked over the classifier's suggestion (see classifier.py)
+        """CREATE TABLE IF NOT EXISTS category_overrides (
+            user_id INTEGER NOT NULL,
+            description_key TEXT NOT NULL,
+            category TEXT NOT NULL,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (user_id, description_key)
+        ) WITHOUT ROWID""",
+    ]),
+    (11, [
+        # Server-side sessions and bill review drafts (see session_store.py)
+        """CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)",
+        """CREATE TABLE IF NOT EXISTS invoice_drafts (
+            user_id INTEGER PRIMARY KEY,
+            job_id TEXT,
+            status TEXT NOT NULL DEFAULT 'ready',
+            items TEXT NOT NULL DEFAULT '[]',
+            revision INTEGER NOT NULL DEFAULT 1,
+            updated_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_invoice_drafts_expires ON invoice_drafts(expires_at)",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    # BEGIN IMMEDIATE takes the write lock before reading user_version, so when several
+    # gunicorn workers boot at once exactly one applies each step and the rest see it done.
     cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        current = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for version, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            log.info("Applied migration %d", version)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
+# ------------------------------------------------------------
+# BALANCES (materialized in user_balances by triggers; read via summary.py)
+# ------------------------------------------------------------
+def check_balances(conn, fix=False, tolerance=0.005):
+    # Rebuild totals from the raw tables and report users whose stored row drifted
+    raw = {r["user_id"]: r for r in conn.execute(BALANCES_FROM_RAW)}
+    stored = {r["user_id"]: r for r in conn.execute("SELECT * FROM user_balances")}
+    drift = []
+    for user_id in sorted(set(raw) | set(stored)):
+        for _, _, field in BALANCE_SOURCES:
+            want = raw[user_id][field] if user_id in raw else 0.0
+            have = stored[user_id][field] if user_id in stored else 0.0
+            if abs((want or 0.0) - (have or 0.0)) > tolerance:
+                drift.append({"user_id": user_id, "field": field, "stored": have, "actual": want})
+    if fix and drift:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        _backfill_balances(cursor)
+        conn.commit()
+    return drift
+
+
+# ------------------------------------------------------------
+# BATCH WRITES
+# ------------------------------------------------------------
+class InsufficientBalance(ValueError):
+    """Raised when a batch of expenses would take a user's balance below zero; nothing is written."""
+
+    def __init__(self, user_id, needed, available):
+        super().__init__(f"Insufficient balance: need {needed:.2f}, have {available:.2f}.")
+        self.user_id, self.needed, self.available = user_id, needed, available
 
+
+def insert_expenses(conn, rows, check_balance=True):
+    """Insert (user_id, category, amount, description, date) rows with one executemany; returns their ids.
+
+    Runs in its own BEGIN IMMEDIATE transaction, or joins the caller's if one is open.
+    With check_balance, each user's share of the batch is checked against their balance
+    inside the same write lock, so the whole batch goes in or none of it does.
+    Each row's expense_hash is stored for duplicate detection (see hash_counts)."""
+    rows = [(r[0], r[1], r[2], r[3], r[4], expense_hash(r[4], r[2], r[3])) for r in rows]
+    if not rows:
+        return []
+    own = not conn.in_transaction
+    if own:
+        conn.execute("BEGIN IMMEDIATE")
     try:
-        cursor.execute("""
-            ALTER TABLE recurring_expenses
-            ADD COLUMN status TEXT DEFAULT 'active'
-        """)
-        print("Column 'status' added successfully!")
-    except:
-        print("Column already exists (OK)")
+        if check_balance:
+            needed = {}
+            for r in rows:
+                needed[r[0]] = needed.get(r[0], 0.0) + (r[2] or 0.0)
+            users = list(needed)
+            available = {u: 0.0 for u in users}
+            for b in conn.execute(f"""
+                SELECT user_id, total_allowance - total_expenses - total_saved AS balance FROM user_balances
+                WHERE user_id IN ({",".join("?" * len(users))})""", users):
+                available[b["user_id"]] = b["balance"]
+            for u in users:
+                if needed[u] > available[u] + 1e-9:
+                    raise InsufficientBalance(u, needed[u], available[u])
+        conn.executemany("""INSERT INTO expenses (user_id, category, amount, description, date, dedupe_hash)
+                            VALUES (?, ?, ?, ?, ?, ?)""", rows)
+        # The write lock is held, so the batch got consecutive AUTOINCREMENT ids ending at the last one
+        last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        if own:
+            conn.commit()
+    except Exception:
+        if own:
+            conn.rollback()
+        raise
+    return list(range(last - len(rows) + 1, last + 1))
 
-    conn.commit()
-    conn.close()
+def hash_counts(conn, user_id, hashes, split_id=None):
+    """{expense_hash: (expenses with id <= split_id, expenses after it)} for the hashes the user
+    has at all. Ids only grow (AUTOINCREMENT), so split_id = the largest id when an import
+    started tells rows that were already there from rows the import added."""
+    hashes = list(hashes)
+    split_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0] if split_id is None else split_id
+    counts = {}
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        counts.update((r[0], (r[1], r[2])) for r in conn.execute(
+            f"""SELECT dedupe_hash, SUM(id <= ?), SUM(id > ?) FROM expenses
+                WHERE user_id=? AND dedupe_hash IN ({','.join('?' * len(chunk))}) GROUP BY dedupe_hash""",
+            [split_id, split_id, user_id] + chunk))
+    return counts
+
+
+# ------------------------------------------------------------
+# QUERY PLANS for the hot per-user queries
+# ------------------------------------------------------------
+HOT_QUERIES = {
+    "expense total": ("SELECT SUM(amount) FROM expenses WHERE user_id=?", (1,)),
+    "expense list": ("SELECT id, category, amount, description, date FROM expenses WHERE user_id=? ORDER BY id DESC LIMIT 51", (1,)),
+    "expense list page": ("SELECT id, category, amount, description, date FROM expenses WHERE user_id=? AND id < ? ORDER BY id DESC LIMIT 51", (1, 1000)),
+    "expense list by category": ("SELECT id, category, amount, description, date FROM expenses WHERE user_id=? AND category=? AND id < ? ORDER BY id DESC LIMIT 51", (1, "Food", 1000)),
+    "category totals": ("SELECT category, SUM(amount) FROM expenses WHERE user_id=? GROUP BY category", (1,)),
+    "last 7 days": ("SELECT date, SUM(amount) FROM expenses WHERE user_id=? AND date >= date('now','-6 days') GROUP BY date", (1,)),
+    "allowance total": ("SELECT SUM(amount) FROM allowances WHERE user_id=?", (1,)),
+    "goal savings": ("SELECT SUM(saved_amount) FROM goals WHERE user_id=?", (1,)),
+    "recurring": ("SELECT * FROM recurring_expenses WHERE user_id=?", (1,)),
+    "limits": ("SELECT * FROM category_limits WHERE user_id=?", (1,)),
+}
+
+def explain(conn, sql, params=()):
+    return [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def print_query_plans(conn):
+    for name, (sql, params) in HOT_QUERIES.items():
+        print(f"{name}:")
+        for line in explain(conn, sql, params):
+            print(f"    {line}")
 
 
 if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     init_db()
-    alter_table()
-    print("Database (database.db) initialized successfully!")
+    if "--plans" in sys.argv:
+        conn = connect()
+        print_query_plans(conn)
+        conn.close()
+    if "--check-balances" in sys.argv:
+        conn = connect()
+        drift = check_balances(conn, fix="--fix" in sys.argv)
+        for d in drift:
+            print(f"user {d['user_id']}: {d['field']} stored={d['stored']} actual={d['actual']}")
+        print(f"{len(drift)} drifted balance field(s){' (rebuilt)' if drift and '--fix' in sys.argv else ''}")
+        conn.close()
+    print(f"Database ({DB_NAME}) initialized successfully! Schema version {SCHEMA_VERSION}.")
@@ -0,0 +1,43 @@
+# expenses.py — keyset-paginated expense listing (cursor = last seen expense id)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(value):
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+def list_page(conn, user_id, cursor=None, limit=DEFAULT_PAGE_SIZE,
+              date_from=None, date_to=None, category=None):
+    """Newest-first page of a user's expenses; returns (rows, next_cursor).
+
+    Served from idx_expenses_user_id / idx_expenses_user_category / idx_expenses_user_date,
+    so the cost depends on the page size, not on how much history the user has."""
+    sql = "SELECT id, category, amount, description, date FROM expenses WHERE user_id=?"
+    params = [user_id]
+    if cursor:
+        sql += " AND id < ?"
+        params.append(int(cursor))
+    if category:
+        sql += " AND category = ?"
+        params.append(category)
+    if date_from:
+        sql += " AND date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND date <= ?"
+        params.append(date_to)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def filters_from(args):
+    # Query-string filters shared by the page and the JSON endpoint
+    return {"date_from": args.get("from") or None,
+            "date_to": args.get("to") or None,
+            "category": args.get("category") or None}
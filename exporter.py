@@ -0,0 +1,129 @@
+# exporter.py — streaming CSV / NDJSON export of a user's history, optionally gzipped on the fly
+#
+#   python exporter.py --user 1                          # expenses as CSV on stdout
+#   python exporter.py --user 1 --table all --format ndjson --gzip -o backup.ndjson.gz
+#
+# Rows go from a sqlite cursor (fetchmany) through a small text buffer to the caller one
+# chunk at a time, so memory does not grow with the size of the history.
+import csv, io, json, os, sys, zlib
+from database import connect
+
+# -------------------------
+# Configuration
+# -------------------------
+FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", "1000"))
+
+# Exported columns per table; every query is filtered by user and walks the primary key
+TABLES = {
+    "expenses": ("expenses", ["id", "date", "category", "amount", "description"]),
+    "allowances": ("allowances", ["id", "date", "amount"]),
+    "goals": ("goals", ["id", "title", "target_amount", "saved_amount", "due_date"]),
+    "recurring": ("recurring_expenses", ["id", "title", "amount", "category", "frequency", "next_date", "status"]),
+}
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown table or format, or CSV asked for several tables at once."""
+
+
+def check(fmt, tables):
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r}; use csv or ndjson.")
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown or not tables:
+        raise ExportError(f"Unknown table(s) {unknown}; choose from {', '.join(TABLES)} or all.")
+    if fmt == "csv" and len(tables) > 1:
+        raise ExportError("CSV holds one table per file; export tables one at a time or use ndjson.")
+
+def parse_tables(value):
+    value = (value or "expenses").strip()
+    return list(TABLES) if value == "all" else [t.strip() for t in value.split(",") if t.strip()]
+
+def filename(fmt, tables, compressed, day):
+    name = "history" if len(tables) > 1 else tables[0]
+    return f"{name}-{day}.{fmt}" + (".gz" if compressed else "")
+
+
+# -------------------------
+# Streaming
+# -------------------------
+def _batches(conn, user_id, table):
+    name, columns = TABLES[table]
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(f"SELECT {', '.join(columns)} FROM {name} WHERE user_id=? ORDER BY id", (user_id,))
+    while True:
+        rows = cur.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield columns, rows
+
+def _csv_chunks(conn, user_id, table):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(TABLES[table][1])
+    for _, rows in _batches(conn, user_id, table):
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def _ndjson_chunks(conn, user_id, tables):
+    for table in tables:
+        for columns, rows in _batches(conn, user_id, table):
+            yield "".join(json.dumps({"type": table, **dict(zip(columns, r))}, ensure_ascii=False) + "\n"
+                          for r in rows)
+
+def _gzip(chunks):
+    # wbits=31 writes a gzip header/trailer, so the output is a normal .gz file
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = z.compress(chunk)
+        if data:
+            yield data
+    yield z.flush()
+
+def stream(user_id, fmt="csv", tables=("expenses",), compressed=False):
+    """Yield the export as bytes chunks; opens (and always closes) its own connection.
+
+    All tables are read inside one read transaction, so a multi-table export is a
+    consistent snapshot even while the user keeps writing (WAL readers don't block)."""
+    check(fmt, list(tables))
+
+    def generate():
+        conn = connect()
+        try:
+            conn.execute("BEGIN")
+            chunks = _csv_chunks(conn, user_id, tables[0]) if fmt == "csv" else _ndjson_chunks(conn, user_id, tables)
+            encoded = (c.encode("utf-8") for c in chunks)
+            yield from (_gzip(encoded) if compressed else encoded)
+        finally:
+            conn.rollback()
+            conn.close()
+    return generate()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Export a user's history as CSV or NDJSON.")
+    ap.add_argument("--user", type=int, required=True)
+    ap.add_argument("--format", default="csv", choices=list(FORMATS))
+    ap.add_argument("--table", default="expenses", help=f"{', '.join(TABLES)} or all (ndjson only)")
+    ap.add_argument("--gzip", action="store_true")
+    ap.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = ap.parse_args()
+
+    try:
+        chunks = stream(args.user, args.format, parse_tables(args.table), args.gzip)
+    except ExportError as e:
+        sys.exit(f"Export failed: {e}")
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
@@ -0,0 +1,64 @@
+# gunicorn.conf.py — worker model and startup profile for `gunicorn -c gunicorn.conf.py app:app`
+#
+# Pages are short SQLite reads/writes and OCR runs in the ocr_jobs process pool, so each
+# worker is a thread pool (gthread) rather than one process per concurrent request.
+#
+# OCR_PRELOAD=1 imports the app in the master and builds one easyocr reader there before
+# forking. Workers, and the OCR job processes they fork, then share the torch/model pages
+# copy-on-write instead of each loading their own copy on first use. Without it nothing
+# heavy is imported until a bill is actually scanned.
+import os
+
+# -------------------------
+# Configuration
+# -------------------------
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# Recycling is opt-in: a recycled worker takes its OCR job processes with it, and the jobs
+# they were running wait for ocr_jobs recovery (OCR_JOB_RECOVER_SECONDS) to be resubmitted
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+OCR_PRELOAD = os.environ.get("OCR_PRELOAD", "0") == "1"
+preload_app = OCR_PRELOAD
+
+# The recurring-expense and OCR job recovery threads must run in the workers, not in the
+# master that imports the app when preloading; post_fork starts them instead, after the
+# OCR job processes have been forked from the still single-threaded worker.
+_SCHEDULER = os.environ.get("RECURRING_SCHEDULER", "thread")
+_RECOVERY = os.environ.get("OCR_JOB_RECOVERY", "thread")
+if OCR_PRELOAD:
+    # Job processes must fork (not spawn) from the workers to inherit the master's reader
+    os.environ.setdefault("OCR_JOB_START_METHOD", "fork")
+    os.environ["RECURRING_SCHEDULER"] = "off"
+    os.environ["OCR_JOB_RECOVERY"] = "off"
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if not OCR_PRELOAD:
+        return
+    import time
+    import ocr_engine
+    start = time.perf_counter()
+    ocr_engine.get_pool().warm()
+    server.log.info("OCR reader preloaded in %.1fs; workers will share it", time.perf_counter() - start)
+
+def post_fork(server, worker):
+    # Runs in the new worker before gthread starts its threads, so forking is safe here;
+    # a pool first created later (from a request thread) falls back to spawn
+    if not OCR_PRELOAD:
+        return
+    import ocr_jobs
+    ocr_jobs.start_pool()
+    if _SCHEDULER == "thread":
+        import scheduler
+        scheduler.start_background()
+    if _RECOVERY == "thread":
+        ocr_jobs.start_recovery()
@@ -0,0 +1,357 @@
+# importer.py — streaming CSV / OFX bank-statement import
+#
+#   python importer.py --user 1 statement.csv
+#   python importer.py --user 1 export.csv --map "date=Txn Date,amount=Withdrawal Amt.,description=Narration"
+#   python importer.py --user 1 statement.ofx --batch 1000
+#
+# Rows are read one at a time and written in batches through database.insert_expenses(),
+# so memory stays flat however large the file is. Re-importing the same statement is a
+# no-op: rows matching an existing expense's (date, amount, description) hash are skipped.
+# Identical rows within one file are real repeat spends (two teas on one day) and are kept.
+#
+# The date format and the sign convention are chosen once per file from its first
+# SNIFF_ROWS rows. Dates that still read differently under two candidate formats
+# (05/01/2024 when day-first and month-first both fit) are reported, not guessed.
+import csv, io, itertools, os, re, sys
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List
+
+from database import expense_hash, hash_counts, insert_expenses
+import classifier
+
+# -------------------------
+# Configuration
+# -------------------------
+BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "500"))
+MAX_ERRORS = 20  # row errors kept for the report; the rest are only counted
+SNIFF_ROWS = 100  # rows read ahead to pick the date format and sign convention
+CHUNK_SIZE = 64 * 1024
+
+# Header names seen in Indian bank / UPI exports, lower-cased; the first match wins
+COLUMN_ALIASES = {
+    "date": ["date", "txn date", "transaction date", "value date", "posted date", "tran date"],
+    "amount": ["amount", "debit", "withdrawal", "withdrawal amt.", "withdrawal amount", "debit amount", "amt"],
+    "credit": ["credit", "deposit", "deposit amt.", "credit amount"],
+    "type": ["type", "dr/cr", "cr/dr", "transaction type", "txn type"],
+    "description": ["description", "narration", "details", "remarks", "particulars", "memo", "payee", "name"],
+    "category": ["category"],
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%Y",
+                "%m/%d/%Y", "%d %b %Y", "%d-%b-%Y", "%d %b %y", "%d-%b-%y", "%Y%m%d")
+
+# How a single signed amount column (no debit/credit columns, no type flag) is read:
+# "negative" = withdrawals are negative and deposits positive; "positive" = every positive
+# amount is spending and negatives are refunds; "auto" = "negative" if the sampled rows
+# have any negative amount, else "positive". Refunds and deposits are counted as credits.
+SIGNS = ("auto", "negative", "positive")
+
+
+class ImportFailed(ValueError):
+    """Raised when a file cannot be imported at all (unknown format, missing columns)."""
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    repeats: int = 0
+    credits: int = 0
+    invalid: int = 0
+    batches: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"line {line}: {message}")
+
+    def summary(self):
+        repeats = f" (incl. {self.repeats} repeated in the file)" if self.repeats else ""
+        return (f"{self.imported} imported{repeats}, {self.duplicates} duplicate(s) skipped, "
+                f"{self.credits} credit(s) ignored, {self.invalid} invalid row(s)")
+
+
+# -------------------------
+# Field parsing
+# -------------------------
+# "₹1,200.50", "Rs. 500", "INR 75", "-Rs.500", "(500.00)"; commas are removed first
+_AMOUNT = re.compile(r"(-)?\s*(?:rs\.?|inr|₹)?\s*(-)?\s*(\d+(?:\.\d+)?|\.\d+)\s*(?:rs\.?|inr|₹)?", re.IGNORECASE)
+_TIME_SUFFIX = re.compile(r"[ T]\d{1,2}:\d{2}")
+_SAMPLE_DATE = date(2000, 12, 28)  # two-digit day and month, so strftime gives each format's full width
+
+def _parse_as(value, fmt):
+    # The date in value read with fmt, allowing a trailing time ("05/01/2024 10:22",
+    # "2024-01-05T10:22:00", "20240105120000"); None if fmt does not fit
+    try:
+        return datetime.strptime(value, fmt).date()
+    except ValueError:
+        pass
+    width = len(_SAMPLE_DATE.strftime(fmt))
+    head, rest = value[:width], value[width:]
+    if not (_TIME_SUFFIX.match(rest) or (fmt == "%Y%m%d" and rest.isdigit())):
+        return None
+    try:
+        return datetime.strptime(head, fmt).date()
+    except ValueError:
+        return None
+
+def sniff_date_formats(values):
+    """The formats (from DATE_FORMATS) that read the most of the sampled date strings.
+
+    Several come back when the sample cannot tell them apart, e.g. day-first and
+    month-first when no day in it is above 12."""
+    values = [v.strip() for v in values if v and v.strip()]
+    counts = {fmt: sum(_parse_as(v, fmt) is not None for v in values) for fmt in DATE_FORMATS}
+    best = max(counts.values(), default=0)
+    return tuple(f for f in DATE_FORMATS if counts[f] == best) if best else DATE_FORMATS
+
+def parse_date(value, formats=DATE_FORMATS):
+    value = (value or "").strip()
+    if not value:
+        raise ValueError("missing date")
+    dates = {d for d in (_parse_as(value, fmt) for fmt in formats) if d is not None}
+    if not dates:
+        raise ValueError(f"unrecognised date {value!r}")
+    if len(dates) > 1:
+        raise ValueError(f"ambiguous date {value!r} (could be {' or '.join(sorted(map(str, dates)))})")
+    return dates.pop().strftime("%Y-%m-%d")
+
+def parse_amount(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    bracketed = value.startswith("(") and value.endswith(")")
+    m = _AMOUNT.fullmatch(value.strip("()").replace(",", "").strip())
+    if not m:
+        raise ValueError(f"unrecognised amount {value!r}")
+    negative = bool(m.group(1) or m.group(2)) or bracketed
+    return -float(m.group(3)) if negative else float(m.group(3))
+
+def sniff_signs(records):
+    # "auto" resolved from sampled records: see SIGNS
+    for record in records:
+        if _signed(record):
+            try:
+                if (parse_amount(record.get("amount")) or 0) < 0:
+                    return "negative"
+            except ValueError:
+                continue
+    return "positive"
+
+def _signed(record):
+    # One amount column whose sign tells spending from money coming in
+    return not (record.get("type") or "").strip() and "credit" not in record
+
+
+# -------------------------
+# Readers (generators of dicts with date / amount / description / category / credit / type)
+# -------------------------
+def resolve_columns(header, mapping=None):
+    # mapping: {"date": "Txn Date", ...} overrides the aliases
+    names = [h.strip().lower() for h in header]
+    columns = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        wanted = [mapping[key].strip().lower()] if mapping and mapping.get(key) else aliases
+        for alias in wanted:
+            if alias in names:
+                columns[key] = names.index(alias)
+                break
+        else:
+            if mapping and mapping.get(key):
+                raise ImportFailed(f"Column {mapping[key]!r} not found in the header.")
+    missing = [k for k in ("date", "amount") if k not in columns]
+    if missing:
+        raise ImportFailed(f"Could not find the {' and '.join(missing)} column(s); pass a column mapping.")
+    return columns
+
+_SIGNED_AMOUNT = {"amount", "amt"}
+
+def csv_records(text_stream, mapping=None):
+    reader = csv.reader(text_stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = resolve_columns(header, mapping)
+    # A "Debit" / "Withdrawal" column holds spending only, whatever sign its values carry
+    debits = "type" not in columns and header[columns["amount"]].strip().lower() not in _SIGNED_AMOUNT
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        record = {k: (row[i] if i < len(row) else "") for k, i in columns.items()}
+        if debits:
+            record["type"] = "debit"
+        yield reader.line_num, record
+
+_OFX_FIELDS = {"DTPOSTED": "date", "TRNAMT": "amount", "NAME": "description", "MEMO": "memo", "TRNTYPE": "type"}
+
+def ofx_records(text_stream):
+    # OFX 1.x is SGML (closing tags optional) and 2.x is XML; splitting on '<' handles both
+    record, line, tail = None, 0, ""
+    while True:
+        chunk = text_stream.read(CHUNK_SIZE)
+        tokens = (tail + chunk).split("<")
+        tail = tokens.pop() if chunk else ""
+        for token in tokens:
+            tag, _, value = token.partition(">")
+            tag, value = tag.strip().upper(), value.strip()
+            if tag == "STMTTRN":
+                record, line = {}, line + 1
+            elif tag == "/STMTTRN" and record is not None:
+                if not record.get("description"):
+                    record["description"] = record.get("memo", "")
+                # OFX amounts are signed from the account's view: debits are negative
+                record["type"] = "debit" if record.get("amount", "").startswith("-") else "credit"
+                yield line, record
+                record = None
+            elif record is not None and tag in _OFX_FIELDS:
+                record[_OFX_FIELDS[tag]] = value
+        if not chunk:
+            return
+
+def open_records(stream, filename, mapping=None):
+    """Pick a reader from the file extension; `stream` is a binary file object."""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    if ext == "csv":
+        return csv_records(text, mapping)
+    if ext in ("ofx", "qfx"):
+        return ofx_records(text)
+    raise ImportFailed("Unsupported statement format; upload a .csv or .ofx file.")
+
+
+# -------------------------
+# Import
+# -------------------------
+def to_row(user_id, record, overrides=None, date_formats=DATE_FORMATS, signs="positive"):
+    # Returns an insert_expenses() row, or None for credits (money coming in is not an expense)
+    if (record.get("type") or "").strip().lower().startswith("c"):
+        return None
+    amount = parse_amount(record.get("amount"))
+    if amount is None:
+        if parse_amount(record.get("credit")):
+            return None
+        raise ValueError("missing amount")
+    if _signed(record):
+        if signs == "negative":
+            amount = -amount
+        if amount < 0:
+            return None  # a deposit, or a refund
+    amount = abs(amount)
+    if amount == 0:
+        raise ValueError("zero amount")
+    description = " ".join((record.get("description") or "").split())[:200]
+    category = (record.get("category") or "").strip() or classifier.classify(description, overrides)
+    return (user_id, category, round(amount, 2), description, parse_date(record.get("date"), date_formats))
+
+def import_records(conn, user_id, records, batch_size=BATCH_SIZE, progress=None, signs="auto"):
+    """Write records in batches of `batch_size`, one transaction each; progress(result) runs after every batch.
+
+    Imports skip the balance check: a statement records money already spent. A row is a
+    duplicate only if the user already had that expense before this import: when a file
+    repeats a row and the database holds it once, the second copy is imported."""
+    if signs not in SIGNS:
+        raise ImportFailed(f"Unknown sign convention {signs!r}; use one of {', '.join(SIGNS)}.")
+    result = ImportResult()
+    batch = []
+    overrides = classifier.load_overrides(conn, user_id)
+    sample = list(itertools.islice(records, SNIFF_ROWS))
+    date_formats = sniff_date_formats(record.get("date") for _, record in sample)
+    if signs == "auto":
+        signs = sniff_signs(record for _, record in sample)
+    # Expenses up to this id were there before the import; later ones are rows it added
+    split_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+    # Only hashes the user already had are tracked across batches, and only until a copy in
+    # the file goes past them, so memory grows with the overlap with earlier imports, not with
+    # the file: hash -> copies already in the database that no row of this file matched yet
+    unmatched = {}
+
+    def flush():
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            hashes = [expense_hash(r[4], r[2], r[3]) for r in batch]
+            counts = hash_counts(conn, user_id, {h for h in hashes if h not in unmatched}, split_id)
+            # A hash this import already added had all its older copies matched first
+            unmatched.update((h, existing) for h, (existing, added) in counts.items() if existing and not added)
+            in_batch = Counter()  # copies imported earlier in this batch
+            rows = []
+            for row, h in zip(batch, hashes):
+                if unmatched.get(h):
+                    unmatched[h] -= 1
+                    result.duplicates += 1
+                    continue
+                if h in unmatched:
+                    del unmatched[h]  # every older copy matched: this one is a repeat in the file
+                    result.repeats += 1
+                else:
+                    result.repeats += counts.get(h, (0, 0))[1] + in_batch[h] > 0
+                in_batch[h] += 1
+                rows.append(row)
+            result.imported += len(insert_expenses(conn, rows, check_balance=False))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        result.batches += 1
+        batch.clear()
+        if progress:
+            progress(result)
+
+    for line, record in itertools.chain(sample, records):
+        result.read += 1
+        try:
+            row = to_row(user_id, record, overrides, date_formats, signs)
+        except ValueError as e:
+            result.error(line, str(e))
+            continue
+        if row is None:
+            result.credits += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return result
+
+def import_file(conn, user_id, stream, filename, mapping=None, batch_size=BATCH_SIZE, progress=None, signs="auto"):
+    return import_records(conn, user_id, open_records(stream, filename, mapping), batch_size, progress, signs)
+
+def parse_mapping(text):
+    # "date=Txn Date,amount=Debit" -> {"date": "Txn Date", "amount": "Debit"}
+    mapping = {}
+    for part in (text or "").split(","):
+        key, sep, column = part.partition("=")
+        if sep and key.strip() in COLUMN_ALIASES and column.strip():
+            mapping[key.strip()] = column.strip()
+    return mapping
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import connect, init_db
+    ap = argparse.ArgumentParser(description="Import a CSV or OFX bank statement as expenses.")
+    ap.add_argument("path")
+    ap.add_argument("--user", type=int, required=True)
+    ap.add_argument("--map", default="", help='column mapping, e.g. "date=Txn Date,amount=Debit"')
+    ap.add_argument("--batch", type=int, default=BATCH_SIZE)
+    ap.add_argument("--signs", choices=SIGNS, default="auto",
+                    help="how a single signed amount column reads (default: negative if any amount is)")
+    args = ap.parse_args()
+
+    init_db()
+    conn = connect()
+    report = lambda r: print(f"\r{r.read} rows read, {r.imported} imported, {r.duplicates} duplicates", end="", flush=True)
+    try:
+        with open(args.path, "rb") as f:
+            result = import_file(conn, args.user, f, args.path, parse_mapping(args.map), args.batch, report, args.signs)
+    except ImportFailed as e:
+        sys.exit(f"Import failed: {e}")
+    finally:
+        conn.close()
+    print(f"\n{result.summary()}.")
+    for err in result.errors:
+        print(f"  {err}")
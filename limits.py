@@ -0,0 +1,84 @@
+# limits.py — category limit checks answered from the expense_rollups counters
+#
+# Spend per (user, category, period bucket) is already kept by triggers (see database.py),
+# so the headroom for a limit is one primary-key lookup, however many expenses there are.
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import List
+
+from database import ROLLUP_PERIODS
+
+# -------------------------
+# Configuration
+# -------------------------
+POLICY = os.environ.get("LIMIT_POLICY", "warn")  # warn: save and tell the user, reject: refuse the expense
+PERIODS = {"day": "Daily", "week": "Weekly", "month": "Monthly", "all": "Overall"}
+DEFAULT_PERIOD = "month"
+
+
+@dataclass
+class Headroom:
+    limit_id: int
+    category: str
+    period: str
+    limit_amount: float
+    spent: float
+    pending: float = 0.0  # amount about to be added by the write being checked
+
+    @property
+    def remaining(self):
+        return self.limit_amount - self.spent - self.pending
+
+    @property
+    def exceeded(self):
+        return self.remaining < 0
+
+    @property
+    def label(self):
+        return PERIODS.get(self.period, self.period)
+
+
+# The limit's own period picks the rollup bucket that holds the spend for `day`
+_BUCKET = "CASE l.period " + " ".join(
+    f"WHEN '{period}' THEN {expr.format(d=':day')}" for period, expr in ROLLUP_PERIODS) + " END"
+
+_HEADROOM_SQL = f"""
+    SELECT l.id, l.category, l.period, l.limit_amount, COALESCE(r.total, 0) AS spent
+    FROM category_limits l
+    LEFT JOIN expense_rollups r
+           ON r.user_id = l.user_id AND r.period = l.period AND r.bucket = {_BUCKET} AND r.category = l.category
+    WHERE l.user_id = :uid"""
+
+
+def period_or_default(period):
+    return period if period in PERIODS else DEFAULT_PERIOD
+
+def headroom(conn, user_id, category=None, day=None) -> List[Headroom]:
+    """Spend and remaining amount for each of the user's limits (or one category's) as of `day`."""
+    sql, params = _HEADROOM_SQL, {"uid": user_id, "day": (day or date.today()).isoformat()}
+    if category is not None:
+        sql += " AND l.category = :category"
+        params["category"] = category
+    return [Headroom(r["id"], r["category"], r["period"], r["limit_amount"] or 0.0, r["spent"])
+            for r in conn.execute(sql + " ORDER BY l.id", params)]
+
+def check(conn, user_id, items, day=None) -> List[Headroom]:
+    """Limits that (category, amount) items dated `day` would push over; empty if none.
+
+    Items are summed per category first, so a whole bill is checked with one query."""
+    adding = defaultdict(float)
+    for category, amount in items:
+        adding[category or "Other"] += amount or 0.0
+    breaches = []
+    for h in headroom(conn, user_id, day=day):
+        if h.category in adding:
+            h.pending = adding[h.category]
+            if h.exceeded:
+                breaches.append(h)
+    return breaches
+
+def describe(breaches):
+    return "; ".join(f"{h.category}: ₹{-h.remaining:.2f} over the {h.label.lower()} ₹{h.limit_amount:.2f} limit"
+                     for h in breaches)
@@ -0,0 +1,288 @@
+# metrics.py — request, SQL, template and OCR stage timings, served as Prometheus text on /metrics
+#
+# Numbers are per process: with several gunicorn workers each scrape of /metrics covers the
+# worker that answered it. OCR runs in the ocr_jobs pool processes; each job hands its stage
+# timings back to the web worker that queued it (ocr_jobs._submit), so they show up there.
+#
+# PROFILE_SLOW_MS=500 runs cProfile on every request and keeps a .prof dump (in PROFILE_DIR)
+# for each one slower than that; open them with `python -m pstats` or snakeviz.
+import cProfile, logging, os, re, sqlite3, threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+
+log = logging.getLogger(__name__)
+
+# -------------------------
+# Configuration
+# -------------------------
+ENABLED = os.environ.get("METRICS", "1") == "1"
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))  # 0 = profiler off
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+FAMILIES = {
+    "http_request_duration_seconds": ("histogram", "Time to build the response, by route, method and status."),
+    "http_request_sql_seconds": ("histogram", "Time spent in SQL per request, by route."),
+    "http_request_sql_queries_total": ("counter", "SQL statements executed, by route."),
+    "sql_statement_duration_seconds": ("histogram", "Time to first row per statement, by verb and table."),
+    "template_render_seconds": ("histogram", "Jinja render time, by template."),
+    "ocr_stage_seconds": ("histogram", "OCR time by stage: decode, detect, recognize, parse."),
+    "slow_request_profiles_total": ("counter", "cProfile dumps written for slow requests, by route."),
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram; labels is a tuple of (key, value)
+        self._counters = {}    # (name, labels) -> number
+        self._gauges = []      # (prefix, fn returning a dict of numbers)
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            h = self._histograms.get((name, labels))
+            if h is None:
+                h = self._histograms[(name, labels)] = Histogram()
+            h.observe(value)
+
+    def inc(self, name, labels, n=1):
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + n
+
+    def add_gauges(self, prefix, fn):
+        self._gauges.append((prefix, fn))
+
+    def take(self, name):
+        # Remove and return one histogram family as plain data (picklable, for merge())
+        with self._lock:
+            taken = [(k, self._histograms.pop(k)) for k in list(self._histograms) if k[0] == name]
+        return [(labels, h.buckets, h.sum, h.count) for (_, labels), h in taken]
+
+    def merge(self, name, data):
+        with self._lock:
+            for labels, buckets, total, count in data:
+                h = self._histograms.get((name, labels))
+                if h is None:
+                    h = self._histograms[(name, labels)] = Histogram()
+                h.buckets = [a + b for a, b in zip(h.buckets, buckets)]
+                h.sum += total
+                h.count += count
+
+    def render(self):
+        with self._lock:
+            histograms = {k: (list(h.buckets), h.sum, h.count) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+        out = []
+        for name, (kind, help_text) in FAMILIES.items():
+            series = histograms if kind == "histogram" else counters
+            keys = sorted(k for k in series if k[0] == name)
+            if not keys:
+                continue
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            for key in keys:
+                labels = key[1]
+                if kind == "counter":
+                    out.append(f"{name}{_labels(labels)} {series[key]}")
+                    continue
+                buckets, total, count = series[key]
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (float("inf"),), buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                out.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                out.append(f"{name}_count{_labels(labels)} {count}")
+        for prefix, fn in self._gauges:
+            for key, value in sorted(fn().items()):
+                if isinstance(value, (int, float)):
+                    out.append(f"# TYPE {prefix}_{key} gauge")
+                    out.append(f"{prefix}_{key} {float(value)}")
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}" if labels else ""
+
+
+_registry = Registry()
+
+def observe(name, labels, value):
+    _registry.observe(name, labels, value)
+
+def take(name):
+    return _registry.take(name)
+
+def merge(name, data):
+    _registry.merge(name, data)
+
+def add_gauges(prefix, fn):
+    _registry.add_gauges(prefix, fn)
+
+def render():
+    return _registry.render()
+
+@contextmanager
+def stage(name):
+    # with metrics.stage("decode"): ...  -> ocr_stage_seconds{stage="decode"}
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe("ocr_stage_seconds", (("stage", name),), time.perf_counter() - start)
+
+
+# -------------------------
+# SQL (connections from database.connect() use these classes)
+# -------------------------
+_TABLE_AFTER = {
+    "SELECT": re.compile(r"\bFROM\s+(\w+)", re.I),
+    "DELETE": re.compile(r"\bFROM\s+(\w+)", re.I),
+    "WITH": re.compile(r"\bFROM\s+(\w+)", re.I),
+    "INSERT": re.compile(r"\bINTO\s+(\w+)", re.I),
+    "REPLACE": re.compile(r"\bINTO\s+(\w+)", re.I),
+    "UPDATE": re.compile(r"^\s*UPDATE\s+(?:OR\s+\w+\s+)?(\w+)", re.I),
+}
+
+@lru_cache(maxsize=1024)
+def statement_label(sql):
+    # "SELECT ... FROM expenses WHERE ..." -> "SELECT expenses"; keeps the label set small
+    verb = sql.split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+    pattern = _TABLE_AFTER.get(verb)
+    m = pattern.search(sql) if pattern else None
+    return f"{verb} {m.group(1)}" if m else verb
+
+def record_sql(sql, seconds):
+    _registry.observe("sql_statement_duration_seconds", (("statement", statement_label(sql)),), seconds)
+    if has_request_context():
+        g.metrics_sql = getattr(g, "metrics_sql", 0.0) + seconds
+        g.metrics_queries = getattr(g, "metrics_queries", 0) + 1
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Times execute(): sqlite steps to the first row there, so later fetches are not included
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_sql(sql, time.perf_counter() - start)
+
+    def executescript(self, script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            record_sql("SCRIPT", time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute() makes its cursor in C, so route it through cursor() here
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+def connection_factory():
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+
+# -------------------------
+# Flask hooks
+# -------------------------
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    if PROFILE_SLOW_MS > 0:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            profiler = None  # another thread's profile is running (Python 3.12+ allows one)
+        g.metrics_profiler = profiler
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    return response
+
+def _teardown_request(exc):
+    # Runs even when the view raised (after_request does not then), so 500s are timed too and
+    # the profiler never stays on for the thread's next request.
+    # Streamed bodies (exports) are timed up to the first byte, not to the last
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    status = 500 if exc is not None else g.pop("metrics_status", 500)
+    route = _route()
+    _registry.observe("http_request_duration_seconds",
+                      (("route", route), ("method", request.method), ("status", str(status))), elapsed)
+    _registry.observe("http_request_sql_seconds", (("route", route),), g.pop("metrics_sql", 0.0))
+    _registry.inc("http_request_sql_queries_total", (("route", route),), g.pop("metrics_queries", 0))
+    profiler = g.pop("metrics_profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        if elapsed * 1000 >= PROFILE_SLOW_MS:
+            _dump_profile(profiler, route, elapsed)
+
+def _dump_profile(profiler, route, elapsed):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed * 1000:.0f}ms.prof")
+    profiler.dump_stats(path)
+    _registry.inc("slow_request_profiles_total", (("route", route),))
+    log.warning("%s %s took %.0f ms; profile in %s", request.method, request.path, elapsed * 1000, path)
+
+def _template_start(sender, template, context, **extra):
+    g.setdefault("metrics_templates", []).append(time.perf_counter())
+
+def _template_done(sender, template, context, **extra):
+    starts = g.get("metrics_templates")
+    if starts:
+        _registry.observe("template_render_seconds", (("template", template.name or "string"),),
+                          time.perf_counter() - starts.pop())
+
+def init_app(app):
+    if not ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    before_render_template.connect(_template_start, app)
+    template_rendered.connect(_template_done, app)
@@ -0,0 +1,198 @@
+# ocr_engine.py — shared, lazily built pool of easyocr readers (one pool per worker process)
+import os, threading, time
+from contextlib import contextmanager
+from queue import Queue, Empty
+import metrics
+
+# -------------------------
+# Configuration
+# -------------------------
+POOL_SIZE = int(os.environ.get("OCR_POOL_SIZE", "1"))
+ACQUIRE_TIMEOUT = float(os.environ.get("OCR_ACQUIRE_TIMEOUT", "20"))
+LANGS = os.environ.get("OCR_LANGS", "en").split(",")
+USE_GPU = os.environ.get("OCR_GPU", "0") == "1"
+
+
+class OCRBusy(Exception):
+    """Raised when every reader stays busy for longer than the acquire timeout."""
+
+
+class ReaderPool:
+    def __init__(self, size=POOL_SIZE, timeout=ACQUIRE_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = Queue()
+        self._built = 0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "readers_built": 0,
+            "build_seconds": 0.0,
+            "acquired": 0,
+            "rejected": 0,
+            "in_use": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "inference_seconds_total": 0.0,
+            "inference_seconds_max": 0.0,
+            "inferences": 0,
+            "batch_images": 0,
+            "batch_seconds": 0.0,
+        }
+
+    def _build_reader(self):
+        # Imported here so processes that never run OCR never load torch / the models
+        import easyocr
+        start = time.perf_counter()
+        reader = easyocr.Reader(LANGS, gpu=USE_GPU)
+        with self._stats_lock:
+            self._stats["readers_built"] += 1
+            self._stats["build_seconds"] += time.perf_counter() - start
+        return reader
+
+    def _take(self):
+        # Reuse an idle reader, otherwise build a new one while under the size limit
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        with self._lock:
+            if self._built < self.size:
+                self._built += 1
+                build = True
+            else:
+                build = False
+        if build:
+            try:
+                return self._build_reader()
+            except Exception:
+                with self._lock:
+                    self._built -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise OCRBusy("All OCR readers are busy, try again shortly.")
+
+    @contextmanager
+    def reader(self):
+        start = time.perf_counter()
+        reader = self._take()
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            s = self._stats
+            s["acquired"] += 1
+            s["in_use"] += 1
+            s["wait_seconds_total"] += waited
+            s["wait_seconds_max"] = max(s["wait_seconds_max"], waited)
+        try:
+            yield reader
+        finally:
+            with self._stats_lock:
+                self._stats["in_use"] -= 1
+            self._idle.put(reader)
+
+    def readtext(self, image, **kwargs):
+        with self.reader() as reader:
+            start = time.perf_counter()
+            try:
+                return _read(reader, image, False, **kwargs)
+            finally:
+                self._record_inference(time.perf_counter() - start)
+
+    def readtext_batched(self, images, **kwargs):
+        # All images in one call share a single detector/recogniser pass per batch
+        with self.reader() as reader:
+            start = time.perf_counter()
+            try:
+                return _read(reader, images, True, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                self._record_inference(seconds)
+                with self._stats_lock:
+                    self._stats["batch_images"] += len(images)
+                    self._stats["batch_seconds"] += seconds
+
+    def _record_inference(self, seconds):
+        with self._stats_lock:
+            s = self._stats
+            s["inferences"] += 1
+            s["inference_seconds_total"] += seconds
+            s["inference_seconds_max"] = max(s["inference_seconds_max"], seconds)
+
+    def warm(self):
+        # Build one reader up front (e.g. at worker boot) so the first upload is not cold
+        with self.reader():
+            pass
+
+    def take_stats(self):
+        # Remove and return the counters (not the live in_use), for merge_stats() in another process
+        with self._stats_lock:
+            taken = {k: v for k, v in self._stats.items() if k != "in_use"}
+            for k in taken:
+                self._stats[k] = 0.0 if isinstance(self._stats[k], float) else 0
+        return taken
+
+    def merge_stats(self, taken):
+        with self._stats_lock:
+            for k, v in taken.items():
+                self._stats[k] = max(self._stats[k], v) if k.endswith("_max") else self._stats[k] + v
+
+    def stats(self):
+        with self._stats_lock:
+            s = dict(self._stats)
+        s["pool_size"] = self.size
+        s["idle"] = self._idle.qsize()
+        s["wait_seconds_avg"] = s["wait_seconds_total"] / s["acquired"] if s["acquired"] else 0.0
+        s["inference_seconds_avg"] = s["inference_seconds_total"] / s["inferences"] if s["inferences"] else 0.0
+        s["batch_images_per_second"] = s["batch_images"] / s["batch_seconds"] if s["batch_seconds"] else 0.0
+        return s
+
+
+def _read(reader, image, batched, detail=1, **kwargs):
+    # The same steps as easyocr's Reader.readtext / readtext_batched (1.7), split so that
+    # detection and recognition show up as separate OCR stages in /metrics. Any other
+    # option goes straight to easyocr, timed as one stage.
+    if kwargs:
+        with metrics.stage("detect+recognize"):
+            return (reader.readtext_batched if batched else reader.readtext)(image, detail=detail, **kwargs)
+    from easyocr.utils import reformat_input, reformat_input_batched
+    with metrics.stage("detect"):
+        img, grey = reformat_input_batched(image) if batched else reformat_input(image)
+        horizontal, free = reader.detect(img, reformat=False)
+    with metrics.stage("recognize"):
+        if not batched:
+            return reader.recognize(grey, horizontal[0], free[0], detail=detail, reformat=False)
+        greys = [grey] if len(grey.shape) == 2 else grey
+        return [reader.recognize(g, h, f, detail=detail, reformat=False) for g, h, f in zip(greys, horizontal, free)]
+
+
+# One pool per process; gunicorn workers each get their own on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReaderPool()
+    return _pool
+
+def readtext(image, **kwargs):
+    return get_pool().readtext(image, **kwargs)
+
+def readtext_batched(images, **kwargs):
+    return get_pool().readtext_batched(images, **kwargs)
+
+def take_stats():
+    return get_pool().take_stats()
+
+def merge_stats(taken):
+    # OCR runs in the ocr_jobs processes; their counters are added to the web worker's pool
+    get_pool().merge_stats(taken)
+
+def stats():
+    return get_pool().stats()
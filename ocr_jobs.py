@@ -0,0 +1,210 @@
+# ocr_jobs.py — SQLite-backed invoice OCR job queue run by a local process pool
+import json, logging, os, sys, threading, time, uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from database import connect, get_db
+import metrics, ocr_engine
+
+log = logging.getLogger(__name__)
+
+# -------------------------
+# Configuration
+# -------------------------
+WORKERS = int(os.environ.get("OCR_JOB_WORKERS", "1"))
+START_METHOD = os.environ.get("OCR_JOB_START_METHOD", "spawn")
+STALE_AFTER = int(os.environ.get("OCR_JOB_STALE_SECONDS", "600"))
+RECOVER_INTERVAL = int(os.environ.get("OCR_JOB_RECOVER_SECONDS", "60"))
+QUEUED_GRACE = 30  # seconds a queued job may wait before another process submits it too
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = set()  # job ids submitted to this process's pool and not finished yet
+_inflight_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                method = START_METHOD
+                if method == "fork" and threading.active_count() > 1:
+                    # A forked child would inherit whatever locks other threads hold right now
+                    log.warning("OCR job pool created after threads started; using spawn instead of fork")
+                    method = "spawn"
+                ctx = multiprocessing.get_context(method)
+                _executor = ProcessPoolExecutor(max_workers=max(1, WORKERS), mp_context=ctx,
+                                                initializer=_init_process)
+    return _executor
+
+def start_pool():
+    # Fork the job processes now (gunicorn post_fork, before the worker starts any thread)
+    _get_executor().submit(int).result()
+
+
+# -------------------------
+# Producer side (web workers)
+# -------------------------
+def enqueue(user_id, paths):
+    job_id = uuid.uuid4().hex
+    conn = get_db()
+    conn.execute("INSERT INTO ocr_jobs (id, user_id, paths, status) VALUES (?, ?, ?, 'queued')",
+                 (job_id, user_id, json.dumps(list(paths))))
+    conn.commit()
+    _submit(_get_executor(), job_id)
+    return job_id
+
+def get_job(job_id, user_id):
+    conn = get_db()
+    row = conn.execute("SELECT * FROM ocr_jobs WHERE id=? AND user_id=?", (job_id, user_id)).fetchone()
+    if not row:
+        return None
+    job = {"id": row["id"], "status": row["status"], "error": row["error"], "items": None}
+    if row["status"] == "done":
+        job["items"] = json.loads(row["result"] or "[]")
+    return job
+
+def stats():
+    conn = get_db()
+    counts = {r["status"]: r["n"] for r in conn.execute("SELECT status, COUNT(*) AS n FROM ocr_jobs GROUP BY status")}
+    return {"workers": WORKERS, "by_status": counts}
+
+def recover():
+    """Re-submit jobs left behind by a restart or a recycled worker: anything queued for longer
+    than QUEUED_GRACE, or running for longer than STALE_AFTER. Returns how many were submitted.
+
+    Jobs this process already submitted are skipped; a job picked up by several workers
+    still runs once (see _claim)."""
+    conn = connect()
+    try:
+        # updated_at is left as it was, so the requeued jobs are old enough to submit right below
+        conn.execute("""
+            UPDATE ocr_jobs SET status='queued'
+            WHERE status='running' AND updated_at < datetime('now', ?)
+        """, (f"-{STALE_AFTER} seconds",))
+        conn.commit()
+        pending = [r["id"] for r in conn.execute("""
+            SELECT id FROM ocr_jobs WHERE status='queued' AND updated_at < datetime('now', ?) ORDER BY created_at
+        """, (f"-{QUEUED_GRACE} seconds",))]
+    finally:
+        conn.close()
+    with _inflight_lock:
+        pending = [job_id for job_id in pending if job_id not in _inflight]
+    for job_id in pending:
+        _submit(_get_executor(), job_id)
+    return len(pending)
+
+def _recover_loop(interval):
+    while True:
+        try:
+            resubmitted = recover()
+            if resubmitted:
+                log.info("resubmitted %d abandoned OCR job(s)", resubmitted)
+        except Exception:
+            log.exception("OCR job recovery failed")
+        time.sleep(interval)
+
+_recover_thread = None
+
+def start_recovery(interval=RECOVER_INTERVAL):
+    # One per web worker: recovers at worker start, then every interval
+    global _recover_thread
+    if _recover_thread is None or not _recover_thread.is_alive():
+        _recover_thread = threading.Thread(target=_recover_loop, args=(interval,), name="ocr-job-recovery", daemon=True)
+        _recover_thread.start()
+    return _recover_thread
+
+def _submit(executor, job_id):
+    # The job's OCR stage timings and reader pool counters come back with its status and join
+    # this process's /metrics and /stats (the web worker never runs OCR itself)
+    with _inflight_lock:
+        _inflight.add(job_id)
+    future = executor.submit(_run_and_report, job_id)
+    future.add_done_callback(lambda f: _finished(job_id, f))
+
+def _finished(job_id, future):
+    with _inflight_lock:
+        _inflight.discard(job_id)
+    if not future.cancelled() and future.exception() is None:
+        _, stages, pool_stats = future.result()
+        metrics.merge("ocr_stage_seconds", stages)
+        ocr_engine.merge_stats(pool_stats)
+
+
+# -------------------------
+# Consumer side (pool processes / CLI)
+# -------------------------
+def _claim(conn, job_id):
+    # Atomic claim so a job submitted by several web workers only runs once
+    cur = conn.execute("""
+        UPDATE ocr_jobs SET status='running', updated_at=datetime('now')
+        WHERE id=? AND status='queued'
+    """, (job_id,))
+    conn.commit()
+    return cur.rowcount == 1
+
+def run_job(job_id):
+    from ocr_utils import scan_invoice, scan_invoice_batch
+    import upload_store
+    conn = get_db()
+    try:
+        if not _claim(conn, job_id):
+            return None
+        paths = json.loads(conn.execute("SELECT paths FROM ocr_jobs WHERE id=?", (job_id,)).fetchone()["paths"])
+        try:
+            # Bills already scanned (same bytes) come straight from the cache
+            found = {}
+            for path in paths:
+                cached = upload_store.lookup(upload_store.digest_of(path), conn)
+                if cached is not None:
+                    found[path] = cached
+            todo = [p for p in paths if p not in found]
+            if len(todo) == 1 and not todo[0].lower().endswith((".tif", ".tiff")):
+                results = [scan_invoice(todo[0])]
+            elif todo:
+                results, throughput = scan_invoice_batch(todo)
+                log.info("job %s: %d images in %.2fs (%.2f img/s)", job_id, throughput["images"],
+                         throughput["seconds"], throughput["images_per_second"])
+            else:
+                results = []
+            for path, (text, file_items) in zip(todo, results):
+                upload_store.remember(upload_store.digest_of(path), text, file_items, conn)
+                found[path] = file_items
+            items = [it for path in paths for it in found[path]]
+        except Exception as e:
+            conn.execute("UPDATE ocr_jobs SET status='failed', error=?, updated_at=datetime('now') WHERE id=?",
+                         (str(e) or e.__class__.__name__, job_id))
+            conn.commit()
+            return "failed"
+        conn.execute("UPDATE ocr_jobs SET status='done', result=?, updated_at=datetime('now') WHERE id=?",
+                     (json.dumps(items), job_id))
+        conn.commit()
+        return "done"
+    finally:
+        conn.close()
+
+def _init_process():
+    # A forked job process starts with a copy of its parent's counters; only report its own
+    ocr_engine.take_stats()
+
+def _run_and_report(job_id):
+    # Pool-process entry point: run the job, then hand back (and reset) the stage timings
+    # and reader pool counters
+    return run_job(job_id), metrics.take("ocr_stage_seconds"), ocr_engine.take_stats()
+
+def drain(poll_interval=1.0, once=False):
+    # Standalone worker loop: `python ocr_jobs.py` processes queued jobs without the web app
+    while True:
+        conn = get_db()
+        rows = conn.execute("SELECT id FROM ocr_jobs WHERE status='queued' ORDER BY created_at").fetchall()
+        conn.close()
+        for r in rows:
+            run_job(r["id"])
+        if once:
+            return
+        if not rows:
+            time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    drain(once="--once" in sys.argv)
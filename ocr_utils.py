@@ -1,40 +1,125 @@
-import easyocr
-import re
-
-# Load OCR reader once
-reader = easyocr.Reader(['en'], gpu=False)
-
-# Keywords to detect category
-CATEGORY_KEYWORDS = {
-    "Food": ["food", "burger", "pizza", "hotel", "restaurant", "meal"],
-    "Transport": ["uber", "ola", "bus", "train", "auto", "ride"],
-    "Shopping": ["mall", "shopping", "fashion", "clothes", "shirt"],
-    "Stationary": ["pen", "pencil", "notebook", "book"],
-    "Entertainment": ["movie", "cinema", "ticket", "theatre"],
-}
-
-def detect_category(text):
-    text = text.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for word in keywords:
-            if word in text:
-                return category
-    return "Other"
+import logging, os, time
+from concurrent.futures import ThreadPoolExecutor
+import classifier, metrics, ocr_engine, receipt_parser
 
-def extract_invoice_data(image_path):
-    # Extract text using OCR
-    result = reader.readtext(image_path, detail=0)
-    text = " ".join(result)
+# Longest image side fed to the detector; larger bills are shrunk first
+OCR_MAX_SIDE = int(os.environ.get("OCR_MAX_SIDE", "1600"))
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", "8"))
+DECODE_THREADS = int(os.environ.get("OCR_DECODE_THREADS", "4"))
+
+log = logging.getLogger(__name__)
 
-    # Find all numbers (prices)
-    numbers = re.findall(r"\d+\.\d+|\d+", text)
-    amount = max([float(n) for n in numbers]) if numbers else 0
+def parse_items_from_text(text):
+    # Item lines only: header, tax, total and payment lines are left out (see receipt_parser)
+    return receipt_parser.parse_text(text).items
+
+def extract_invoice_data(image_path):
+    # Extract text using OCR; the boxes let the parser rebuild printed lines
+    text, receipt = receipt_parser.read_boxes(ocr_engine.readtext(image_path, detail=1))
 
     # Detect category
-    category = detect_category(text)
+    category = classifier.classify(text)
 
     return {
-        "amount": amount,
+        "amount": receipt.amount,
         "category": category,
         "description": "Auto scanned invoice"
     }
+
+def categorise(items):
+    # Turn parsed bill lines into reviewable, categorised items
+    categories = classifier.classify_many(it["name"] for it in items)
+    return [{"name": it["name"], "amount": it["amount"], "category": c} for it, c in zip(items, categories)]
+
+def items_from_text(text):
+    return categorise(parse_items_from_text(text))
+
+def read_page(results, label=""):
+    # detail=1 OCR results for one page -> (text, items); says so when the items don't add up
+    with metrics.stage("parse"):
+        text, receipt = receipt_parser.read_boxes(results)
+    if receipt.balanced is False:
+        log.warning("%s: items add up to %.2f but the bill says %.2f",
+                    label, receipt.items_total, receipt.expected_items_total)
+    return text, categorise(receipt.items)
+
+def scan_invoice(image_path):
+    # OCR one bill image at OCR resolution; returns (text, items)
+    page = load_pages(image_path)[0]
+    return read_page(ocr_engine.readtext(page, detail=1), os.path.basename(image_path))
+
+
+# -------------------------
+# Batched scanning (statement bundles / multi-page TIFFs)
+# -------------------------
+def _downscale(img, max_side=OCR_MAX_SIDE):
+    import cv2
+    h, w = img.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+def _reduced_flag(path, max_side=OCR_MAX_SIDE):
+    # Let the decoder shrink by 2/4/8 while decoding (JPEG does this in the DCT step),
+    # so a 12MP phone photo never exists in memory at full size
+    import cv2
+    from upload_store import probe_image
+    with open(path, "rb") as f:
+        info = probe_image(f)
+    longest = max(info[1], info[2]) if info else 0
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_GRAYSCALE_8), (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+                         (2, cv2.IMREAD_REDUCED_GRAYSCALE_2)):
+        if longest // factor >= max_side:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+def load_pages(path):
+    # Decode one file into grayscale pages; multi-page TIFFs yield one page per frame
+    with metrics.stage("decode"):
+        return _decode(path)
+
+def _decode(path):
+    import cv2
+    if path.lower().endswith((".tif", ".tiff")):
+        ok, pages = cv2.imreadmulti(path, flags=cv2.IMREAD_GRAYSCALE)
+        pages = list(pages) if ok else []
+    else:
+        img = cv2.imread(path, _reduced_flag(path))
+        pages = [img] if img is not None else []
+    if not pages:
+        raise ValueError(f"Could not decode image: {os.path.basename(path)}")
+    return [_downscale(p) for p in pages]
+
+def _pad_to_common(pages):
+    # The batched detector stacks its inputs, so give every page in a batch the same canvas
+    import numpy as np
+    h = max(p.shape[0] for p in pages)
+    w = max(p.shape[1] for p in pages)
+    out = []
+    for p in pages:
+        canvas = np.full((h, w), 255, dtype=p.dtype)
+        canvas[:p.shape[0], :p.shape[1]] = p
+        out.append(canvas)
+    return out
+
+def scan_invoice_batch(paths, batch_size=OCR_BATCH_SIZE):
+    # Decode/downscale in parallel threads (cv2 releases the GIL), then OCR in batches.
+    # Returns one (text, items) pair per input path plus throughput figures.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=DECODE_THREADS) as pool:
+        per_file = list(pool.map(load_pages, paths))
+    pages = [page for file_pages in per_file for page in file_pages]
+    boxes = []
+    for i in range(0, len(pages), batch_size):
+        batch = _pad_to_common(pages[i:i + batch_size])
+        boxes.extend(ocr_engine.readtext_batched(batch, detail=1))
+    results, pos = [], 0
+    for path, file_pages in zip(paths, per_file):
+        # Each page is parsed on its own: box coordinates only make sense within a page
+        read = [read_page(b, os.path.basename(path)) for b in boxes[pos:pos + len(file_pages)]]
+        pos += len(file_pages)
+        results.append(("\n".join(text for text, _ in read), [it for _, items in read for it in items]))
+    elapsed = time.perf_counter() - start
+    return results, {"images": len(pages), "seconds": elapsed,
+                     "images_per_second": len(pages) / elapsed if elapsed else 0.0}
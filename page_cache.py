@@ -0,0 +1,150 @@
+# page_cache.py — per-user cache of computed page contexts, keyed by a trigger-maintained data version
+#
+# Any write to a user's allowances, expenses, goals, limits or recurring items bumps
+# user_versions.version (see database.py), so a cached context can never outlive the
+# data it was built from. Contexts are cached, not HTML, so flashes still render per view.
+import hashlib, os, pickle, tempfile, threading, time
+from collections import OrderedDict
+from datetime import date
+
+# -------------------------
+# Configuration
+# -------------------------
+MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_SIZE", "1024"))
+TTL = float(os.environ.get("PAGE_CACHE_TTL", "300"))
+CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "")  # optional on-disk tier shared by workers
+ENABLED = os.environ.get("PAGE_CACHE", "1") == "1"
+PRUNE_EVERY = 256  # disk writes between sweeps of expired files
+
+
+class PageCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, directory=CACHE_DIR):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "disk_errors": 0}
+        self._disk_writes = 0
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # ---- disk tier ----
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+    def _disk_get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                stored_key, expires_at, value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._count("disk_errors")
+            return None
+        if stored_key != key or expires_at < time.time():
+            return None
+        return expires_at, value
+
+    def _disk_put(self, key, expires_at, value):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, expires_at, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            self._count("disk_errors")
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        # Entries for superseded data versions are never read again; drop anything past its TTL
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(".pkl") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    # ---- memory tier ----
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expired"] += 1
+        if self.directory:
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._store(key, *entry)
+                self._count("disk_hits")
+                return entry[1]
+        self._count("misses")
+        return None
+
+    def _store(self, key, expires_at, value):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl
+        self._store(key, expires_at, value)
+        if self.directory:
+            self._disk_put(key, expires_at, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._entries)
+        lookups = s["hits"] + s["disk_hits"] + s["misses"]
+        s["hit_rate"] = (s["hits"] + s["disk_hits"]) / lookups if lookups else 0.0
+        s.update(max_entries=self.max_entries, ttl=self.ttl, directory=self.directory or None, enabled=ENABLED)
+        return s
+
+
+_cache = PageCache()
+
+def data_version(conn, user_id):
+    row = conn.execute("SELECT version FROM user_versions WHERE user_id=?", (user_id,)).fetchone()
+    return row["version"] if row else 0
+
+def cached(conn, user_id, page, build, *args):
+    """Return build()'s context for this user/page, reusing it until their data changes.
+
+    `args` are whatever else the context depends on (e.g. a query-string range);
+    today's date is always part of the key because safe limits and charts depend on it."""
+    if not ENABLED:
+        return build()
+    key = (user_id, page, data_version(conn, user_id), date.today().isoformat()) + args
+    context = _cache.get(key)
+    if context is None:
+        context = build()
+        _cache.put(key, context)
+    return context
+
+def stats():
+    return _cache.stats()
@@ -0,0 +1,214 @@
+# receipt_parser.py — bill text -> items, subtotal, tax and total
+#
+# Works on plain text lines or on easyocr's detail=1 output ([box, text, confidence] per
+# token), whose boxes are first grouped back into printed lines. Header, payment and
+# summary lines (phone numbers, GSTIN, CGST, TOTAL, Cash/Change...) are never items.
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+TOLERANCE = 1.0  # rupees of rounding allowed when checking that the items add up
+
+# -------------------------
+# Patterns (compiled once)
+# -------------------------
+# Amount at the end of a line: "120", "120.00", "1,20,000.50", "Rs. 99", "₹ 40/-", "-0.40".
+# A minus only counts when it touches the number, so "Juice - 40" is 40, not -40.
+_AMOUNT = re.compile(r"(?<![^\s:=|\-—])(-?)(?:(?:₹|[Rr][Ss]\.?|INR)\s*)?(\d{1,3}(?:,\d{2,3})+|\d+)(\.\d{1,2})?(?:/-)?$")
+# A token that is only a number (used to find the amount column)
+_NUMBER = re.compile(r"^(?:₹|[Rr][Ss]\.?|INR)?\s*-?\d[\d,]*(?:\.\d{1,2})?(?:/-)?$")
+# Quantity / rate columns between the name and the amount: "2 x 60.00", "@ 60", "3 Nos", "2x"
+_TRAILING_COLUMNS = re.compile(r"(?:\s+(?:[x@*]|nos?|pcs|qty|\d+(?:[.,]\d+)*[x@*]?))+$", re.I)
+_LEADING_SERIAL = re.compile(r"^\d{1,3}[.)]\s+")
+_DATE_TIME = re.compile(r"\d[/\-]\d\d?[/\-]\d|\d:\d\d")
+_AMOUNT_END = set("0123456789-")
+_SEPARATORS = " \t:-—=|."
+_WORD = re.compile(r"[a-z]+")
+
+# What a line is, from the words (or two-word phrases) in front of its amount. Like the
+# category classifier, each word is one dict lookup rather than one regex per kind of line.
+LINE_KINDS = {
+    "subtotal": ["subtotal", "sub total", "item total", "gross total", "gross amount"],
+    "tax": ["gst", "cgst", "sgst", "igst", "utgst", "vat", "tax", "taxes", "cess"],
+    "inclusive": ["incl", "inclusive", "including"],   # "Total (incl. GST)" is a total, not tax
+    "total": ["total", "payable", "net amount", "amount due", "bill amount"],
+    "discount": ["discount", "disc", "saving", "savings", "offer", "coupon"],
+    "adjustment": ["round off", "roundoff", "rounded off", "rounding off", "service charge", "delivery fee",
+                   "delivery charge", "delivery charges", "packing", "packaging", "convenience fee"],
+    # Lines that carry numbers but are never money spent on an item
+    "skip": ["ph", "tel", "mob", "phone no", "mobile no", "contact", "gstin", "fssai", "cin", "invoice", "inv",
+             "bill no", "order no", "order id", "kot", "tbl", "cashier", "steward", "card no", "card payment",
+             "card paid", "upi", "tender", "tendered", "txn", "total qty", "total quantity", "total item",
+             "total items", "no of items", "item count", "items count", "thank", "www", "com"],
+    # Header and payment words that can also be part of an item name ("Coffee Table", "Date
+    # Shake", "Time Pass Chips"): they only skip a line that has nothing else in front of its amount
+    "header": ["table", "pax", "date", "time", "token", "server", "receipt", "cash", "paid", "change",
+               "balance", "ref", "visit"],
+}
+_KIND = {phrase: kind for kind, phrases in LINE_KINDS.items() for phrase in phrases}
+# Words a header or payment line may have besides those ("Paid by Cash", "Balance Due", "Table No")
+_HEADER_FILLER = {"no", "by", "in", "of", "due", "mode", "amount", "amt", "rs", "inr", "returned", "return",
+                  "am", "pm", "again", "us", "you"}
+_HEADER_WORDS = _HEADER_FILLER | {p for kind in ("skip", "header") for p in LINE_KINDS[kind] if " " not in p}
+
+MAX_DIGITS = 5  # plain integers longer than this are phone numbers / PIN codes, not prices
+
+
+@dataclass
+class Receipt:
+    items: List[dict] = field(default_factory=list)   # {"name", "amount"}, as ocr_utils has always returned
+    subtotal: Optional[float] = None
+    tax: float = 0.0
+    adjustments: float = 0.0                          # discounts (negative), charges, round-off
+    total: Optional[float] = None
+    skipped: int = 0                                  # lines with a number that were not items
+
+    @property
+    def items_total(self):
+        return round(sum(it["amount"] for it in self.items), 2)
+
+    @property
+    def expected_items_total(self):
+        # What the items should add up to, from the summary lines the bill printed
+        if self.subtotal is not None:
+            return self.subtotal
+        if self.total is not None:
+            return round(self.total - self.tax - self.adjustments, 2)
+        return None
+
+    @property
+    def difference(self):
+        expected = self.expected_items_total
+        return None if expected is None else round(self.items_total - expected, 2)
+
+    @property
+    def balanced(self):
+        # None when the bill printed no subtotal/total to check against
+        diff = self.difference
+        return None if diff is None else abs(diff) <= TOLERANCE
+
+    @property
+    def amount(self):
+        # Best figure for "what was paid": the printed total, else what the parts add up to
+        if self.total is not None:
+            return self.total
+        return round((self.subtotal if self.subtotal is not None else self.items_total) + self.tax + self.adjustments, 2)
+
+
+# -------------------------
+# Line parsing
+# -------------------------
+def split_amount(line):
+    # "Paneer Tikka 2 x 120.00 240.00" -> ("Paneer Tikka 2 x 120.00", 240.0); None without a trailing amount
+    m = _AMOUNT.search(line.rstrip())
+    if not m:
+        return None
+    whole, cents = m.group(2), m.group(3) or ""
+    if len(whole) > MAX_DIGITS and not cents and "," not in whole:
+        return None
+    amount = float(whole.replace(",", "") + cents)
+    return line[:m.start()], -amount if m.group(1) else amount
+
+def clean_name(label):
+    label = _LEADING_SERIAL.sub("", label.strip()).rstrip(_SEPARATORS)
+    label = _TRAILING_COLUMNS.sub("", label)
+    return label.strip(_SEPARATORS)
+
+def header_only(label):
+    # Every word in front of the amount is a header/payment word ("Table: 7", "Paid by Cash")
+    return all(w in _HEADER_WORDS for w in _WORD.findall(label.lower()))
+
+def line_kinds(label):
+    words = _WORD.findall(label.lower())
+    kinds = {_KIND[w] for w in words if w in _KIND}
+    kinds.update(_KIND[p] for p in map(" ".join, zip(words, words[1:])) if p in _KIND)
+    return kinds
+
+def parse_lines(lines):
+    receipt = Receipt()
+    tax_lines, tax_total = 0.0, None
+    totals = []
+    for line in lines:
+        line = line.strip()
+        # cheap test first: every amount ends in a digit or "/-"
+        split = split_amount(line) if line and line[-1] in _AMOUNT_END else None
+        if split is None:
+            continue
+        label, amount = split
+        kinds = line_kinds(label)
+        if "subtotal" in kinds:
+            receipt.subtotal = amount
+        elif "tax" in kinds and "inclusive" not in kinds:
+            # "Total GST" replaces the CGST + SGST lines above it rather than adding to them
+            if "total" in kinds:
+                tax_total = amount
+            else:
+                tax_lines += amount
+        elif "total" in kinds and "skip" not in kinds:
+            totals.append(amount)
+        elif "discount" in kinds:
+            receipt.adjustments -= abs(amount)
+        elif "adjustment" in kinds:
+            receipt.adjustments += amount
+        elif ("skip" in kinds or "header" in kinds and header_only(label) or amount <= 0
+              or not kinds and _DATE_TIME.search(label)):
+            receipt.skipped += 1
+        else:
+            name = clean_name(label)
+            if _WORD.search(name.lower()):
+                receipt.items.append({"name": name, "amount": amount})
+            else:
+                receipt.skipped += 1
+    receipt.tax = round(tax_total if tax_total is not None else tax_lines, 2)
+    receipt.adjustments = round(receipt.adjustments, 2)
+    # Bills often print "Total" before tax/discount and "Grand Total" / "Net Payable" after;
+    # the last one is what was paid
+    receipt.total = totals[-1] if totals else None
+    return receipt
+
+def parse_text(text):
+    return parse_lines((text or "").splitlines())
+
+
+# -------------------------
+# easyocr boxes (detail=1) -> printed lines
+# -------------------------
+def _token(result):
+    box, text = result[0], result[1]
+    xs = [p[0] for p in box]
+    ys = [p[1] for p in box]
+    return min(xs), max(xs), min(ys), max(ys), str(text).strip()
+
+def group_lines(results):
+    """Group detail=1 tokens into rows, each a list of (x0, x1, text) sorted left to right.
+    A token joins the row above when its vertical centre is within half that row's height."""
+    tokens = sorted((t for t in map(_token, results) if t[4]), key=lambda t: t[2] + t[3])
+    rows = []   # [centre, half height, tokens]
+    for x0, x1, y0, y1, text in tokens:
+        centre = (y0 + y1) / 2
+        if rows and abs(centre - rows[-1][0]) <= rows[-1][1]:
+            rows[-1][2].append((x0, x1, text))
+        else:
+            rows.append([centre, max((y1 - y0) / 2, 1.0), [(x0, x1, text)]])
+    return [sorted(row[2]) for row in rows]
+
+def _off_column(rows):
+    # Rows ending in a number whose right edge is nowhere near the amount column: a phone
+    # number in the header, or a quantity whose price OCR missed. Those numbers are not amounts.
+    edges = sorted(row[-1][1] for row in rows if _NUMBER.match(row[-1][2]))
+    if not edges:
+        return set()
+    column = edges[len(edges) // 2]
+    left, right = min(t[0] for row in rows for t in row), max(t[1] for row in rows for t in row)
+    slack = max((right - left) * 0.15, 1.0)
+    return {i for i, row in enumerate(rows) if _NUMBER.match(row[-1][2]) and abs(row[-1][1] - column) > slack}
+
+def read_boxes(results):
+    """detail=1 results -> (text, Receipt). The text has one printed line per line, which
+    is what detail=0 loses: it returns every token, name and price alike, on its own line."""
+    rows = group_lines(results)
+    lines = [" ".join(t[2] for t in row) for row in rows]
+    off = _off_column(rows)
+    receipt = parse_lines(line for i, line in enumerate(lines) if i not in off)
+    receipt.skipped += len(off)
+    return "\n".join(lines), receipt
@@ -0,0 +1,68 @@
+# rollups.py — insights charts answered from expense_rollups (maintained by triggers in database.py)
+from datetime import date, timedelta
+
+# range key -> (label, chart period, number of buckets; None = every bucket on record)
+RANGES = {
+    "7d": ("Last 7 days", "day", 7),
+    "30d": ("Last 30 days", "day", 30),
+    "12w": ("Last 12 weeks", "week", 12),
+    "12m": ("Last 12 months", "month", 12),
+    "all": ("All time", "month", None),
+}
+DEFAULT_RANGE = "all"
+
+
+def _month_back(d, n):
+    index = d.year * 12 + d.month - 1 - n
+    return date(index // 12, index % 12 + 1, 1)
+
+def buckets(period, n, today=None):
+    # Bucket keys oldest -> newest, matching the trigger expressions in database.ROLLUP_PERIODS
+    today = today or date.today()
+    if period == "day":
+        return [(today - timedelta(days=i)).isoformat() for i in range(n - 1, -1, -1)]
+    if period == "week":
+        monday = today - timedelta(days=today.weekday())
+        return [(monday - timedelta(weeks=i)).isoformat() for i in range(n - 1, -1, -1)]
+    return [_month_back(today, i).strftime("%Y-%m") for i in range(n - 1, -1, -1)]
+
+def load(conn, user_id, range_key=DEFAULT_RANGE, today=None):
+    """Category totals and a trend series for one range; returns a dict for the template.
+
+    Both queries read at most (buckets x categories) rollup rows, however long the
+    raw expense history is."""
+    range_key = range_key if range_key in RANGES else DEFAULT_RANGE
+    label, period, n = RANGES[range_key]
+
+    if n is None:
+        trend_rows = conn.execute("""
+            SELECT bucket, SUM(total) AS t FROM expense_rollups
+            WHERE user_id=? AND period=? AND count > 0 GROUP BY bucket ORDER BY bucket
+        """, (user_id, period)).fetchall()
+        keys = [r["bucket"] for r in trend_rows]
+        cat_rows = conn.execute("""
+            SELECT category, total AS t FROM expense_rollups
+            WHERE user_id=? AND period='all' AND bucket='' AND count > 0 ORDER BY category
+        """, (user_id,)).fetchall()
+    else:
+        keys = buckets(period, n, today)
+        trend_rows = conn.execute("""
+            SELECT bucket, SUM(total) AS t FROM expense_rollups
+            WHERE user_id=? AND period=? AND bucket BETWEEN ? AND ? GROUP BY bucket
+        """, (user_id, period, keys[0], keys[-1])).fetchall()
+        cat_rows = conn.execute("""
+            SELECT category, SUM(total) AS t FROM expense_rollups
+            WHERE user_id=? AND period=? AND bucket BETWEEN ? AND ?
+            GROUP BY category HAVING SUM(count) > 0 ORDER BY category
+        """, (user_id, period, keys[0], keys[-1])).fetchall()
+
+    by_bucket = {r["bucket"]: r["t"] for r in trend_rows}
+    return {
+        "range": range_key,
+        "range_label": label,
+        "ranges": {k: v[0] for k, v in RANGES.items()},
+        "categories": [r["category"] for r in cat_rows],
+        "totals": [round(r["t"], 2) for r in cat_rows],
+        "buckets": keys,
+        "bucket_totals": [round(by_bucket.get(k, 0), 2) for k in keys],
+    }
@@ -0,0 +1,133 @@
+# scheduler.py — posts due recurring expenses for all users, outside the request path
+#
+#   python scheduler.py                 # loop forever (every RECURRING_INTERVAL seconds)
+#   python scheduler.py --once          # one pass, e.g. from cron
+#   python scheduler.py --once --date 2025-03-01
+import calendar, logging, os, sys, threading, time
+from datetime import date, datetime, timedelta
+from database import connect, insert_expenses
+
+log = logging.getLogger(__name__)
+
+INTERVAL = int(os.environ.get("RECURRING_INTERVAL", "900"))
+BATCH_SIZE = 500
+
+
+# -------------------------
+# Calendar helpers
+# -------------------------
+def add_months(d, months, anchor_day=None):
+    # Real calendar months: Jan 31 -> Feb 28/29 -> Mar 31 (anchored to the original day)
+    day = anchor_day or d.day
+    month_index = d.month - 1 + months
+    year, month = d.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+def next_occurrence(d, frequency, anchor_day=None):
+    if frequency == "daily":
+        return d + timedelta(days=1)
+    if frequency == "weekly":
+        return d + timedelta(days=7)
+    return add_months(d, 1, anchor_day)  # monthly
+
+def _parse(s):
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+# -------------------------
+# Posting due items
+# -------------------------
+def run_due(conn, today=None, user_id=None):
+    """Post every missed occurrence up to today for active items; returns rows inserted.
+
+    Each batch runs under BEGIN IMMEDIATE and advances next_date in the same
+    transaction as the inserts, so concurrent runs (several workers, cron and a
+    thread) never post the same occurrence twice."""
+    today = today or date.today()
+    posted = 0
+    last_id = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            sql = """SELECT id, user_id, title, amount, category, frequency, next_date, anchor_day
+                     FROM recurring_expenses
+                     WHERE status='active' AND next_date <= ? AND id > ?"""
+            params = [today.isoformat(), last_id]
+            if user_id is not None:
+                sql += " AND user_id=?"
+                params.append(user_id)
+            rows = conn.execute(sql + " ORDER BY id LIMIT ?", params + [BATCH_SIZE]).fetchall()
+            charges, advances = [], []
+            for r in rows:
+                d = _parse(r["next_date"])
+                while d <= today:
+                    charges.append((r["user_id"], r["category"], r["amount"], r["title"] + " (Recurring)", d.isoformat()))
+                    d = next_occurrence(d, r["frequency"], r["anchor_day"])
+                advances.append((d.isoformat(), r["id"], r["next_date"]))
+            # Commitments are posted even if they overdraw; the balance check is for user-entered spends
+            insert_expenses(conn, charges, check_balance=False)
+            conn.executemany("UPDATE recurring_expenses SET next_date=? WHERE id=? AND next_date=?", advances)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        posted += len(charges)
+        if len(rows) < BATCH_SIZE:
+            return posted
+        last_id = rows[-1]["id"]
+
+def resume(conn, rec_id, user_id, today=None):
+    # Reactivate without charging for the paused period: skip ahead to the first date >= today
+    today = today or date.today()
+    r = conn.execute("SELECT next_date, frequency, anchor_day FROM recurring_expenses WHERE id=? AND user_id=?",
+                     (rec_id, user_id)).fetchone()
+    if not r:
+        return False
+    d = _parse(r["next_date"])
+    while d < today:
+        d = next_occurrence(d, r["frequency"], r["anchor_day"])
+    conn.execute("UPDATE recurring_expenses SET status='active', next_date=? WHERE id=? AND user_id=?",
+                 (d.isoformat(), rec_id, user_id))
+    conn.commit()
+    return True
+
+
+# -------------------------
+# Runners
+# -------------------------
+def run_once(today=None):
+    conn = connect()
+    try:
+        return run_due(conn, today)
+    finally:
+        conn.close()
+
+def _loop(interval):
+    while True:
+        try:
+            posted = run_once()
+            if posted:
+                log.info("posted %d recurring expense(s)", posted)
+        except Exception:
+            log.exception("recurring expense run failed")
+        time.sleep(interval)
+
+_thread = None
+
+def start_background(interval=INTERVAL):
+    # Optional in-process runner (one per worker; run_due is safe to race)
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_loop, args=(interval,), name="recurring-scheduler", daemon=True)
+        _thread.start()
+    return _thread
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    day = _parse(args[args.index("--date") + 1]) if "--date" in args else None
+    if "--once" in args:
+        print(f"Posted {run_once(day)} recurring expense(s).")
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        _loop(INTERVAL)
@@ -0,0 +1,185 @@
+# session_store.py — server-side sessions and bill review drafts, both in SQLite
+#
+# Flask's default session signs the whole dict into the cookie, so whatever is put in it
+# rides along on every request. Here the cookie carries only a random session id (a fixed
+# 43 characters) and the data lives in the sessions table. Scanned bills no longer go into
+# the session at all: they are kept as one invoice draft per user, so a long receipt can
+# be edited in parts, saved, and finished from another device.
+#
+# Expired sessions and drafts are deleted every SWEEP_EVERY writes, or by
+# `python session_store.py --sweep` from cron.
+import json, os, secrets, sys, threading, time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from database import get_db
+
+# -------------------------
+# Configuration
+# -------------------------
+SESSION_TTL = float(os.environ.get("SESSION_TTL_HOURS", "168")) * 3600
+DRAFT_TTL = float(os.environ.get("INVOICE_DRAFT_TTL_HOURS", "72")) * 3600
+SWEEP_EVERY = 500  # session/draft writes between sweeps of expired rows
+MAX_ID_LENGTH = 64
+
+
+class StaleDraft(ValueError):
+    """Raised when a draft was changed (in another tab or on another device) after the form was shown."""
+
+
+# -------------------------
+# Sessions
+# -------------------------
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, expires_at=0.0):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.loaded_user = self.get("user_id")
+
+
+class SqliteSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()  # same encoding as Flask's cookie (flashes are tuples)
+    session_class = ServerSession
+
+    def open_session(self, app, request):
+        if request.path.startswith(app.static_url_path + "/"):
+            return self.make_null_session(app)  # static files never read the session
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and len(sid) <= MAX_ID_LENGTH:
+            row = get_db().execute("SELECT data, expires_at FROM sessions WHERE id=? AND expires_at > ?",
+                                   (sid, time.time())).fetchone()
+            if row:
+                return self.session_class(self.serializer.loads(row["data"]), sid, row["expires_at"])
+        return self.session_class()
+
+    def save_session(self, app, session, response):
+        if self.is_null_session(session):
+            return
+        cookie = dict(domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                      secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                      httponly=self.get_cookie_httponly(app))
+        if session.accessed:
+            response.vary.add("Cookie")
+        if not session:
+            if session.sid:  # cleared, e.g. logout
+                _write("DELETE FROM sessions WHERE id=?", (session.sid,))
+                response.delete_cookie(self.get_cookie_name(app), **cookie)
+            return
+        now = time.time()
+        # A new user on an existing id (login) gets a fresh id, so an id planted before login is useless
+        rotate = session.sid is not None and session.get("user_id") != session.loaded_user
+        # Unchanged sessions are only rewritten once half their lifetime has gone
+        if not (session.sid is None or rotate or session.modified or session.expires_at - now < SESSION_TTL / 2):
+            return
+        old, sid = session.sid, session.sid
+        if sid is None or rotate:
+            sid = secrets.token_urlsafe(32)
+        data = self.serializer.dumps(dict(session))
+        _write("INSERT OR REPLACE INTO sessions (id, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+               (sid, session.get("user_id"), data, now + SESSION_TTL), delete=old if old != sid else None)
+        session.sid, session.expires_at, session.loaded_user = sid, now + SESSION_TTL, session.get("user_id")
+        response.set_cookie(self.get_cookie_name(app), sid, expires=self.get_expiration_time(app, session), **cookie)
+
+
+def _write(sql, params, delete=None):
+    conn = get_db()
+    if conn.in_transaction:
+        conn.rollback()  # whatever the view left uncommitted would be rolled back on teardown anyway
+    if delete:
+        conn.execute("DELETE FROM sessions WHERE id=?", (delete,))
+    conn.execute(sql, params)
+    conn.commit()
+    _count_write(conn)
+
+def init_app(app):
+    app.session_interface = SqliteSessionInterface()
+
+
+# -------------------------
+# Invoice drafts (one per user; items are {"name", "amount", "category", "suggested"})
+# -------------------------
+def get_draft(conn, user_id):
+    """The user's unexpired draft as {"job_id", "status", "items", "revision"}, or None.
+
+    status is "scanning" while job_id's OCR job runs and "ready" once items are filled in."""
+    row = conn.execute("SELECT job_id, status, items, revision FROM invoice_drafts WHERE user_id=? AND expires_at > ?",
+                       (user_id, time.time())).fetchone()
+    if not row:
+        return None
+    return {"job_id": row["job_id"], "status": row["status"], "items": json.loads(row["items"]),
+            "revision": row["revision"]}
+
+def start_draft(conn, user_id, job_id=None, items=None):
+    """Replace the user's draft: "scanning" for job_id, or "ready" with items. Returns the new draft."""
+    now = time.time()
+    status = "scanning" if items is None else "ready"
+    # The revision keeps counting across drafts, so a form left open for an older bill is stale
+    conn.execute("""INSERT INTO invoice_drafts (user_id, job_id, status, items, revision, updated_at, expires_at)
+                    VALUES (?, ?, ?, ?, 1, ?, ?)
+                    ON CONFLICT(user_id) DO UPDATE SET job_id=excluded.job_id, status=excluded.status,
+                        items=excluded.items, revision=revision + 1,
+                        updated_at=excluded.updated_at, expires_at=excluded.expires_at""",
+                 (user_id, job_id, status, json.dumps(items or []), now, now + DRAFT_TTL))
+    conn.commit()
+    _count_write(conn)
+    return get_draft(conn, user_id)
+
+def update_draft(conn, user_id, items, revision):
+    """Save edited items if the draft is still at `revision`; returns the new revision or raises StaleDraft."""
+    now = time.time()
+    cur = conn.execute("""UPDATE invoice_drafts SET items=?, revision=revision + 1, updated_at=?, expires_at=?
+                          WHERE user_id=? AND revision=? AND status='ready' AND expires_at > ?""",
+                       (json.dumps(items), now, now + DRAFT_TTL, user_id, revision, now))
+    conn.commit()
+    if cur.rowcount != 1:
+        raise StaleDraft("This bill was changed in another tab or device. Review it again.")
+    _count_write(conn)
+    return revision + 1
+
+def take_draft(conn, user_id, revision):
+    """Delete the draft at `revision` inside the caller's transaction (so a failed insert puts it
+    back on rollback); raises StaleDraft if it changed, was already added, or expired."""
+    cur = conn.execute("DELETE FROM invoice_drafts WHERE user_id=? AND revision=? AND status='ready' AND expires_at > ?",
+                       (user_id, revision, time.time()))
+    if cur.rowcount != 1:
+        raise StaleDraft("This bill was changed in another tab or device. Review it again.")
+
+def discard_draft(conn, user_id):
+    conn.execute("DELETE FROM invoice_drafts WHERE user_id=?", (user_id,))
+    conn.commit()
+
+
+# -------------------------
+# Expiry
+# -------------------------
+_writes = 0
+_writes_lock = threading.Lock()
+
+def _count_write(conn):
+    global _writes
+    with _writes_lock:
+        _writes += 1
+        due = _writes % SWEEP_EVERY == 0
+    if due:
+        sweep(conn)
+
+def sweep(conn, now=None):
+    """Delete expired sessions and drafts; returns (sessions, drafts) removed."""
+    now = now or time.time()
+    sessions = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+    drafts = conn.execute("DELETE FROM invoice_drafts WHERE expires_at <= ?", (now,)).rowcount
+    conn.commit()
+    return sessions, drafts
+
+
+if __name__ == "__main__":
+    if "--sweep" not in sys.argv[1:]:
+        sys.exit("usage: python session_store.py --sweep")
+    from database import connect, init_db
+    init_db()
+    conn = connect()
+    try:
+        removed = sweep(conn)
+    finally:
+        conn.close()
+    print(f"Removed {removed[0]} expired session(s) and {removed[1]} expired invoice draft(s).")
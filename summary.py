@@ -0,0 +1,121 @@
+# summary.py — everything a dashboard-style page needs, fetched with one SQL statement
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+
+@dataclass
+class Totals:
+    total_allowance: float = 0.0
+    total_expenses: float = 0.0
+    total_saved: float = 0.0
+
+    @property
+    def balance(self):
+        return self.total_allowance - self.total_expenses - self.total_saved
+
+    @property
+    def displayed_allowance(self):
+        # Allowance after money parked in goals
+        return self.total_allowance - self.total_saved
+
+
+@dataclass
+class Goal:
+    id: int
+    title: str
+    target_amount: float
+    saved_amount: float
+    due_date: Optional[str]
+
+
+@dataclass
+class Limit:
+    id: int
+    category: str
+    limit_amount: float
+
+
+@dataclass
+class Recurring:
+    id: int
+    title: str
+    amount: float
+    category: str
+    frequency: str
+    next_date: str
+    status: str
+
+
+@dataclass
+class PageSummary:
+    totals: Totals
+    goals: List[Goal] = field(default_factory=list)
+    limits: List[Limit] = field(default_factory=list)
+    recurring: List[Recurring] = field(default_factory=list)
+    recurring_this_month: float = 0.0
+
+
+# -------------------------
+# SQL fragments (each is one column of the single result row)
+# -------------------------
+_TOTALS = """
+    COALESCE(b.total_allowance, 0) AS total_allowance,
+    COALESCE(b.total_expenses, 0) AS total_expenses,
+    COALESCE(b.total_saved, 0) AS total_saved"""
+
+_PARTS = {
+    "goals": """
+    (SELECT json_group_array(json_object('id', id, 'title', title, 'target_amount', target_amount,
+                                         'saved_amount', COALESCE(saved_amount, 0), 'due_date', due_date))
+     FROM (SELECT * FROM goals WHERE user_id = :uid ORDER BY id)) AS goals""",
+    "limits": """
+    (SELECT json_group_array(json_object('id', id, 'category', category, 'limit_amount', limit_amount))
+     FROM (SELECT * FROM category_limits WHERE user_id = :uid ORDER BY id)) AS limits""",
+    "recurring": """
+    (SELECT json_group_array(json_object('id', id, 'title', title, 'amount', amount, 'category', category,
+                                         'frequency', frequency, 'next_date', next_date, 'status', status))
+     FROM (SELECT * FROM recurring_expenses WHERE user_id = :uid ORDER BY id DESC LIMIT :recurring_limit)) AS recurring""",
+    "recurring_this_month": """
+    (SELECT COALESCE(SUM(amount), 0) FROM expenses
+     WHERE user_id = :uid AND date LIKE :month AND description LIKE '%(Recurring)%') AS recurring_this_month""",
+}
+
+_ROW_TYPES = {"goals": Goal, "limits": Limit, "recurring": Recurring}
+
+_sql_cache = {}
+
+
+def _sql(parts):
+    key = tuple(sorted(parts))
+    if key not in _sql_cache:
+        columns = [_TOTALS] + [_PARTS[p] for p in key]
+        _sql_cache[key] = f"""
+            WITH me(uid) AS (SELECT :uid)
+            SELECT {",".join(columns)}
+            FROM me LEFT JOIN user_balances b ON b.user_id = me.uid
+        """
+    return _sql_cache[key]
+
+
+def load(conn, user_id, *parts, recurring_limit=-1, today=None):
+    """Fetch totals plus the requested parts ('goals', 'limits', 'recurring',
+    'recurring_this_month') in a single round trip."""
+    unknown = set(parts) - set(_PARTS)
+    if unknown:
+        raise ValueError(f"Unknown summary parts: {sorted(unknown)}")
+    month = (today or datetime.now()).strftime("%Y-%m")
+    row = conn.execute(_sql(parts), {"uid": user_id, "recurring_limit": recurring_limit,
+                                     "month": f"{month}-%"}).fetchone()
+    result = PageSummary(totals=Totals(row["total_allowance"], row["total_expenses"], row["total_saved"]))
+    for part in parts:
+        if part == "recurring_this_month":
+            result.recurring_this_month = row[part] or 0.0
+        else:
+            setattr(result, part, [_ROW_TYPES[part](**r) for r in json.loads(row[part] or "[]")])
+    return result
+
+
+def totals(conn, user_id):
+    return load(conn, user_id).totals
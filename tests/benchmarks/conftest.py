@@ -0,0 +1,42 @@
+# tests/benchmarks/conftest.py — data shared by the pytest-benchmark suite
+#
+#   pip install pytest-benchmark
+#   python -m pytest tests/benchmarks --benchmark-only [--benchmark-autosave] [--benchmark-compare]
+#
+# Runs are saved under .benchmarks/<machine>/ by pytest-benchmark together with the CPU,
+# Python version and commit they came from; they are not checked in. Without
+# pytest-benchmark installed these tests are skipped.
+import os, sys
+import pytest
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "benchmarks")
+sys.path.insert(0, BENCH_DIR)
+
+import database
+import seed
+from bench_receipts import load_fixtures
+
+BENCH_ROWS = int(os.environ.get("BENCH_ROWS", "20000"))
+
+
+@pytest.fixture(scope="session")
+def seeded_db(tmp_path_factory):
+    """Path of a database seeded once per session with BENCH_ROWS expenses (benchmarks/seed.py)."""
+    path = str(tmp_path_factory.mktemp("bench") / "database.db")
+    previous = database.DB_NAME
+    try:
+        seed.seed(path, BENCH_ROWS, seed.default_users(BENCH_ROWS), progress=False)
+    finally:
+        database.DB_NAME = previous
+    return path
+
+@pytest.fixture
+def bench_conn(seeded_db, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", seeded_db)
+    conn = database.connect()
+    yield conn
+    conn.close()
+
+@pytest.fixture(scope="session")
+def receipt_texts():
+    return [data for _, kind, data, _ in load_fixtures() if kind == "text"]
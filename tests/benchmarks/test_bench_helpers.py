@@ -0,0 +1,102 @@
+# tests/benchmarks/test_bench_helpers.py — the helpers every page, bill or import goes through
+import io, itertools, shutil
+from datetime import date, timedelta
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import classifier, database, importer, ocr_utils, receipt_parser, rollups, scheduler, summary
+
+
+def cycle(values):
+    # a different user / text on every call, like real traffic
+    it = itertools.cycle(values)
+    return lambda: next(it)
+
+def users(conn):
+    return [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+
+
+def test_parse_items_from_text(benchmark, receipt_texts):
+    text = cycle(receipt_texts)
+    benchmark(lambda: ocr_utils.parse_items_from_text(text()))
+
+def test_items_from_text(benchmark, receipt_texts):
+    text = cycle(receipt_texts)
+    benchmark(lambda: ocr_utils.items_from_text(text()))
+
+
+def test_classify(benchmark, receipt_texts):
+    name = cycle([it["name"] for t in receipt_texts for it in receipt_parser.parse_text(t).items])
+    benchmark(lambda: classifier.classify(name()))
+
+
+def test_summary_totals(benchmark, bench_conn):
+    user = cycle(users(bench_conn))
+    benchmark(lambda: summary.totals(bench_conn, user()))
+
+def test_summary_home(benchmark, bench_conn):
+    user = cycle(users(bench_conn))
+    benchmark(lambda: summary.load(bench_conn, user(), "recurring", "limits", "goals", recurring_limit=5))
+
+
+@pytest.mark.parametrize("range_key", sorted(rollups.RANGES))
+def test_rollups(benchmark, bench_conn, range_key):
+    user = cycle(users(bench_conn))
+    benchmark(lambda: rollups.load(bench_conn, user(), range_key))
+
+
+IMPORT_ROWS = 2000
+
+@pytest.fixture(scope="module")
+def statement():
+    lines = ["Txn Date,Narration,Withdrawal Amt.,Deposit Amt."]
+    for i in range(IMPORT_ROWS):
+        day = f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/2024"
+        lines.append(f"{day},UPI-SWIGGY ORDER {i},Rs.{i % 500 + 20}.50," if i % 10
+                     else f"{day},NEFT SCHOLARSHIP {i},,5000")
+    return "\n".join(lines).encode()
+
+def test_import_statement(benchmark, bench_conn, statement):
+    # every round imports the whole file for a user with no expenses yet
+    fresh = itertools.count(10_000_000)
+
+    def setup():
+        user_id = next(fresh)
+        bench_conn.execute("INSERT INTO users (id, name, email, password) VALUES (?, 'Bench', ?, 'x')",
+                           (user_id, f"import{user_id}@bench.local"))
+        bench_conn.commit()
+        return (user_id,), {}
+
+    result = benchmark.pedantic(lambda user_id: importer.import_file(bench_conn, user_id, io.BytesIO(statement), "s.csv"),
+                                setup=setup, rounds=10)
+    assert result.imported == IMPORT_ROWS - IMPORT_ROWS // 10
+
+def test_reimport_statement(benchmark, bench_conn, statement):
+    # the same file again: every row is found as a duplicate
+    user_id = users(bench_conn)[0]
+    importer.import_file(bench_conn, user_id, io.BytesIO(statement), "s.csv")
+    result = benchmark(lambda: importer.import_file(bench_conn, user_id, io.BytesIO(statement), "s.csv"))
+    assert result.imported == 0
+
+
+@pytest.fixture
+def recurring_conn(seeded_db, tmp_path, monkeypatch):
+    # run_due posts expenses, so it works on a copy of the seeded database
+    copy = str(tmp_path / "recurring.db")
+    shutil.copy(seeded_db, copy)
+    monkeypatch.setattr(database, "DB_NAME", copy)
+    conn = database.connect()
+    yield conn
+    conn.close()
+
+def test_apply_recurring(benchmark, recurring_conn):
+    # every round rewinds the active items by a month and posts what fell due, like a missed scheduler
+    back = (date.today() - timedelta(days=30)).isoformat()
+
+    def setup():
+        recurring_conn.execute("UPDATE recurring_expenses SET next_date=? WHERE status='active'", (back,))
+        recurring_conn.commit()
+
+    posted = benchmark.pedantic(lambda: scheduler.run_due(recurring_conn), setup=setup, rounds=10)
+    assert posted > 0
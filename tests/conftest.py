@@ -0,0 +1,17 @@
+# tests/conftest.py — run the modules from the repository root against a throwaway database
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A migrated database in a temporary directory; yields an open connection."""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "database.db"))
+    database.init_db()
+    conn = database.connect()
+    yield conn
+    conn.close()
@@ -0,0 +1,32 @@
+# tests/test_auth_hashing.py — the hashing pool answers HashingBusy instead of hanging or failing
+import os, time
+import pytest
+
+import auth_hashing
+
+
+@pytest.fixture
+def pool():
+    pool = auth_hashing.HashPool(workers=1, queue=2)
+    yield pool
+    if pool._executor is not None:
+        pool._executor.shutdown(cancel_futures=True)
+
+def test_timeout_is_busy(pool):
+    with pytest.raises(auth_hashing.HashingBusy):
+        pool.run(time.sleep, 2, timeout=0.2)
+
+def test_broken_pool_is_busy_and_replaced(pool):
+    assert pool.run(int, "1") == 1
+    broken = pool._executor
+    with pytest.raises(auth_hashing.HashingBusy):
+        pool.run(os._exit, 1)
+    assert pool.run(int, "2") == 2
+    assert pool._executor is not broken
+
+def test_configured_cost_seeds_the_dummy_estimate(monkeypatch):
+    monkeypatch.setattr(auth_hashing, "COST", "10")
+    monkeypatch.setattr(auth_hashing, "_cost", None)
+    monkeypatch.setitem(auth_hashing._stats, "verify_ms", 0.0)
+    assert auth_hashing.current_cost() == 10
+    assert auth_hashing._stats["verify_ms"] > 0
@@ -0,0 +1,165 @@
+# tests/test_importer.py — statement parsing and what an import keeps or skips
+import io
+import pytest
+
+import importer
+
+
+def run(db, text, filename="statement.csv", **kwargs):
+    return importer.import_file(db, 1, io.BytesIO(text.encode()), filename, **kwargs)
+
+def expenses(db):
+    return [tuple(r) for r in db.execute("SELECT date, amount, description FROM expenses ORDER BY id")]
+
+@pytest.fixture
+def user(db):
+    db.execute("INSERT INTO users (id, name, email, password) VALUES (1, 'Test', 't@example.com', 'x')")
+    db.commit()
+    return db
+
+
+# -------------------------
+# Amounts
+# -------------------------
+@pytest.mark.parametrize("value, expected", [
+    ("Rs.500", 500.0),
+    ("Rs. 1,250.75", 1250.75),
+    ("rs 40", 40.0),
+    ("₹500", 500.0),
+    ("₹ 99.50", 99.5),
+    ("INR 75", 75.0),
+    ("INR1,200", 1200.0),
+    ("500 INR", 500.0),
+    ("-Rs.500", -500.0),
+    ("Rs.-500", -500.0),
+    ("(₹250.00)", -250.0),
+    (".50", 0.5),
+    ("1,234.5", 1234.5),
+])
+def test_parse_amount(value, expected):
+    assert importer.parse_amount(value) == expected
+
+@pytest.mark.parametrize("value", ["Rs.", "five hundred", "12 items", "USD 5"])
+def test_parse_amount_rejects(value):
+    with pytest.raises(ValueError):
+        importer.parse_amount(value)
+
+
+# -------------------------
+# Dates
+# -------------------------
+def test_date_format_is_picked_per_file():
+    formats = importer.sniff_date_formats(["05/01/2024", "25/01/2024"])
+    assert formats == ("%d/%m/%Y",)
+    assert importer.parse_date("05/01/2024", formats) == "2024-01-05"
+    formats = importer.sniff_date_formats(["01/05/2024", "01/25/2024"])
+    assert importer.parse_date("01/05/2024", formats) == "2024-01-05"
+
+def test_ambiguous_date_is_reported():
+    formats = importer.sniff_date_formats(["05/01/2024", "06/01/2024"])
+    with pytest.raises(ValueError, match="ambiguous"):
+        importer.parse_date("05/01/2024", formats)
+    assert importer.parse_date("07/07/2024", formats) == "2024-07-07"
+
+def test_trailing_time_is_ignored():
+    assert importer.parse_date("2024-01-05T10:22:00") == "2024-01-05"
+    assert importer.parse_date("20240105120000") == "2024-01-05"
+    formats = importer.sniff_date_formats(["25/01/2024 10:22"])
+    assert importer.parse_date("05/01/2024 10:22", formats) == "2024-01-05"
+
+def test_two_digit_year_format_does_not_truncate_four_digit_years():
+    assert importer.sniff_date_formats(["05/01/2024", "25/01/2024"]) == ("%d/%m/%Y",)
+
+def test_earlier_files_do_not_change_how_dates_parse(user):
+    run(user, "Date,Amount,Description\n01/25/2024,-10,a\n")
+    result = run(user, "Date,Amount,Description\n25/02/2024,-10,b\n05/02/2024,-10,c\n")
+    assert result.imported == 2
+    assert expenses(user)[-2:] == [("2024-02-25", 10.0, "b"), ("2024-02-05", 10.0, "c")]
+
+def test_import_reports_ambiguous_rows(user):
+    result = run(user, "Date,Amount,Description\n05/01/2024,-10,a\n06/01/2024,-20,b\n07/07/2024,-30,c\n")
+    assert result.imported == 1 and result.invalid == 2
+    assert "ambiguous date" in result.errors[0]
+
+
+# -------------------------
+# Signs and credits
+# -------------------------
+def test_signed_amount_column_skips_deposits(user):
+    result = run(user, "Date,Amount,Description\n2024-01-05,-120,Canteen\n2024-01-06,5000,Salary\n")
+    assert (result.imported, result.credits) == (1, 1)
+    assert expenses(user) == [("2024-01-05", 120.0, "Canteen")]
+
+def test_all_positive_amount_column_is_spending(user):
+    result = run(user, "Date,Amount,Description\n2024-01-05,120,Canteen\n2024-01-06,80,Bus\n")
+    assert (result.imported, result.credits) == (2, 0)
+
+def test_explicit_sign_convention(user):
+    text = "Date,Amount,Description\n2024-01-05,120,Canteen\n2024-01-06,-80,Refund\n"
+    result = run(user, text, signs="positive")
+    assert (result.imported, result.credits) == (1, 1)
+    assert expenses(user) == [("2024-01-05", 120.0, "Canteen")]
+    with pytest.raises(importer.ImportFailed):
+        run(user, text, signs="sideways")
+
+def test_debit_column_keeps_its_sign_irrelevant(user):
+    result = run(user, "Txn Date,Withdrawal Amt.,Deposit Amt.,Narration\n"
+                       "2024-01-05,-120,,Canteen\n2024-01-06,,5000,Salary\n")
+    assert (result.imported, result.credits) == (1, 1)
+    assert expenses(user) == [("2024-01-05", 120.0, "Canteen")]
+
+def test_type_flag(user):
+    result = run(user, "Date,Amount,Dr/Cr,Description\n2024-01-05,120,DR,Canteen\n2024-01-06,5000,CR,Salary\n")
+    assert (result.imported, result.credits) == (1, 1)
+
+
+# -------------------------
+# Duplicates
+# -------------------------
+STATEMENT = "Date,Amount,Description\n2024-01-05,-20,Tea\n2024-01-05,-20,Tea\n2024-01-06,-50,Bus\n"
+
+def test_repeated_rows_in_one_file_are_kept(user):
+    result = run(user, STATEMENT)
+    assert (result.imported, result.duplicates, result.repeats) == (3, 0, 1)
+
+def test_reimport_skips_rows_already_in_the_database(user):
+    run(user, STATEMENT)
+    result = run(user, STATEMENT)
+    assert (result.imported, result.duplicates) == (0, 3)
+    assert len(expenses(user)) == 3
+
+def test_only_the_extra_copy_is_imported(user):
+    run(user, "Date,Amount,Description\n2024-01-05,-20,Tea\n")
+    result = run(user, STATEMENT, batch_size=1)
+    assert (result.imported, result.duplicates) == (2, 1)
+    assert len(expenses(user)) == 3
+
+def test_repeats_across_batches_are_kept(user):
+    result = run(user, STATEMENT, batch_size=1)
+    assert (result.imported, result.duplicates, result.repeats) == (3, 0, 1)
+
+def test_more_copies_than_the_database_has(user):
+    run(user, "Date,Amount,Description\n2024-01-05,-20,Tea\n2024-01-05,-20,Tea\n")
+    result = run(user, "Date,Amount,Description\n" + "2024-01-05,-20,Tea\n" * 4, batch_size=1)
+    assert (result.imported, result.duplicates, result.repeats) == (2, 2, 2)
+    assert len(expenses(user)) == 4
+
+
+def statement_rows(n):
+    return "Date,Amount,Description\n" + "".join(f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d},-{i % 900 + 1},Shop {i}\n"
+                                                 for i in range(n))
+
+def test_memory_stays_flat_with_file_size(user):
+    import tracemalloc
+    peaks = []
+    for n in (1000, 5000):
+        text = statement_rows(n).encode()
+        user.execute("DELETE FROM expenses")
+        user.commit()
+        tracemalloc.start()
+        try:
+            importer.import_file(user, 1, io.BytesIO(text), "s.csv", batch_size=100)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    assert peaks[1] < peaks[0] * 1.5, peaks
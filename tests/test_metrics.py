@@ -0,0 +1,37 @@
+# tests/test_metrics.py — failed requests are timed and never leave the profiler running
+import sys
+import pytest
+from flask import Flask
+
+import metrics
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "PROFILE_SLOW_MS", 0.001)
+    monkeypatch.setattr(metrics, "PROFILE_DIR", str(tmp_path))
+    app = Flask(__name__)
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    metrics.init_app(app)
+    return app
+
+def test_unhandled_exception_is_timed_as_500(app):
+    assert app.test_client().get("/boom").status_code == 500
+    assert 'http_request_duration_seconds_count{route="/boom",method="GET",status="500"} 1' in metrics.render()
+    assert sys.getprofile() is None
+
+def test_slow_request_profile_is_logged(app, tmp_path, caplog):
+    with caplog.at_level("WARNING", logger="metrics"):
+        assert app.test_client().get("/ok").status_code == 200
+    assert "GET /ok took" in caplog.text
+    assert list(tmp_path.glob("*-ok-*.prof"))
+    assert 'route="/ok",method="GET",status="200"' in metrics.render()
@@ -0,0 +1,44 @@
+# tests/test_query_plans.py — every hot per-user query must be answered from its index
+import re
+import pytest
+
+import database
+
+# HOT_QUERIES name -> (table, index) the plan must SEARCH
+EXPECTED = {
+    "expense total": ("expenses", "idx_expenses_user_id"),
+    "expense list": ("expenses", "idx_expenses_user_id"),
+    "expense list page": ("expenses", "idx_expenses_user_id"),
+    "expense list by category": ("expenses", "idx_expenses_user_category"),
+    "category totals": ("expenses", "idx_expenses_user_category"),
+    "last 7 days": ("expenses", "idx_expenses_user_date"),
+    "allowance total": ("allowances", "idx_allowances_user"),
+    "goal savings": ("goals", "idx_goals_user"),
+    "recurring": ("recurring_expenses", "idx_recurring_user"),
+    "limits": ("category_limits", "idx_limits_user_category"),
+}
+
+
+def test_every_hot_query_has_an_expectation():
+    assert set(EXPECTED) == set(database.HOT_QUERIES)
+
+
+@pytest.mark.parametrize("name", sorted(database.HOT_QUERIES))
+def test_hot_query_uses_index(db, name):
+    sql, params = database.HOT_QUERIES[name]
+    table, index = EXPECTED[name]
+    plan = database.explain(db, sql, params)
+    pattern = re.compile(rf"^SEARCH {table} USING (COVERING )?INDEX {index} \(")
+    assert any(pattern.match(line) for line in plan), f"{name}: {plan}"
+    # no full scan of the table or a temporary sort on top of the index
+    assert not any(line.startswith(f"SCAN {table}") for line in plan), f"{name}: {plan}"
+    assert not any("USE TEMP B-TREE FOR ORDER BY" in line for line in plan), f"{name}: {plan}"
+
+
+def test_migrate_logs_instead_of_printing(db, caplog, capsys):
+    db.execute("PRAGMA user_version = 10")
+    db.commit()
+    with caplog.at_level("INFO", logger="database"):
+        assert database.migrate(db) == database.SCHEMA_VERSION
+    assert "Applied migration 11" in caplog.text
+    assert capsys.readouterr().out == ""
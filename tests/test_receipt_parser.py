@@ -0,0 +1,38 @@
+# tests/test_receipt_parser.py — the fixture bills parse exactly, and header words don't eat items
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import receipt_parser
+from bench_receipts import check, load_fixtures, parse
+
+FIXTURES = load_fixtures()
+
+
+def test_fixtures_found():
+    assert FIXTURES, "no receipt fixtures in benchmarks/fixtures/receipts"
+
+@pytest.mark.parametrize("name, kind, data, expected", FIXTURES, ids=[f[0] for f in FIXTURES])
+def test_fixture(name, kind, data, expected):
+    _, receipt = parse(kind, data)
+    assert check(receipt, expected) == []
+
+
+@pytest.mark.parametrize("line, name, amount", [
+    ("Coffee Table 2 x 1500.00 3000.00", "Coffee Table", 3000.0),
+    ("Date Shake 120.00", "Date Shake", 120.0),
+    ("Time Pass Chips - 20", "Time Pass Chips", 20.0),
+    ("Change Purse 150", "Change Purse", 150.0),
+    ("Cash Register Roll 60.00", "Cash Register Roll", 60.0),
+])
+def test_header_words_inside_item_names(line, name, amount):
+    assert receipt_parser.parse_text(line).items == [{"name": name, "amount": amount}]
+
+@pytest.mark.parametrize("line", [
+    "Table: 7", "Token 118", "Date: 14/03/2024 13:42", "Cash 500.00", "Change 23.00",
+    "Paid by Cash 500.00", "Change Returned 23.00", "Bill No: 4521   Table: 7", "Balance 12.00",
+])
+def test_header_and_payment_lines_are_skipped(line):
+    receipt = receipt_parser.parse_text(line)
+    assert receipt.items == [] and receipt.skipped == 1
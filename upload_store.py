@@ -0,0 +1,208 @@
+# upload_store.py — content-addressed bill uploads with an OCR result cache and LRU eviction
+import hashlib, json, os, struct, tempfile
+from database import get_db
+
+# -------------------------
+# Configuration
+# -------------------------
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "uploads")
+MAX_BYTES = int(os.environ.get("UPLOAD_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+MAX_PIXELS = int(os.environ.get("UPLOAD_MAX_PIXELS", str(40 * 1000 * 1000)))
+CHUNK_SIZE = 64 * 1024
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not a supported image or is too large to process."""
+
+
+# -------------------------
+# Header probing (no pixel decode)
+# -------------------------
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+MAX_JPEG_SCAN = 64 * 1024  # bytes searched for the next marker before giving up
+
+def _next_marker(f):
+    # Skip to the byte after the next run of 0xFF, searching buffered chunks
+    scanned = 0
+    while scanned < MAX_JPEG_SCAN:
+        pos = f.tell()
+        chunk = f.read(min(CHUNK_SIZE, MAX_JPEG_SCAN - scanned))
+        if not chunk:
+            return None
+        i = chunk.find(b"\xff")
+        if i < 0:
+            scanned += len(chunk)
+            continue
+        f.seek(pos + i + 1)
+        byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        return byte[0] if byte else None
+    return None
+
+def _probe_jpeg(f):
+    f.seek(2)
+    while True:
+        marker = _next_marker(f)
+        if marker is None or marker == 0xDA:
+            return None  # no frame header before the image data (SOS) or within the scan limit
+        if marker in _JPEG_SOF:
+            f.read(3)
+            h, w = struct.unpack(">HH", f.read(4))
+            return w, h
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        f.seek(struct.unpack(">H", length)[0] - 2, 1)
+
+def _probe_tiff(f, head):
+    endian = "<" if head[:2] == b"II" else ">"
+    f.seek(struct.unpack(endian + "I", head[4:8])[0])
+    count = struct.unpack(endian + "H", f.read(2))[0]
+    dims = {}
+    for _ in range(count):
+        entry = f.read(12)
+        if len(entry) < 12:
+            break
+        tag, typ = struct.unpack(endian + "HH", entry[:4])
+        if tag in (256, 257):
+            fmt = "H" if typ == 3 else "I"
+            dims[tag] = struct.unpack(endian + fmt, entry[8:8 + struct.calcsize(fmt)])[0]
+    if 256 in dims and 257 in dims:
+        return dims[256], dims[257]
+    return None
+
+def _probe(f, head):
+    fmt, size = None, None
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        fmt, size = "png", struct.unpack(">II", head[16:24])
+    elif head[:2] == b"BM" and len(head) >= 26:
+        w, h = struct.unpack("<ii", head[18:26])
+        fmt, size = "bmp", (w, abs(h))
+    elif head[:4] in (b"II*\x00", b"MM\x00*"):
+        fmt, size = "tiff", _probe_tiff(f, head)
+    elif head[:2] == b"\xff\xd8":
+        fmt, size = "jpeg", _probe_jpeg(f)
+    return size, fmt
+
+def probe_image(f):
+    """Return (format, width, height) read from the header only, or None if unsupported."""
+    f.seek(0)
+    head = f.read(32)
+    try:
+        size, fmt = _probe(f, head)
+    except (struct.error, OSError, ValueError):
+        size = None
+    f.seek(0)
+    if not size:
+        return None
+    return fmt, size[0], size[1]
+
+def check_image(f):
+    info = probe_image(f)
+    if info is None:
+        raise InvalidImage("Unsupported or corrupt image.")
+    fmt, w, h = info
+    if w * h > MAX_PIXELS:
+        raise InvalidImage(f"Image is too large ({w}x{h}).")
+    return info
+
+
+def digest_of(path):
+    # Stored files are named <sha256>.<ext>
+    return os.path.basename(path).split(".", 1)[0]
+
+def store(stream):
+    """Stream an upload to disk while hashing it; identical bytes share one file.
+
+    The upload is spooled to a temporary file first, so it is validated whether or not the
+    request stream can seek. The stored name is <sha256>.<probed format>: the extension the
+    client sent plays no part, so the same bytes never end up in two files."""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix=".part")
+    try:
+        with os.fdopen(fd, "w+b") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            # Reject non-images and oversized pixel counts before the file is kept
+            fmt = check_image(out)[0]
+        digest = h.hexdigest()
+        conn = get_db()
+        row = conn.execute("SELECT path FROM ocr_cache WHERE digest=?", (digest,)).fetchone()
+        path = row["path"] if row and os.path.exists(row["path"]) else os.path.join(UPLOAD_FOLDER, f"{digest}.{fmt}")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    conn.execute("""
+        INSERT INTO ocr_cache (digest, path, bytes) VALUES (?, ?, ?)
+        ON CONFLICT(digest) DO UPDATE SET path=excluded.path, last_used=datetime('now')
+    """, (digest, path, size))
+    conn.commit()
+    evict()
+    return digest, path
+
+def lookup(digest, conn=None):
+    # Cached parsed items for these exact bytes, or None if the bill was never scanned
+    conn = conn or get_db()
+    row = conn.execute("SELECT items FROM ocr_cache WHERE digest=? AND items IS NOT NULL", (digest,)).fetchone()
+    if not row:
+        return None
+    conn.execute("UPDATE ocr_cache SET last_used=datetime('now'), hits=hits+1 WHERE digest=?", (digest,))
+    conn.commit()
+    return json.loads(row["items"])
+
+def remember(digest, text, items, conn=None):
+    conn = conn or get_db()
+    conn.execute("UPDATE ocr_cache SET text=?, items=?, last_used=datetime('now') WHERE digest=?",
+                 (text, json.dumps(items), digest))
+    conn.commit()
+
+def evict(max_bytes=MAX_BYTES):
+    # Drop least recently used files until the store fits; never touch files a pending job still needs
+    conn = get_db()
+    total = conn.execute("SELECT COALESCE(SUM(bytes),0) AS t FROM ocr_cache").fetchone()["t"]
+    if total <= max_bytes:
+        return 0
+    removed = 0
+    rows = conn.execute("""
+        SELECT c.digest, c.path, c.bytes FROM ocr_cache c
+        WHERE NOT EXISTS (SELECT 1 FROM ocr_jobs j
+                          WHERE j.status IN ('queued','running') AND instr(j.paths, c.digest) > 0)
+        ORDER BY c.last_used, c.digest
+    """).fetchall()
+    for r in rows:
+        if total <= max_bytes:
+            break
+        if os.path.exists(r["path"]):
+            os.remove(r["path"])
+        conn.execute("DELETE FROM ocr_cache WHERE digest=?", (r["digest"],))
+        total -= r["bytes"]
+        removed += 1
+    conn.commit()
+    return removed
+
+def stats():
+    conn = get_db()
+    row = conn.execute("""
+        SELECT COUNT(*) AS files, COALESCE(SUM(bytes),0) AS bytes,
+               COALESCE(SUM(hits),0) AS hits, COUNT(items) AS scanned
+        FROM ocr_cache
+    """).fetchone()
+    return {"files": row["files"], "bytes": row["bytes"], "max_bytes": MAX_BYTES,
+            "hits": row["hits"], "scanned": row["scanned"]}